@@ -10,7 +10,7 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 # from genericadmin.admin import GenericAdminModelAdmin
 # from gfk.fields import GfkField
 
-from . import models
+from . import ledger, models
 
 User = get_user_model()
 
@@ -146,34 +146,100 @@ admin.site.register(models.PromoCode)
 admin.site.register(models.ReelView)
 
 # Wallet models
+# Balans va running totallar faqat app.ledger.post() orqali o'zgaradi: admin
+# yangi yozuvni ledger orqali qo'shadi, mavjud yozuvlar va hamyon totallari faqat o'qiladi
 class WalletTransactionInline(admin.TabularInline):
     model = models.WalletTransaction
     extra = 0
-    readonly_fields = ('created_at', 'balance_after')
-    fields = ('transaction_type', 'amount', 'description', 'course', 'course_type', 'from_user', 'to_user', 'created_at')
-    autocomplete_fields = ('course', 'course_type', 'from_user', 'to_user')
+    can_delete = False
+    fields = ('transaction_type', 'amount', 'balance_after', 'description', 'course', 'course_type', 'from_user', 'to_user', 'created_at')
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 @admin.register(models.Wallet)
 class WalletAdmin(admin.ModelAdmin):
     list_display = ('user', 'balance', 'created_at', 'updated_at')
     search_fields = ('user__username', 'user__email')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('balance',) + models.Wallet.STATS_FIELDS + ('created_at', 'updated_at')
     inlines = (WalletTransactionInline,)
 
+
+class WalletTransactionAdminForm(forms.ModelForm):
+    class Meta:
+        model = models.WalletTransaction
+        exclude = ('balance_after',)
+
+    def clean(self):
+        cleaned = super().clean()
+        wallet, amount = cleaned.get('wallet'), cleaned.get('amount')
+        # Yakuniy tekshiruv ledger.post() da, hamyon qulfi ostida
+        if wallet is not None and amount is not None and wallet.balance + amount < 0:
+            raise forms.ValidationError('Insufficient balance')
+        return cleaned
+
+
 @admin.register(models.WalletTransaction)
 class WalletTransactionAdmin(admin.ModelAdmin):
+    form = WalletTransactionAdminForm
     list_display = ('wallet_user', 'transaction_type', 'amount', 'balance_after', 'course', 'course_type', 'created_at')
     list_filter = ('transaction_type', 'created_at')
     search_fields = ('wallet__user__username', 'description', 'course__title', 'course_type__name')
     readonly_fields = ('created_at', 'balance_after')
     autocomplete_fields = ('wallet', 'course', 'course_type', 'from_user', 'to_user', 'related_transaction')
-    
+
     def wallet_user(self, obj):
         return obj.wallet.user.username
     wallet_user.short_description = 'Foydalanuvchi'
 
+    def get_readonly_fields(self, request, obj=None):
+        # Yozilgan tranzaksiya o'zgarmaydi: tuzatish uchun teskari yozuv qo'shiladi
+        if obj is not None:
+            return [f.name for f in self.model._meta.fields]
+        return self.readonly_fields
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            ledger.post([obj])
+
 # admin.site.register(models.MovieComment, RatingAdmin)
 @admin.register(models.Banner)
 class BannerAdmin(admin.ModelAdmin):
     list_display = ("title", "position", "is_active")
 
+
+
+@admin.register(models.CourseDailyStat)
+class CourseDailyStatAdmin(admin.ModelAdmin):
+    list_display = ('course', 'day', 'progress_events', 'active_learners', 'video_test_attempts', 'purchases', 'revenue')
+    list_filter = ('day',)
+    search_fields = ('course__title',)
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(models.PendingCommission)
+class PendingCommissionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'amount', 'course', 'course_type', 'from_user', 'created_at', 'settled_at')
+    list_filter = ('settled_at',)
+    raw_id_fields = ('course', 'course_type', 'from_user', 'purchase_transaction', 'settlement')
+
+
+@admin.register(models.WalletCheckpoint)
+class WalletCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('wallet', 'balance', 'last_transaction_id', 'last_transaction_at', 'created_at')
+    raw_id_fields = ('wallet',)
+
+
+@admin.register(models.CourseEntitlement)
+class CourseEntitlementAdmin(admin.ModelAdmin):
+    list_display = ('user', 'course', 'course_type', 'created_at')
+    raw_id_fields = ('user', 'course', 'course_type', 'purchase_transaction')
+
+
+admin.site.register(models.RollupState)
+admin.site.register(models.TeacherDashboardSnapshot)
+admin.site.register(models.PlatformCounter)
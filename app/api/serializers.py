@@ -1,9 +1,12 @@
 from rest_framework import serializers
 from .. import models
 from collections import defaultdict
-from django.db.models import Avg, Max
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch
 from django.db.models.functions import Coalesce
 from django.urls import reverse
+from app.question_bank import bulk_create_questions, bulk_replace_options
+from app import entitlements
 
 class BannerSerializer(serializers.ModelSerializer):
     target_url = serializers.SerializerMethodField()
@@ -29,8 +32,15 @@ class CourseCategorySerializer(serializers.ModelSerializer):
         fields = ["id", "name", "slug", "description", 'category_img', 'category_banner', 'color', 'course_count']
 
     def get_course_count(self, obj):
+        # List view'larda annotate qilingan (course_category_list_qs)
+        if hasattr(obj, 'courses_total'):
+            return obj.courses_total
         return int(obj.courses.count())
 
+
+def course_category_list_qs(qs):
+    return qs.annotate(courses_total=Count('courses'))
+
 class LanguageSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Language
@@ -59,8 +69,7 @@ class MovieSerializer(serializers.ModelSerializer):
         return obj.files.count()
 
     def get_average_rating(self, obj):
-        avg = obj.ratings.aggregate(avg=Avg("value"))["avg"]
-        return round(avg, 1) if avg else None
+        return obj.average_rating
     
     def get_max_season(self, obj):
         return obj.files.aggregate(max_season=Max("season"))["max_season"] or 0
@@ -156,8 +165,7 @@ class ChannelCardSerializer(serializers.ModelSerializer):
         return obj.reels.count()
 
     def get_rating_avg(self, obj):
-        avg = obj.ratings.aggregate(avg=Avg('value'))['avg']
-        return round(avg, 1) if avg else None
+        return obj.average_rating
 
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
@@ -197,8 +205,7 @@ class ChannelDetailSerializer(serializers.ModelSerializer):
         return obj.reels.count()
 
     def get_rating_avg(self, obj):
-        avg = obj.ratings.aggregate(avg=Avg('value'))['avg']
-        return round(avg, 1) if avg else None
+        return obj.average_rating
 
     def get_username(self, obj):
         return getattr(obj.user, 'username', '')
@@ -232,8 +239,7 @@ class ChannelAboutSerializer(serializers.ModelSerializer):
         return obj.subscribers.count()
 
     def get_rating_avg(self, obj):
-        avg = obj.ratings.aggregate(avg=Avg('value'))['avg']
-        return round(avg, 1) if avg else None
+        return obj.average_rating
     
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
@@ -266,27 +272,25 @@ class CourseSerializer(serializers.ModelSerializer):
             'thumbnail', 'cover', 'channel', 'channel_info', 'categories', 'language', 'purchase_scope', 'is_purchased'
         )
         read_only_fields = (
-            'id', 'created_at', 'channel_info'
+            'id', 'created_at', 'channel_info',
+            # app.course_stats yuritadi
+            'students_count', 'rating_avg', 'rating_count', 'lessons_count', 'total_duration_minutes',
         )
 
     def get_is_purchased(self, obj):
+        # List view'lar butun sahifa uchun bitta so'rovda hisoblab context orqali beradi
+        purchased = self.context.get('purchased_course_ids')
+        if purchased is not None:
+            return obj.id in purchased
         request = self.context.get('request')
         user = getattr(request, 'user', None)
         if not user or not user.is_authenticated:
             return False
         scope = getattr(obj, 'purchase_scope', 'course')
         if scope == 'course':
-            return models.WalletTransaction.objects.filter(
-                wallet__user=user,
-                course=obj,
-                transaction_type='course_purchase'
-            ).exists()
+            return entitlements.owns_course(user, obj)
         # scope == 'course_type': any type purchase under this course counts
-        return models.WalletTransaction.objects.filter(
-            wallet__user=user,
-            course=obj,
-            transaction_type='course_type_purchase'
-        ).exists()
+        return entitlements.owns_any_course_type(user, obj)
 
 
 class CourseVideoProgressSerializer(serializers.ModelSerializer):
@@ -334,12 +338,9 @@ class CourseTypeTestSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         questions_data = validated_data.pop('questions', [])
-        test = models.CourseTypeTest.objects.create(**validated_data)
-        for q in questions_data:
-            options = q.pop('options', [])
-            question = models.CourseTypeTestQuestion.objects.create(test=test, **q)
-            for opt in options:
-                models.CourseTypeTestOption.objects.create(question=question, **opt)
+        with transaction.atomic():
+            test = models.CourseTypeTest.objects.create(**validated_data)
+            bulk_create_questions(test, questions_data, models.CourseTypeTestQuestion, models.CourseTypeTestOption)
         return test
 
 
@@ -426,10 +427,34 @@ class CourseTypeSerializer(serializers.ModelSerializer):
         )
 
     def get_total_course_videos(self, obj):
+        if hasattr(obj, 'course_videos_total'):
+            return obj.course_videos_total
         return models.CourseVideo.objects.filter(course_type=obj).count()
 
 
+def course_type_list_qs(qs):
+    return qs.annotate(course_videos_total=Count('coursevideo'))
+
+
+def course_video_list_qs(qs):
+    """CourseVideoSerializer uchun: kurs turi join, faol test/topshiriqlar bitta prefetch bilan."""
+    return qs.select_related('course_type').prefetch_related(
+        Prefetch(
+            'tests',
+            queryset=models.VideoTest.objects.filter(is_active=True).only('id', 'title', 'course_video_id').order_by('id'),
+            to_attr='active_tests',
+        ),
+        Prefetch(
+            'assignments',
+            queryset=models.VideoAssignment.objects.filter(is_active=True).only('id', 'title', 'course_video_id').order_by('id'),
+            to_attr='active_assignments',
+        ),
+    )
+
+
 class CourseVideoSerializer(serializers.ModelSerializer):
+    has_test = serializers.SerializerMethodField()
+    has_assignment = serializers.SerializerMethodField()
     tests_brief = serializers.SerializerMethodField()
     assignments_brief = serializers.SerializerMethodField()
     course_type_info = serializers.SerializerMethodField()
@@ -446,13 +471,32 @@ class CourseVideoSerializer(serializers.ModelSerializer):
             'tests_brief', 'assignments_brief', 'course_type_info'
         )
 
+    # active_tests / active_assignments: course_video_list_qs prefetch qilgan bo'lsa
+    def _active_tests(self, obj):
+        if hasattr(obj, 'active_tests'):
+            return obj.active_tests
+        return obj.tests.filter(is_active=True).only('id', 'title').order_by('id')
+
+    def _active_assignments(self, obj):
+        if hasattr(obj, 'active_assignments'):
+            return obj.active_assignments
+        return obj.assignments.filter(is_active=True).only('id', 'title').order_by('id')
+
+    def get_has_test(self, obj):
+        if hasattr(obj, 'active_tests'):
+            return bool(obj.active_tests)
+        return obj.has_test
+
+    def get_has_assignment(self, obj):
+        if hasattr(obj, 'active_assignments'):
+            return bool(obj.active_assignments)
+        return obj.has_assignment
+
     def get_tests_brief(self, obj):
-        qs = obj.tests.filter(is_active=True).only('id', 'title').order_by('id')
-        return [{'id': t.id, 'title': t.title} for t in qs]
+        return [{'id': t.id, 'title': t.title} for t in self._active_tests(obj)]
 
     def get_assignments_brief(self, obj):
-        qs = obj.assignments.filter(is_active=True).only('id', 'title').order_by('id')
-        return [{'id': a.id, 'title': a.title} for a in qs]
+        return [{'id': a.id, 'title': a.title} for a in self._active_assignments(obj)]
 
     def get_course_type_info(self, obj):
         ct = obj.course_type
@@ -484,20 +528,21 @@ class TestQuestionSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         options_data = validated_data.pop('options', [])
-        question = models.TestQuestion.objects.create(**validated_data)
-        for opt in options_data:
-            models.TestOption.objects.create(question=question, **opt)
+        with transaction.atomic():
+            question = models.TestQuestion.objects.create(**validated_data)
+            models.TestOption.objects.bulk_create(
+                [models.TestOption(question=question, **opt) for opt in options_data]
+            )
         return question
 
     def update(self, instance, validated_data):
         options_data = validated_data.pop('options', None)
-        for attr, val in validated_data.items():
-            setattr(instance, attr, val)
-        instance.save()
-        if options_data is not None:
-            instance.options.all().delete()
-            for opt in options_data:
-                models.TestOption.objects.create(question=instance, **opt)
+        with transaction.atomic():
+            for attr, val in validated_data.items():
+                setattr(instance, attr, val)
+            instance.save()
+            if options_data is not None:
+                bulk_replace_options(instance, options_data, models.TestOption)
         return instance
 
 
@@ -515,26 +560,20 @@ class VideoTestSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         questions_data = validated_data.pop('questions', [])
-        test = models.VideoTest.objects.create(**validated_data)
-        for q in questions_data:
-            options = q.pop('options', [])
-            question = models.TestQuestion.objects.create(test=test, **q)
-            for opt in options:
-                models.TestOption.objects.create(question=question, **opt)
+        with transaction.atomic():
+            test = models.VideoTest.objects.create(**validated_data)
+            bulk_create_questions(test, questions_data, models.TestQuestion, models.TestOption)
         return test
 
     def update(self, instance, validated_data):
         questions_data = validated_data.pop('questions', None)
-        for attr, val in validated_data.items():
-            setattr(instance, attr, val)
-        instance.save()
-        if questions_data is not None:
-            instance.questions.all().delete()
-            for q in questions_data:
-                options = q.pop('options', [])
-                question = models.TestQuestion.objects.create(test=instance, **q)
-                for opt in options:
-                    models.TestOption.objects.create(question=question, **opt)
+        with transaction.atomic():
+            for attr, val in validated_data.items():
+                setattr(instance, attr, val)
+            instance.save()
+            if questions_data is not None:
+                instance.questions.all().delete()
+                bulk_create_questions(instance, questions_data, models.TestQuestion, models.TestOption)
         return instance
 
 
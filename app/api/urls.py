@@ -60,12 +60,14 @@ urlpatterns = [
     path('tests/<int:test_id>/', views.StudentTestDetailAPIView.as_view(), name='student_test_detail'),
     path('tests/by-video/<int:video_id>/', views.StudentTestByVideoAPIView.as_view(), name='student_test_by_video'),
     path('tests/create/', views.CreateVideoTestAPIView.as_view(), name='create_video_test'),
+    path('tests/<int:test_id>/import/', views.ImportVideoTestQuestionsAPIView.as_view(), name='import_video_test_questions'),
     path('tests/<int:test_id>/results/', views.TestResultsListAPIView.as_view(), name='test_results'),
     path('tests/my-results/', views.MyTestResultsAPIView.as_view(), name='my_test_results'),
     path('tests/<int:test_id>/my-results/', views.MyTestResultsAPIView.as_view(), name='my_test_results_for_test'),
 
     # CourseType tests and assignments
     path('ct-tests/create/', views.CreateCourseTypeTestAPIView.as_view(), name='create_course_type_test'),
+    path('ct-tests/<int:test_id>/import/', views.ImportCourseTypeTestQuestionsAPIView.as_view(), name='import_course_type_test_questions'),
     path('ct-tests/by-type/<int:course_type_id>/', views.StudentCourseTypeTestByTypeAPIView.as_view(), name='student_course_type_test'),
     path('ct-tests/submit/', views.SubmitCourseTypeTestAPIView.as_view(), name='submit_course_type_test'),
     path('ct-tests/results/<int:result_id>/', views.CourseTypeTestResultDetailAPIView.as_view(), name='ct_test_result_detail'),
@@ -84,6 +86,7 @@ urlpatterns = [
     path('reel/<int:reel_id>/stream/', views.ReelStreamAPIView.as_view(), name='reel_stream'),
     path("reel/random-feed/", views.RandomReelFeedAPIView.as_view(), name="reel_random_feed"),
     path("reel/<int:reel_id>/comments/", views.CommentReelAPIView.as_view(), name="reel_comments"),
+    path("reel/<int:reel_id>/comments/<int:comment_id>/replies/", views.CommentReelRepliesAPIView.as_view(), name="reel_comment_replies"),
     path("reel/<int:reel_id>/like/", views.ReelLikeAPIView.as_view(), name="reel_like"),
     path("reel/<int:reel_id>/save/", views.ReelSaveAPIView.as_view(), name="reel_save"),
 
@@ -104,5 +107,6 @@ urlpatterns = [
     path('wallet/withdrawal/', wallet_views.WalletWithdrawalAPIView.as_view(), name='wallet_withdrawal'),
     path('wallet/purchase-course/', wallet_views.CoursePurchaseAPIView.as_view(), name='course_purchase'),
     path('wallet/purchase-course-type/', wallet_views.CourseTypePurchaseAPIView.as_view(), name='course_type_purchase'),
+    path('wallet/checkout/', wallet_views.CheckoutAPIView.as_view(), name='wallet_checkout'),
     path('wallet/stats/', wallet_views.WalletStatsAPIView.as_view(), name='wallet_stats'),
 ]
@@ -3,7 +3,7 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.core.files import File
@@ -19,6 +19,7 @@ from app.tasks import process_video_task, process_reel_task, process_course_vide
 from redis import Redis
 import random
 from app.pagination import *
+from app import comment_tree, entitlements, question_bank
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.http import FileResponse, Http404, HttpResponse
@@ -122,15 +123,47 @@ class MovieViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.MovieSerializer
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CoursePurchaseContextMixin:
+    """`is_purchased` for a whole page of courses in one query (serializer context)."""
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and args:
+            courses = list(args[0])
+            args = (courses,) + args[1:]
+            kwargs.setdefault('context', self.get_serializer_context())
+            kwargs['context']['purchased_course_ids'] = entitlements.purchased_course_ids(self.request.user, courses)
+        return super().get_serializer(*args, **kwargs)
+
+
+def course_list_context(request, courses):
+    return {
+        'request': request,
+        'purchased_course_ids': entitlements.purchased_course_ids(request.user, courses),
+    }
+
+
+class CourseViewSet(CoursePurchaseContextMixin, viewsets.ModelViewSet):
     queryset = models.Course.objects.all().order_by('-created_at')
     serializer_class = serializers.CourseSerializer
     pagination_class = CoursePagination
     lookup_field = "slug"
+    # ?ordering=popular|rating - saqlangan ustunlar (course_stats) va ularning indekslari bo'yicha
+    ORDERINGS = {
+        'popular': ('-students_count', '-created_at'),
+        'rating': ('-rating_avg', '-rating_count'),
+        'newest': ('-created_at',),
+    }
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        ordering = self.ORDERINGS.get(self.request.query_params.get('ordering'))
+        if ordering and self.action == 'list':
+            qs = qs.order_by(*ordering, 'id')
+        return qs
 
 
 class CourseTypeViewSet(viewsets.ModelViewSet):
-    queryset = models.CourseType.objects.all()
+    queryset = serializers.course_type_list_qs(models.CourseType.objects.all())
     serializer_class = serializers.CourseTypeSerializer
     pagination_class = CustomPagination
     lookup_field = "slug"
@@ -163,6 +196,13 @@ class ChannelViewSet(viewsets.ModelViewSet):
     lookup_field = "slug"
     pagination_class = ChannelPagination
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        # ?ordering=rating - saqlangan reyting (top rated indeksi)
+        if self.action == 'list' and self.request.query_params.get('ordering') == 'rating':
+            qs = qs.order_by('-rating_avg', '-rating_count', '-id')
+        return qs
+
     def get_serializer_class(self):
         if self.action == 'list':
             return serializers.ChannelCardSerializer
@@ -181,7 +221,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
 class CourseVideoViewSet(viewsets.ModelViewSet):
     pagination_class = CustomPagination
-    queryset = models.CourseVideo.objects.all().order_by('course_id', 'order')
+    queryset = serializers.course_video_list_qs(models.CourseVideo.objects.all().order_by('course_id', 'order'))
     serializer_class = serializers.CourseVideoSerializer
 
 
@@ -216,7 +256,7 @@ class AssignmentSubmissionViewSet(viewsets.ModelViewSet):
     serializer_class = serializers.AssignmentSubmissionSerializer
 
 class CourseCategoryViewSet(viewsets.ModelViewSet):
-    queryset = models.CourseCategory.objects.all().order_by('name')
+    queryset = serializers.course_category_list_qs(models.CourseCategory.objects.all().order_by('name'))
     serializer_class = serializers.CourseCategorySerializer
     lookup_field = "slug"
 
@@ -251,7 +291,11 @@ class MovieListAPIView(generics.ListAPIView):
     pagination_class = MoviePagination
 
     def get_queryset(self):
-        return models.Movie.objects.filter(is_published=True).order_by("-created_at")
+        qs = models.Movie.objects.filter(is_published=True)
+        # ?ordering=rating - saqlangan reyting (top rated indeksi)
+        if self.request.query_params.get('ordering') == 'rating':
+            return qs.order_by('-rating_avg', '-rating_count', '-id')
+        return qs.order_by("-created_at")
 
 # Category bo‘yicha filterlangan ro‘yxat
 class MovieByCategoryAPIView(generics.ListAPIView):
@@ -277,10 +321,11 @@ class MovieDetailAPIView(generics.RetrieveAPIView):
 # ----------------------------
 class CourseHomepageListView(APIView):
     def get(self, request, format=None):
+        course_list = list(models.Course.objects.all().order_by('-created_at')[:6])
         courses = serializers.CourseSerializer(
-            models.Course.objects.all().order_by('-created_at')[:6],
+            course_list,
             many=True,
-            context={'request': request}
+            context=course_list_context(request, course_list)
         ).data
         return Response({'courses': courses}, status=status.HTTP_200_OK)
 
@@ -290,7 +335,7 @@ class CourseTypeAPIView(generics.ListAPIView):
 
     def get_queryset(self):
         course_slug = self.kwargs["course_slug"]
-        return models.CourseType.objects.filter(course__slug=course_slug).order_by('id')
+        return serializers.course_type_list_qs(models.CourseType.objects.filter(course__slug=course_slug).order_by('id'))
 
     def list(self, request, *args, **kwargs):
         qs = self.get_queryset()
@@ -302,10 +347,9 @@ class CourseTypeAPIView(generics.ListAPIView):
 
         # Collect all videos grouped by type
         course = get_object_or_404(models.Course, slug=self.kwargs["course_slug"])
-        vids_by_type = {
-            ct.id: list(models.CourseVideo.objects.filter(course=course, course_type=ct).only('id'))
-            for ct in types
-        }
+        vids_by_type = {ct.id: [] for ct in types}
+        for video in models.CourseVideo.objects.filter(course=course, course_type__in=types).only('id', 'course_type_id'):
+            vids_by_type[video.course_type_id].append(video)
         all_video_ids = [v.id for vids in vids_by_type.values() for v in vids]
 
         # Determine purchases for the authenticated user based on purchase scope
@@ -316,21 +360,13 @@ class CourseTypeAPIView(generics.ListAPIView):
             try:
                 if scope == 'course':
                     # Only full course purchases are relevant
-                    purchased_full_course = models.WalletTransaction.objects.filter(
-                        wallet__user=user,
-                        course=course,
-                        transaction_type='course_purchase'
-                    ).exists()
+                    purchased_full_course = entitlements.owns_course(user, course)
                     purchased_type_ids = set()
                 else:
                     # Scope is 'course_type' → only per-type purchases are relevant
                     purchased_full_course = False
-                    type_ids = [ct.id for ct in types]
-                    purchased_type_ids = set(models.WalletTransaction.objects.filter(
-                        wallet__user=user,
-                        transaction_type='course_type_purchase',
-                        course_type_id__in=type_ids
-                    ).values_list('course_type_id', flat=True))
+                    owned = entitlements.owned(user, course_type_ids=[ct.id for ct in types])
+                    purchased_type_ids = {pk for _, pk in owned}
             except Exception:
                 purchased_full_course = False
                 purchased_type_ids = set()
@@ -454,7 +490,7 @@ class CourseTypeAPIView(generics.ListAPIView):
         return Response(data)
 
 # List courses by CourseCategory slug
-class CourseByCourseCategoryAPIView(generics.ListAPIView):
+class CourseByCourseCategoryAPIView(CoursePurchaseContextMixin, generics.ListAPIView):
     serializer_class = serializers.CourseSerializer
     pagination_class = CoursePagination
 
@@ -469,7 +505,7 @@ class CourseVideosByCourseSlugAPIView(generics.ListAPIView):
 
     def get_queryset(self):
         course_slug = self.kwargs["course_slug"]
-        return models.CourseVideo.objects.filter(course__slug=course_slug).order_by('order', 'created_at')
+        return serializers.course_video_list_qs(models.CourseVideo.objects.filter(course__slug=course_slug).order_by('order', 'created_at'))
 
 class CourseVideosByCourseSlugAndCourseTypeAPIView(generics.ListAPIView):
     serializer_class = serializers.CourseVideoSerializer
@@ -478,7 +514,9 @@ class CourseVideosByCourseSlugAndCourseTypeAPIView(generics.ListAPIView):
     def get_queryset(self):
         course_slug = self.kwargs["course_slug"]
         course_type_slug = self.kwargs["course_type_slug"]
-        return models.CourseVideo.objects.filter(course__slug=course_slug, course_type__slug=course_type_slug).order_by('order', 'created_at')
+        return serializers.course_video_list_qs(
+            models.CourseVideo.objects.filter(course__slug=course_slug, course_type__slug=course_type_slug).order_by('order', 'created_at')
+        )
 
     def list(self, request, *args, **kwargs):
         qs = self.get_queryset()
@@ -810,6 +848,18 @@ class CreateCourseTypeTestAPIView(APIView):
         return Response({"id": obj.id}, status=201)
 
 
+class ImportCourseTypeTestQuestionsAPIView(APIView):
+    """Bulk import questions into a CourseTypeTest (validated in memory, one transaction)."""
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def post(self, request, test_id):
+        test = get_object_or_404(
+            models.CourseTypeTest.objects.select_related('course_type__course__channel'), id=test_id
+        )
+        return _import_question_bank(request, 'course_type', test, getattr(test.course_type.course.channel, 'user_id', None))
+
+
 class StudentCourseTypeTestByTypeAPIView(APIView):
     permission_classes = [AllowAny]
 
@@ -1001,7 +1051,8 @@ def homepage(request):
     # return hero banners, featured movies, featured courses, reels, channels
     banners = serializers.BannerSerializer(models.Banner.objects.filter(is_active=True).order_by('position', 'order')[:10], many=True, context={'request': request}).data
     movies = serializers.MovieSerializer(models.Movie.objects.filter(is_published=True).order_by('-created_at')[:8], many=True, context={'request': request}).data
-    courses = serializers.CourseSerializer(models.Course.objects.all().order_by('-created_at')[:6], many=True, context={'request': request}).data
+    course_list = list(models.Course.objects.all().order_by('-created_at')[:6])
+    courses = serializers.CourseSerializer(course_list, many=True, context=course_list_context(request, course_list)).data
     reels = serializers.ReelSerializer(models.Reel.objects.all().order_by('-created_at')[:6], many=True, context={'request': request}).data
     channels = serializers.ChannelSerializer(models.Channel.objects.all().order_by('-created_at')[:8], many=True, context={'request': request}).data
 
@@ -1256,14 +1307,7 @@ def _user_has_access_to_course_video(user, cv: models.CourseVideo) -> bool:
         return True
 
     # Accept either course_purchase or course_type_purchase for this course
-    tx_qs = models.WalletTransaction.objects.filter(wallet__user=user, course=cv.course)
-    if tx_qs.filter(transaction_type='course_purchase').exists():
-        return True
-    if cv.course_type and models.WalletTransaction.objects.filter(
-        wallet__user=user, course=cv.course, course_type=cv.course_type, transaction_type='course_type_purchase'
-    ).exists():
-        return True
-    return False
+    return entitlements.can_watch(user, cv.course, cv.course_type)
 
 
 class SecureCourseVideoPlaylistAPIView(APIView):
@@ -1515,6 +1559,38 @@ class CreateVideoTestAPIView(APIView):
         return Response({"id": obj.id}, status=201)
 
 
+def _import_question_bank(request, kind, test, owner_id):
+    """Shared body for question bank import views (JSON body or .json/.csv upload)."""
+    if getattr(request.user, 'role', 'user') not in ["teacher", "admin", "director"] and not request.user.is_superuser:
+        return Response({"detail": "Permission denied"}, status=403)
+    if getattr(request.user, 'role', 'user') == 'teacher' and not request.user.is_superuser and owner_id != request.user.id:
+        return Response({"detail": "Permission denied"}, status=403)
+
+    replace = str(request.data.get('replace', '')).lower() in ('1', 'true', 'yes')
+    try:
+        upload = request.FILES.get('file')
+        if upload is not None:
+            raw_questions = question_bank.load_file(upload, fmt=request.data.get('format'))
+        else:
+            raw_questions = request.data.get('questions')
+        summary = question_bank.import_questions(kind, test, raw_questions, replace=replace)
+    except question_bank.QuestionBankError as e:
+        return Response({"errors": e.errors}, status=400)
+    return Response(summary, status=201)
+
+
+class ImportVideoTestQuestionsAPIView(APIView):
+    """Bulk import questions into a VideoTest (validated in memory, one transaction)."""
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def post(self, request, test_id):
+        test = get_object_or_404(
+            models.VideoTest.objects.select_related('course_video__course__channel'), id=test_id
+        )
+        return _import_question_bank(request, 'video', test, getattr(test.course_video.course.channel, 'user_id', None))
+
+
 class CreateVideoAssignmentAPIView(APIView):
     """Teacher creates an assignment for a CourseVideo."""
     permission_classes = [IsAuthenticated]
@@ -1872,6 +1948,14 @@ class RandomReelFeedAPIView(APIView):
         response.data["seed"] = seed
         return response
 
+def _reply_limit(request):
+    try:
+        limit = int(request.query_params.get("replies"))
+    except (TypeError, ValueError):
+        return None
+    return max(limit, 0)
+
+
 class CommentReelAPIView(APIView):
     # def get_permissions(self):
     #     if self.request.method == "POST":
@@ -1883,27 +1967,13 @@ class CommentReelAPIView(APIView):
         reel = get_object_or_404(models.Reel, id=reel_id)
         comments = models.ReelComment.objects.filter(
             reel=reel, parent__isnull=True
-        ).order_by("-created_at")
+        ).select_related("user").order_by("-created_at")
 
         paginator = CommentPagination()
         page = paginator.paginate_queryset(comments, request)
-
-        def serialize_comment(comment):
-            return {
-                "id": comment.id,
-                "user": {
-                    "username": comment.user.username if comment.user else "Anonymous",
-                    "avatar": comment.user.avatar.url if comment.user and comment.user.avatar else None,
-                },
-                "text": comment.text,
-                "created_at": comment.created_at,
-                "replies": [
-                    serialize_comment(reply)
-                    for reply in comment.replies.all().order_by("created_at")
-                ],
-            }
-
-        data = [serialize_comment(c) for c in page]
+        # Sahifadagi barcha javoblar bitta so'rovda; ?replies=N - har bir izohda birinchi N ta javob
+        comment_tree.load_replies(models.ReelComment, page, reply_limit=_reply_limit(request))
+        data = [comment_tree.serialize(c) for c in page]
         return paginator.get_paginated_response(data)
 
     def post(self, request, reel_id):
@@ -1943,6 +2013,21 @@ class CommentReelAPIView(APIView):
         )
 
 
+class CommentReelRepliesAPIView(APIView):
+    """Bitta izohning javoblari sahifalab (daraxtdagi "yana javoblar" ni ochish)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, reel_id, comment_id):
+        comment = get_object_or_404(models.ReelComment, id=comment_id, reel_id=reel_id)
+        replies = comment.replies.select_related("user").order_by("path")
+
+        paginator = CommentPagination()
+        page = paginator.paginate_queryset(replies, request)
+        comment_tree.load_replies(models.ReelComment, page, reply_limit=_reply_limit(request))
+        data = [comment_tree.serialize(c) for c in page]
+        return paginator.get_paginated_response(data)
+
+
 class ReelLikeAPIView(APIView):
     permission_classes = [IsAuthenticated]  # faqat login user like qila oladi
 
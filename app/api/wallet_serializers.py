@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from app import models
+from app import models, promos
 from decimal import Decimal
 
 
@@ -77,17 +77,12 @@ class CoursePurchaseSerializer(serializers.Serializer):
     def validate(self, attrs):
         code = attrs.get('promo_code')
         if code:
-            try:
-                promo = models.PromoCode.objects.get(code=code)
-            except models.PromoCode.DoesNotExist:
-                raise serializers.ValidationError({"promo_code": "Promo code not found"})
-            if not promo.is_valid_now:
-                raise serializers.ValidationError({"promo_code": "Promo code is not valid now"})
-            # Scope check: course must be allowed if promo has restrictions
+            # Keshlangan promokod qoidalari (app.promos); ishlatish limiti xaridda band qilinadi
             course = models.Course.objects.get(id=attrs['course_id'])
-            if promo.courses.exists() and not promo.courses.filter(id=course.id).exists():
-                raise serializers.ValidationError({"promo_code": "Promo not applicable to this course"})
-            attrs['__promo'] = promo
+            try:
+                attrs['__promo'] = promos.validate(code, course)
+            except promos.PromoError as e:
+                raise serializers.ValidationError({"promo_code": str(e)})
         return attrs
 
 
@@ -114,22 +109,37 @@ class CourseTypePurchaseSerializer(serializers.Serializer):
     def validate(self, attrs):
         code = attrs.get('promo_code')
         if code:
-            try:
-                promo = models.PromoCode.objects.get(code=code)
-            except models.PromoCode.DoesNotExist:
-                raise serializers.ValidationError({"promo_code": "Promo code not found"})
-            if not promo.is_valid_now:
-                raise serializers.ValidationError({"promo_code": "Promo code is not valid now"})
             ct = models.CourseType.objects.select_related('course').get(id=attrs['course_type_id'])
-            # Restriction checks
-            if promo.course_types.exists() and not promo.course_types.filter(id=ct.id).exists():
-                raise serializers.ValidationError({"promo_code": "Promo not applicable to this course type"})
-            if promo.courses.exists() and not promo.courses.filter(id=ct.course.id).exists():
-                raise serializers.ValidationError({"promo_code": "Promo not applicable to this course"})
-            attrs['__promo'] = promo
+            try:
+                attrs['__promo'] = promos.validate(code, ct.course, ct)
+            except promos.PromoError as e:
+                raise serializers.ValidationError({"promo_code": str(e)})
+        return attrs
+
+
+class CheckoutItemSerializer(serializers.Serializer):
+    """Savatdagi bitta element: kurs yoki kurs turi."""
+    course_id = serializers.IntegerField(required=False)
+    course_type_id = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if bool(attrs.get('course_id')) == bool(attrs.get('course_type_id')):
+            raise serializers.ValidationError("Exactly one of course_id or course_type_id is required")
         return attrs
 
 
+class CheckoutSerializer(serializers.Serializer):
+    """Bir nechta kurs / kurs turini bitta xaridda sotib olish."""
+    items = CheckoutItemSerializer(many=True, allow_empty=False)
+    promo_code = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_items(self, value):
+        from app.checkout import MAX_CART_ITEMS
+        if len(value) > MAX_CART_ITEMS:
+            raise serializers.ValidationError(f"Too many items (max: {MAX_CART_ITEMS})")
+        return value
+
+
 class WalletStatsSerializer(serializers.Serializer):
     """Hamyon statistikasi uchun."""
     balance = serializers.DecimalField(max_digits=15, decimal_places=2)
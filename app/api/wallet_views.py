@@ -4,16 +4,29 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum, Q
-from decimal import Decimal
 
-from app import models
+from app import checkout, entitlements, models
+from app.pagination import WalletTransactionPagination
 from .wallet_serializers import (
     WalletSerializer, WalletTransactionSerializer, DepositSerializer,
-    WithdrawalSerializer, CoursePurchaseSerializer, WalletStatsSerializer
+    WithdrawalSerializer, CoursePurchaseSerializer, WalletStatsSerializer, CheckoutSerializer
 )
 
 
+def wallet_transactions_queryset(user):
+    """`user` hamyonidagi tranzaksiyalar, serializer o'qiydigan bog'lanishlar bilan.
+
+    Hamyon id si oldindan olinadi: `wallet_id = ...` filtri (wallet_id, created_at, id)
+    indeksidan o'qiladi, `wallet__user` JOIN esa uni ishlatmaydi.
+    """
+    wallet_id = models.Wallet.objects.filter(user=user).values_list('pk', flat=True).first()
+    if wallet_id is None:
+        return models.WalletTransaction.objects.none()
+    return models.WalletTransaction.objects.filter(wallet_id=wallet_id).select_related(
+        'wallet__user', 'course', 'course_type', 'from_user', 'to_user', 'promo_code'
+    )
+
+
 class WalletDetailAPIView(APIView):
     """Foydalanuvchining hamyon ma'lumotlari."""
     permission_classes = [IsAuthenticated]
@@ -25,27 +38,26 @@ class WalletDetailAPIView(APIView):
 
 
 class WalletTransactionsAPIView(APIView):
-    """Foydalanuvchining tranzaksiyalar tarixi."""
+    """Foydalanuvchining tranzaksiyalar tarixi (cursor pagination, eng yangisi birinchi)."""
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        wallet, created = models.Wallet.objects.get_or_create(user=request.user)
-        transactions = models.WalletTransaction.objects.filter(wallet=wallet).order_by('-created_at')
+        # Hamyon yaratilmaydi: hamyoni yo'q foydalanuvchi uchun ro'yxat shunchaki bo'sh
+        transactions = wallet_transactions_queryset(request.user)
         
         # Filtrlash
         transaction_type = request.query_params.get('type')
         if transaction_type:
             transactions = transactions.filter(transaction_type=transaction_type)
         
-        # Pagination (oddiy)
-        limit = int(request.query_params.get('limit', 20))
-        offset = int(request.query_params.get('offset', 0))
-        transactions = transactions[offset:offset + limit]
-        
-        serializer = WalletTransactionSerializer(transactions, many=True)
+        paginator = WalletTransactionPagination()
+        page = paginator.paginate_queryset(transactions, request, view=self)
+        serializer = WalletTransactionSerializer(page, many=True)
         return Response({
             'transactions': serializer.data,
-            'count': len(serializer.data)
+            'count': len(serializer.data),
+            'next': paginator.get_next_link(),
+            'next_cursor': paginator.next_cursor,
         })
 
 
@@ -132,11 +144,7 @@ class CoursePurchaseAPIView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Check if already purchased
-        existing_purchase = models.WalletTransaction.objects.filter(
-            wallet__user=request.user,
-            course=course,
-            transaction_type='course_purchase'
-        ).exists()
+        existing_purchase = entitlements.owns_course(request.user, course)
         
         if existing_purchase:
             return Response({
@@ -148,16 +156,7 @@ class CoursePurchaseAPIView(APIView):
             seller_user = course.channel.user
             # Pricing with promo
             original_amount = course.price
-            discount_amount = 0
-            if promo:
-                if promo.discount_type == 'percent':
-                    discount_amount = (original_amount * promo.value) / Decimal('100')
-                else:  # coins
-                    discount_amount = promo.value
-                if discount_amount < 0:
-                    discount_amount = Decimal('0')
-                if discount_amount > original_amount:
-                    discount_amount = original_amount
+            discount_amount = promo.discount(original_amount) if promo else 0
             final_amount = original_amount - discount_amount
             # Process payment
             buyer_transaction, seller_transaction = models.Wallet.transfer_for_course_purchase(
@@ -219,11 +218,7 @@ class CourseTypePurchaseAPIView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Check if already purchased this course type
-        existing_purchase = models.WalletTransaction.objects.filter(
-            wallet__user=request.user,
-            course_type=course_type,
-            transaction_type='course_type_purchase'
-        ).exists()
+        existing_purchase = entitlements.owns_course_type(request.user, course_type)
         
         if existing_purchase:
             return Response({
@@ -239,16 +234,7 @@ class CourseTypePurchaseAPIView(APIView):
             
             # Process payment
             original_amount = price
-            discount_amount = 0
-            if promo:
-                if promo.discount_type == 'percent':
-                    discount_amount = (original_amount * promo.value) / Decimal('100')
-                else:
-                    discount_amount = promo.value
-                if discount_amount < 0:
-                    discount_amount = Decimal('0')
-                if discount_amount > original_amount:
-                    discount_amount = original_amount
+            discount_amount = promo.discount(original_amount) if promo else 0
             final_amount = original_amount - discount_amount
             buyer_transaction, seller_transaction = models.Wallet.transfer_for_course_purchase(
                 buyer_user=request.user,
@@ -287,34 +273,77 @@ class CourseTypePurchaseAPIView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CheckoutAPIView(APIView):
+    """Savatdagi kurslar va kurs turlarini bitta tranzaksiyada sotib olish."""
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        serializer = CheckoutSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            result = checkout.checkout(
+                request.user,
+                serializer.validated_data['items'],
+                serializer.validated_data.get('promo_code'),
+            )
+        except checkout.CheckoutError as e:
+            return Response({
+                'success': False,
+                'error': 'Savatni rasmiylashtirib bo\'lmadi',
+                'errors': e.errors,
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        items = []
+        for line, tx in zip(result['lines'], result['transactions']):
+            course, course_type = line['course'], line['course_type']
+            items.append({
+                'purchase_type': 'course_type' if course_type else 'full_course',
+                'course_id': course.id,
+                'course_title': course.title,
+                'course_type_id': course_type.id if course_type else None,
+                'course_type_name': course_type.name if course_type else None,
+                'price': str(line['price']),
+                'discount': str(line['discount']),
+                'paid_amount': str(line['amount']),
+                'transaction_id': tx.id,
+            })
+        promo = result['promo']
+        return Response({
+            'success': True,
+            'message': f"{len(items)} ta xarid muvaffaqiyatli amalga oshirildi",
+            'items': items,
+            'total_price': str(sum(l['price'] for l in result['lines'])),
+            'total_discount': str(sum(l['discount'] for l in result['lines'])),
+            'total_paid': str(sum(l['amount'] for l in result['lines'])),
+            'promo_code': promo.code if promo else None,
+            'new_balance': result['balance'],
+        }, status=status.HTTP_200_OK)
+
+
 class WalletStatsAPIView(APIView):
     """Hamyon statistikasi."""
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
         wallet, created = models.Wallet.objects.get_or_create(user=request.user)
-        transactions = models.WalletTransaction.objects.filter(wallet=wallet)
-        
-        # Statistikalar
-        total_income = transactions.filter(amount__gt=0).aggregate(
-            total=Sum('amount'))['total'] or Decimal('0.00')
-        total_expense = abs(transactions.filter(amount__lt=0).aggregate(
-            total=Sum('amount'))['total'] or Decimal('0.00'))
-        
-        courses_purchased = transactions.filter(transaction_type='course_purchase').count()
-        courses_sold = transactions.filter(transaction_type='course_earning').count()
-        
-        last_transaction = transactions.first()
-        last_transaction_date = last_transaction.created_at if last_transaction else None
         
+        # Statistikalar hamyon qatoridagi running totallardan (ledger.post yangilaydi)
+        stats = wallet.get_stats()
         stats_data = {
             'balance': wallet.balance,
-            'total_income': total_income,
-            'total_expense': total_expense,
-            'transactions_count': transactions.count(),
-            'courses_purchased': courses_purchased,
-            'courses_sold': courses_sold,
-            'last_transaction_date': last_transaction_date
+            'total_income': stats['total_income'],
+            'total_expense': stats['total_expense'],
+            'transactions_count': stats['transactions_count'],
+            'courses_purchased': stats['courses_purchased'],
+            'courses_sold': stats['courses_sold'],
+            'last_transaction_date': stats['last_transaction_at']
         }
         
         serializer = WalletStatsSerializer(stats_data)
@@ -337,6 +366,6 @@ def wallet_balance(request):
         'debug': {
             'wallet_id': wallet.id,
             'user': wallet.user.username,
-            'transactions_count': wallet.transactions.count()
+            'transactions_count': wallet.get_stats()['transactions_count']
         }
     })
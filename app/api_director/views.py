@@ -1,12 +1,15 @@
 from datetime import datetime
-from django.db.models import Count, Sum, Q
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from app import models
+from app import ledger_export, models, platform_counters
+from app.api import serializers as public_serializers
+from app.api.views import CoursePurchaseContextMixin
+from app.pagination import KeysetPagination
 from . import serializers as s
 
 
@@ -19,7 +22,7 @@ class IsDirectorOrAdmin(IsAuthenticated):
 
 
 # Moderation: Course
-class CourseModerationViewSet(viewsets.ModelViewSet):
+class CourseModerationViewSet(CoursePurchaseContextMixin, viewsets.ModelViewSet):
     queryset = models.Course.objects.all().order_by('-created_at')
     serializer_class = s.CourseModerationSerializer
     permission_classes = [IsDirectorOrAdmin]
@@ -61,7 +64,7 @@ class CourseModerationViewSet(viewsets.ModelViewSet):
 
 # Moderation: CourseType
 class CourseTypeModerationViewSet(viewsets.ModelViewSet):
-    queryset = models.CourseType.objects.all()
+    queryset = public_serializers.course_type_list_qs(models.CourseType.objects.all())
     serializer_class = s.CourseTypeModerationSerializer
     permission_classes = [IsDirectorOrAdmin]
     lookup_field = 'slug'
@@ -116,7 +119,7 @@ class CourseTypeModerationViewSet(viewsets.ModelViewSet):
 
 # Moderation: CourseVideo
 class CourseVideoModerationViewSet(viewsets.ModelViewSet):
-    queryset = models.CourseVideo.objects.select_related('course').all().order_by('course_id', 'order')
+    queryset = public_serializers.course_video_list_qs(models.CourseVideo.objects.select_related('course').all().order_by('course_id', 'order'))
     serializer_class = s.CourseVideoModerationSerializer
     permission_classes = [IsDirectorOrAdmin]
 
@@ -176,7 +179,7 @@ class ChannelAdminViewSet(viewsets.ModelViewSet):
 
 # CourseCategory management
 class CourseCategoryAdminViewSet(viewsets.ModelViewSet):
-    queryset = models.CourseCategory.objects.all().order_by('name')
+    queryset = public_serializers.course_category_list_qs(models.CourseCategory.objects.all().order_by('name'))
     serializer_class = s.CourseCategorySerializer
     permission_classes = [IsDirectorOrAdmin]
     lookup_field = 'slug'
@@ -257,9 +260,12 @@ class RoleUsersViewSet(viewsets.ReadOnlyModelViewSet):
 
 # Transactions listing
 class WalletTransactionAdminViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = models.WalletTransaction.objects.select_related('wallet', 'course', 'course_type').all()
+    queryset = models.WalletTransaction.objects.select_related(
+        'wallet__user', 'course', 'course_type', 'from_user', 'to_user', 'promo_code'
+    ).all()
     serializer_class = s.WalletTxSerializer
     permission_classes = [IsDirectorOrAdmin]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -280,7 +286,30 @@ class WalletTransactionAdminViewSet(viewsets.ReadOnlyModelViewSet):
                 qs = qs.filter(created_at__lte=end)
             except Exception:
                 pass
-        return qs.order_by('-created_at')
+        return qs.order_by('-created_at', '-id')
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """Filtrlangan ledgerni CSV (default) yoki NDJSON sifatida stream qilish.
+
+        Qatorlar server-side cursor (`iterator()`) bilan o'qiladi, xotira
+        ishlatilishi ledger hajmiga bog'liq emas.
+        """
+        fmt = request.query_params.get('fmt', 'csv').lower()
+        if fmt not in ('csv', 'ndjson'):
+            return Response({'detail': "fmt must be 'csv' or 'ndjson'"}, status=status.HTTP_400_BAD_REQUEST)
+        rows = (
+            self.get_queryset().select_related(None)
+            .values_list(*ledger_export.EXPORT_FIELDS)
+            .iterator(chunk_size=ledger_export.EXPORT_CHUNK_SIZE)
+        )
+        stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+        if fmt == 'ndjson':
+            response = StreamingHttpResponse(ledger_export.ndjson_lines(rows), content_type='application/x-ndjson')
+        else:
+            response = StreamingHttpResponse(ledger_export.csv_lines(rows), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="transactions-{stamp}.{fmt}"'
+        return response
 
 
 # Reports overview
@@ -288,34 +317,12 @@ class ReportsOverviewViewSet(viewsets.ViewSet):
     permission_classes = [IsDirectorOrAdmin]
 
     def list(self, request):
-        users_by_role = models.User.objects.values('role').annotate(count=Count('id'))
-        courses_total = models.Course.objects.count()
-        courses_active = models.Course.objects.filter(is_active=True).count()
-        videos_total = models.CourseVideo.objects.count()
-        videos_active = models.CourseVideo.objects.filter(is_active=True).count()
-        channels_total = models.Channel.objects.count()
-        channels_verified = models.Channel.objects.filter(verified=True).count()
-
-        tx = models.WalletTransaction.objects
-        income = tx.filter(amount__gt=0).aggregate(total=Sum('amount'))['total'] or 0
-        expense = tx.filter(amount__lt=0).aggregate(total=Sum('amount'))['total'] or 0
-        tx_count = tx.count()
-        tx_by_type = list(tx.values('transaction_type').annotate(count=Count('id')).order_by('transaction_type'))
-        last_tx = tx.order_by('-created_at').values('id', 'transaction_type', 'amount', 'created_at').first()
-
-        data = {
-            'users_by_role': list(users_by_role),
-            'courses': {'total': courses_total, 'active': courses_active},
-            'videos': {'total': videos_total, 'active': videos_active},
-            'channels': {'total': channels_total, 'verified': channels_verified},
-            'wallet': {
-                'total_income': str(income),
-                'total_expense': str(expense),
-                'transactions_count': tx_count,
-                'by_type': tx_by_type,
-                'last_transaction': last_tx,
-            }
-        }
+        # Hisoblagichlar PlatformCounter jadvalidan bitta so'rovda o'qiladi
+        data = platform_counters.overview()
+        data['wallet']['last_transaction'] = (
+            models.WalletTransaction.objects.order_by('-created_at')
+            .values('id', 'transaction_type', 'amount', 'created_at').first()
+        )
         return Response(data)
 
 
@@ -0,0 +1,156 @@
+"""Grouped aggregate helpers for teacher dashboards.
+
+Every helper runs a fixed number of `GROUP BY` queries, so the cost of an
+endpoint does not grow with the number of tests/courses a teacher owns.
+Results are joined in Python by id. Per-teacher course metrics are served
+from precomputed snapshots (see `dashboard.py`): a stale snapshot is returned
+immediately while a debounced Celery task rebuilds it, so the snapshot store
+is the stale-while-revalidate cache for these metrics (there is no separate
+Redis payload cache any more).
+"""
+from django.db.models import Count, Avg, Q, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from app import models
+
+
+def test_result_stats(results_qs):
+    """Per-test attempts, distinct students, passes and average score.
+
+    `results_qs` is a TestResult/CourseTypeTestResult queryset; one query
+    grouped by test_id. Returns {test_id: {...}}.
+    """
+    rows = (
+        results_qs.order_by()
+        .values('test_id')
+        .annotate(
+            attempts=Count('id'),
+            students=Count('user', distinct=True),
+            passed=Count('id', filter=Q(score__gte=F('test__pass_score'))),
+            avg_score=Avg('score'),
+        )
+    )
+    return {r['test_id']: r for r in rows}
+
+
+def result_totals(results_qs):
+    """Same metrics as `test_result_stats` but for the whole queryset (one query)."""
+    return results_qs.order_by().aggregate(
+        attempts=Count('id'),
+        students=Count('user', distinct=True),
+        passed=Count('id', filter=Q(score__gte=F('test__pass_score'))),
+        avg_score=Avg('score'),
+    )
+
+
+def combine_stats(stats):
+    """Fold several per-test stat rows into attempts/passed/avg_score (weighted by attempts)."""
+    attempts = passed = 0
+    score_sum = 0.0
+    for s in stats:
+        attempts += s['attempts']
+        passed += s['passed']
+        score_sum += (s['avg_score'] or 0) * s['attempts']
+    return {
+        'attempts': attempts,
+        'passed': passed,
+        'avg_score': (score_sum / attempts) if attempts else None,
+    }
+
+
+def pass_rate(passed, attempts):
+    return round((passed / attempts) * 100.0, 2) if attempts else 0.0
+
+
+def user_subquery(qs, user_field, aggregate, default=None):
+    """Correlated per-user aggregate of `qs` (for annotating/sorting a User queryset)."""
+    sub = (
+        qs.filter(**{user_field: OuterRef('pk')})
+        .order_by()
+        .values(user_field)
+        .annotate(v=aggregate)
+        .values('v')[:1]
+    )
+    expr = Subquery(sub)
+    return Coalesce(expr, default) if default is not None else expr
+
+
+def grouped_by_user(qs, user_field, user_ids, **aggregates):
+    """{user_id: {...aggregates}} for `user_ids`, one GROUP BY query."""
+    if not user_ids:
+        return {}
+    rows = (
+        qs.filter(**{f'{user_field}__in': user_ids})
+        .order_by()
+        .values(user_field)
+        .annotate(**aggregates)
+    )
+    return {r.pop(user_field): r for r in rows}
+
+
+# =============================
+# Per-teacher course metrics (served via dashboard snapshots)
+# =============================
+
+
+def _counts_by(qs, course_field, **aggregates):
+    aggregates = aggregates or {'n': Count('id')}
+    rows = qs.order_by().values(course_field).annotate(**aggregates)
+    return {r.pop(course_field): r for r in rows}
+
+
+def compute_teacher_analytics(user):
+    """Per-course counts and the overview for `user`'s channels.
+
+    Each metric is one grouped query keyed by course_id (about ten queries in
+    total, independent of the number of courses). Called by
+    `dashboard.refresh_teacher()` / the overview and courses builders only.
+    """
+    courses = list(
+        models.Course.objects.filter(channel__user=user).order_by('-created_at')
+        .values('id', 'title', 'slug', 'students_count', 'created_at')
+    )
+    videos = _counts_by(models.CourseVideo.objects.filter(course__channel__user=user), 'course_id')
+    tests = _counts_by(models.VideoTest.objects.filter(course_video__course__channel__user=user), 'course_video__course_id')
+    assigns = _counts_by(models.VideoAssignment.objects.filter(course_video__course__channel__user=user), 'course_video__course_id')
+    ct_tests = _counts_by(models.CourseTypeTest.objects.filter(course_type__course__channel__user=user), 'course_type__course_id')
+    ct_assigns = _counts_by(models.CourseTypeAssignment.objects.filter(course_type__course__channel__user=user), 'course_type__course_id')
+    progress_qs = models.CourseVideoProgress.objects.filter(course_video__course__channel__user=user)
+    progress = _counts_by(
+        progress_qs, 'course_video__course_id',
+        unique_learners=Count('user', distinct=True),
+        completed=Count('id', filter=Q(completed=True)),
+    )
+
+    def n(table, cid):
+        return table.get(cid, {}).get('n', 0)
+
+    course_list = []
+    for c in courses:
+        cid = c['id']
+        course_list.append({
+            'id': cid,
+            'title': c['title'],
+            'slug': c['slug'],
+            'students_count': c['students_count'],
+            'videos_count': n(videos, cid),
+            'tests_count': n(tests, cid) + n(ct_tests, cid),
+            'assignments_count': n(assigns, cid) + n(ct_assigns, cid),
+            'unique_learners': progress.get(cid, {}).get('unique_learners', 0),
+            'completed_video_events': progress.get(cid, {}).get('completed', 0),
+            'created_at': c['created_at'],
+        })
+
+    overview = {
+        'channels_count': models.Channel.objects.filter(user=user).count(),
+        'courses_count': len(course_list),
+        'videos_count': sum(c['videos_count'] for c in course_list),
+        'reels_count': models.Reel.objects.filter(channel__user=user).count(),
+        'students_total': sum(c['students_count'] or 0 for c in course_list),
+        # Distinct across courses: can't be summed from per-course rows
+        'unique_learners': progress_qs.values('user').distinct().count(),
+        'tests_count': sum(c['tests_count'] for c in course_list),
+        'assignments_count': sum(c['assignments_count'] for c in course_list),
+        'completed_video_events': sum(c['completed_video_events'] for c in course_list),
+    }
+    return {'courses': course_list, 'overview': overview}
@@ -0,0 +1,508 @@
+"""Teacher dashboard snapshotlari.
+
+Og'ir dashboard payloadlari (overview, courses, engagement, tests/assignments
+stats) Celery'da oldindan hisoblanadi va `TeacherDashboardSnapshot` ga JSON
+sifatida yoziladi. API oxirgi snapshotni `generated_at` bilan qaytaradi.
+Snapshot yo'q bo'lsa (yoki schema eskirgan bo'lsa) u so'rov vaqtida
+hisoblanadi; eskirgan snapshot qaytariladi va fonda yangilanadi.
+"""
+import json
+import logging
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Avg, Q, F
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from app import models
+from app import rollups
+from . import analytics
+
+logger = logging.getLogger(__name__)
+
+# Payload formati o'zgarsa oshiring: eski snapshotlar qayta hisoblanadi
+SNAPSHOT_SCHEMA_VERSION = 1
+# Shundan eski snapshot o'qilganda fonda yangilash navbatga qo'yiladi
+SNAPSHOT_MAX_AGE = timedelta(hours=1)
+# Voqealar (natija, topshiriq...) bo'yicha yangilashlar orasidagi minimal interval
+SNAPSHOT_REFRESH_DEBOUNCE_SECONDS = 60
+SNAPSHOT_REFRESH_LOCK_KEY = 'teacher_dashboard:refresh:{user_id}'
+
+ENGAGEMENT_DEFAULT_DAYS = 30
+CHANNEL_KINDS = ('tests_stats', 'assignments_stats')
+
+
+# ----------------------------
+# Builders
+# ----------------------------
+def build_tests_stats(user, channel):
+    """Payload for TeacherTestsStatsAPIView."""
+    courses = list(models.Course.objects.filter(channel=channel).values('id', 'title', 'level', 'students_count'))
+    course_ids = [c['id'] for c in courses]
+
+    # Collections (plain rows; metrics are joined in Python by test/course id)
+    vt = models.VideoTest.objects.filter(course_video__course_id__in=course_ids)
+    ctt = models.CourseTypeTest.objects.filter(course_type__course_id__in=course_ids)
+    vt_rows = list(vt.values('id', 'title', 'is_active', 'created_at', course_id=F('course_video__course_id')).order_by('-created_at'))
+    ctt_rows = list(ctt.values('id', 'is_active', course_id=F('course_type__course_id')))
+
+    vt_results = models.TestResult.objects.filter(test__course_video__course_id__in=course_ids)
+    ctt_results = models.CourseTypeTestResult.objects.filter(test__course_type__course_id__in=course_ids)
+
+    # One GROUP BY test_id + one totals aggregate per test kind
+    vt_stats = analytics.test_result_stats(vt_results)
+    ctt_stats = analytics.test_result_stats(ctt_results)
+    vt_totals = analytics.result_totals(vt_results)
+    ctt_totals = analytics.result_totals(ctt_results)
+
+    def stats_for(rows, stats):
+        return [stats[r['id']] for r in rows if r['id'] in stats]
+
+    total_tests = len(vt_rows) + len(ctt_rows)
+    total_attempts = vt_totals['attempts'] + ctt_totals['attempts']
+    total_students = vt_totals['students'] + ctt_totals['students']
+
+    avg_pass_rate = 0.0
+    if total_tests:
+        avg_pass_rate = round(
+            (
+                analytics.pass_rate(vt_totals['passed'], vt_totals['attempts']) +
+                analytics.pass_rate(ctt_totals['passed'], ctt_totals['attempts'])
+            ) / 2.0, 2
+        )
+
+    active_tests = sum(1 for r in vt_rows if r['is_active']) + sum(1 for r in ctt_rows if r['is_active'])
+    # average completion time not tracked -> 0
+    overview = {
+        'total_tests': total_tests,
+        'total_attempts': total_attempts,
+        'total_students': total_students,
+        'avg_pass_rate': avg_pass_rate,
+        'avg_completion_time': 0,
+        'active_tests': active_tests,
+        'inactive_tests': total_tests - active_tests,
+    }
+
+    test_types = {
+        'video_tests': {
+            'count': len(vt_rows),
+            'attempts': vt_totals['attempts'],
+            'pass_rate': analytics.pass_rate(vt_totals['passed'], vt_totals['attempts']),
+            'avg_score': float(vt_totals['avg_score'] or 0),
+        },
+        'course_type_tests': {
+            'count': len(ctt_rows),
+            'attempts': ctt_totals['attempts'],
+            'pass_rate': analytics.pass_rate(ctt_totals['passed'], ctt_totals['attempts']),
+            'avg_score': float(ctt_totals['avg_score'] or 0),
+        }
+    }
+
+    def course_group_metrics(group_course_ids):
+        """Video + CT metrics for a set of courses, from the per-test stats above."""
+        g_vt = [r for r in vt_rows if r['course_id'] in group_course_ids]
+        g_ctt = [r for r in ctt_rows if r['course_id'] in group_course_ids]
+        v = analytics.combine_stats(stats_for(g_vt, vt_stats))
+        c = analytics.combine_stats(stats_for(g_ctt, ctt_stats))
+        has_tests = bool(g_vt or g_ctt)
+        return {
+            'count': len(g_vt) + len(g_ctt),
+            'attempts': v['attempts'] + c['attempts'],
+            'pass_rate': round((
+                analytics.pass_rate(v['passed'], v['attempts']) +
+                analytics.pass_rate(c['passed'], c['attempts'])
+            ) / 2.0, 2) if has_tests else 0.0,
+            'avg_score': float((v['avg_score'] or 0) + (c['avg_score'] or 0)) / 2.0,
+        }
+
+    # Difficulty breakdown by course level
+    diff_map = {'beginner': "Boshlang'ich", 'intermediate': "O'rta", 'advanced': 'Murakkab'}
+    diff_breakdown = {}
+    for level, label in diff_map.items():
+        diff_breakdown[level] = course_group_metrics({c['id'] for c in courses if c['level'] == level})
+
+    # Course performance (students_count - Course da saqlangan, app.course_stats)
+    course_performance = []
+    for c in courses:
+        m = course_group_metrics({c['id']})
+        course_performance.append({
+            'course_id': c['id'],
+            'course_title': c['title'],
+            'tests_count': m['count'],
+            'total_attempts': m['attempts'],
+            'pass_rate': m['pass_rate'],
+            'avg_score': m['avg_score'],
+            'students_count': c['students_count'],
+        })
+
+    # Recent activity: last 15 events (results completed + new tests)
+    recent = []
+    for r in vt_results.select_related('test', 'user').order_by('-completed_at')[:10]:
+        if r.completed_at:
+            recent.append({
+                'test_id': r.test_id,
+                'test_title': r.test.title,
+                'action': 'attempt_completed',
+                'student_name': r.user.get_full_name() or r.user.username,
+                'score': r.score,
+                'timestamp': r.completed_at,
+            })
+    for t in vt_rows[:5]:
+        recent.append({
+            'test_id': t['id'],
+            'test_title': t['title'],
+            'action': 'test_created',
+            'timestamp': t['created_at'],
+        })
+
+    # Time series
+    daily_attempts = (
+        vt_results.annotate(date=TruncDate('completed_at')).values('date')
+        .annotate(attempts=Count('id'), completions=Count('id'), pass_count=Count('id', filter=Q(score__gte=F('test__pass_score'))))
+        .order_by('date')
+    )
+    weekly_perf = (
+        vt.annotate(week=TruncWeek('created_at')).values('week').annotate(tests_created=Count('id')).order_by('week')
+    )
+
+    top_tests = []
+    for t in vt_rows[:5]:
+        s = vt_stats.get(t['id']) or {'attempts': 0, 'passed': 0}
+        top_tests.append({
+            'test_id': t['id'],
+            'title': t['title'],
+            'pass_rate': analytics.pass_rate(s['passed'], s['attempts']),
+            'attempts': s['attempts'],
+        })
+
+    payload = {
+        'overview': overview,
+        'test_types': test_types,
+        'difficulty_breakdown': diff_breakdown,
+        'course_performance': course_performance,
+        'recent_activity': recent,
+        'time_series': {
+            'daily_attempts': list(daily_attempts),
+            'weekly_performance': list(weekly_perf),
+        },
+        'top_performing_tests': top_tests,
+        'struggling_areas': [],
+    }
+    return payload
+
+
+def build_assignments_stats(user, channel):
+    """Payload for TeacherAssignmentsStatsAPIView."""
+    assignments = models.VideoAssignment.objects.filter(course_video__course__channel=channel)
+    submissions = models.AssignmentSubmission.objects.filter(assignment__in=assignments)
+
+    total_assignments = assignments.count()
+    total_submissions = submissions.count()
+    total_students = submissions.values('student').distinct().count()
+    avg_score = float(submissions.aggregate(a=Avg('grade'))['a'] or 0)
+
+    now = timezone.now()
+    overview = {
+        'total_assignments': total_assignments,
+        'total_submissions': total_submissions,
+        'total_students': total_students,
+        'avg_score': avg_score,
+        'active_assignments': assignments.filter(is_active=True).count(),
+        'overdue_assignments': assignments.filter(is_active=True, due_at__lt=now).count(),
+        'completed_assignments': assignments.filter(is_active=False).count(),
+        'pending_grading': submissions.filter(grade__isnull=True).count(),
+    }
+
+    # Difficulty breakdown by course level (one grouped query)
+    courses = models.Course.objects.filter(channel=channel)
+    group_totals = dict(
+        count=Count('id', distinct=True), submissions_count=Count('submissions'), avg_score=Avg('submissions__grade'),
+    )
+    per_level = {
+        row['course_video__course__level']: row for row in
+        assignments.values('course_video__course__level').annotate(**group_totals).order_by()
+    }
+    diff_map = {'beginner': "Boshlang'ich", 'intermediate': "O'rta", 'advanced': 'Murakkab'}
+    difficulty_breakdown = {}
+    for level in diff_map:
+        row = per_level.get(level, {})
+        difficulty_breakdown[level] = {
+            'count': row.get('count', 0),
+            'submissions': row.get('submissions_count', 0),
+            'avg_score': float(row.get('avg_score') or 0),
+        }
+
+    # Course performance (one grouped query)
+    per_course = {
+        row['course_video__course_id']: row for row in
+        assignments.values('course_video__course_id').annotate(**group_totals).order_by()
+    }
+    course_performance = []
+    for c in courses:
+        row = per_course.get(c.id, {})
+        course_performance.append({
+            'course_id': c.id,
+            'course_title': c.title,
+            'assignments_count': row.get('count', 0),
+            'total_submissions': row.get('submissions_count', 0),
+            'avg_score': float(row.get('avg_score') or 0),
+            'students_count': c.students_count,
+        })
+
+    # Recent activity
+    recent = []
+    for s in submissions.select_related('assignment', 'student').order_by('-submitted_at')[:10]:
+        recent.append({
+            'assignment_id': s.assignment_id,
+            'assignment_title': s.assignment.title,
+            'action': 'submission_received',
+            'student_name': s.student.get_full_name() or s.student.username,
+            'timestamp': s.submitted_at,
+        })
+    for s in submissions.filter(grade__isnull=False).select_related('assignment', 'student').order_by('-submitted_at')[:10]:
+        recent.append({
+            'assignment_id': s.assignment_id,
+            'assignment_title': s.assignment.title,
+            'action': 'graded',
+            'student_name': s.student.get_full_name() or s.student.username,
+            'score': s.grade,
+            'timestamp': s.submitted_at,
+        })
+    for a in assignments.order_by('-created_at')[:5]:
+        recent.append({
+            'assignment_id': a.id,
+            'assignment_title': a.title,
+            'action': 'assignment_created',
+            'timestamp': a.created_at,
+        })
+
+    # Time series
+    daily_submissions = [
+        {'date': r['day'], 'submissions': r['video_submissions'], 'graded': r['video_submissions_graded']}
+        for r in rollups.daily_series(courses.values_list('id', flat=True))
+        if r['video_submissions']
+    ]
+    weekly_performance = (
+        assignments.annotate(week=TruncWeek('created_at')).values('week')
+        .annotate(assignments_created=Count('id')).order_by('week')
+    )
+
+    # Per-assignment totals in one grouped query (top performing, struggling, grading workload)
+    per_assignment = list(
+        assignments.annotate(
+            submissions_count=Count('submissions'),
+            graded_count=Count('submissions', filter=Q(submissions__grade__isnull=False)),
+            pending_count=Count('submissions', filter=Q(submissions__grade__isnull=True)),
+            avg_score=Avg('submissions__grade'),
+        ).values('id', 'title', 'due_at', 'submissions_count', 'graded_count', 'pending_count', 'avg_score')
+    )
+
+    # Top performing (by avg score and submissions)
+    top_performing = [
+        {
+            'assignment_id': a['id'],
+            'title': a['title'],
+            'avg_score': float(a['avg_score'] or 0),
+            'submissions_count': a['submissions_count'],
+        }
+        for a in per_assignment if a['submissions_count']
+    ]
+    top_performing.sort(key=lambda x: (x['avg_score'], x['submissions_count']), reverse=True)
+    top_performing = top_performing[:5]
+
+    # Struggling areas (lowest avg score)
+    struggling = [
+        {'assignment_id': a['id'], 'title': a['title'], 'avg_score': float(a['avg_score'] or 0)}
+        for a in per_assignment if a['graded_count']
+    ]
+    struggling.sort(key=lambda x: x['avg_score'])
+    struggling = struggling[:5]
+
+    # Grading workload
+    pending_assignments = []
+    overdue_grading = []
+    for a in per_assignment:
+        if a['pending_count']:
+            pending_assignments.append({
+                'assignment_id': a['id'],
+                'title': a['title'],
+                'pending_count': a['pending_count'],
+                'due_date': a['due_at'],
+            })
+            if a['due_at'] and a['due_at'] < now:
+                overdue_grading.append({
+                    'assignment_id': a['id'],
+                    'title': a['title'],
+                    'overdue_count': a['pending_count'],
+                })
+
+    payload = {
+        'overview': overview,
+        'difficulty_breakdown': difficulty_breakdown,
+        'course_performance': course_performance,
+        'recent_activity': recent,
+        'time_series': {
+            'daily_submissions': list(daily_submissions),
+            'weekly_performance': list(weekly_performance),
+        },
+        'top_performing_assignments': top_performing,
+        'struggling_areas': struggling,
+        'grading_workload': {
+            'pending_assignments': pending_assignments,
+            'overdue_grading': overdue_grading,
+        }
+    }
+    return payload
+
+
+def build_engagement(user, days=ENGAGEMENT_DEFAULT_DAYS):
+    """Payload for TeacherAnalyticsEngagementAPIView."""
+    since = timezone.now() - timedelta(days=max(1, days))
+
+    course_ids = list(models.Course.objects.filter(channel__user=user).values_list('id', flat=True))
+
+    # Counters come from daily rollups (+ live delta for today)
+    totals = rollups.series_totals(rollups.daily_series(course_ids, since_day=timezone.localdate(since)))
+
+    # Distinct learners over the whole window can't be summed from daily rows
+    active_learners = (
+        models.CourseVideoProgress.objects.filter(course_video__course_id__in=course_ids, updated_at__gte=since)
+        .values('user').distinct().count()
+    )
+
+    video_test_results = totals['video_test_attempts']
+    video_test_passed = totals['video_test_passed']
+    ct_test_results = totals['ct_test_attempts']
+    ct_test_passed = totals['ct_test_passed']
+
+    data = {
+        'window_days': days,
+        'progress_events': totals['progress_events'],
+        'active_learners': active_learners,
+        'video_test_pass_rate': round((video_test_passed / video_test_results) * 100.0, 2) if video_test_results else 0.0,
+        'ct_test_results': ct_test_results,
+        'ct_test_pass_rate': round((ct_test_passed / ct_test_results) * 100.0, 2) if ct_test_results else 0.0,
+        'assignment_submissions': totals['video_submissions'] + totals['ct_submissions'],
+    }
+    return data
+
+
+BUILDERS = {
+    'overview': lambda user, channel: analytics.compute_teacher_analytics(user)['overview'],
+    'courses': lambda user, channel: {'courses': analytics.compute_teacher_analytics(user)['courses']},
+    'engagement': lambda user, channel: build_engagement(user),
+    'tests_stats': build_tests_stats,
+    'assignments_stats': build_assignments_stats,
+}
+
+
+# ----------------------------
+# Storage
+# ----------------------------
+def _scope(channel):
+    return str(channel.id) if channel is not None else ''
+
+
+def store_snapshot(user, kind, channel, payload):
+    """Save `payload` as the latest snapshot; returns (payload, generated_at)."""
+    # API bilan bir xil JSON ko'rinishi (Decimal, date va h.k.)
+    data = json.loads(json.dumps(payload, cls=JSONEncoder))
+    now = timezone.now()
+    lookup = {'user': user, 'kind': kind, 'scope': _scope(channel)}
+    values = {'payload': data, 'schema_version': SNAPSHOT_SCHEMA_VERSION, 'generated_at': now}
+
+    updated = models.TeacherDashboardSnapshot.objects.filter(**lookup).update(version=F('version') + 1, **values)
+    if not updated:
+        try:
+            with transaction.atomic():
+                models.TeacherDashboardSnapshot.objects.create(**lookup, **values)
+        except IntegrityError:
+            # Parallel yaratildi -> yangilaymiz
+            models.TeacherDashboardSnapshot.objects.filter(**lookup).update(version=F('version') + 1, **values)
+    return data, now
+
+
+def refresh_teacher(user):
+    """Recompute every dashboard snapshot of `user`."""
+    analytics_payload = analytics.compute_teacher_analytics(user)
+    store_snapshot(user, 'overview', None, analytics_payload['overview'])
+    store_snapshot(user, 'courses', None, {'courses': analytics_payload['courses']})
+    store_snapshot(user, 'engagement', None, build_engagement(user))
+    for channel in models.Channel.objects.filter(user=user):
+        store_snapshot(user, 'tests_stats', channel, build_tests_stats(user, channel))
+        store_snapshot(user, 'assignments_stats', channel, build_assignments_stats(user, channel))
+
+
+def _queue_refresh(user_id):
+    # Debounce: SNAPSHOT_REFRESH_DEBOUNCE_SECONDS ichida bitta vazifa
+    lock_key = SNAPSHOT_REFRESH_LOCK_KEY.format(user_id=user_id)
+    if not cache.add(lock_key, 1, SNAPSHOT_REFRESH_DEBOUNCE_SECONDS):
+        return
+    from app.tasks import refresh_teacher_dashboard_task
+    try:
+        refresh_teacher_dashboard_task.apply_async((user_id,), countdown=SNAPSHOT_REFRESH_DEBOUNCE_SECONDS)
+    except Exception:
+        # Broker ishlamasa eski snapshot qoladi; keyingi o'qish yana urinadi
+        cache.delete(lock_key)
+        raise
+
+
+def _after_commit(func, *args):
+    """Run `func` after commit; a failure (Redis, broker, DB) is only logged.
+
+    Yangilash ixtiyoriy: o'quvchining yozuvi hech qachon shu sababli yiqilmaydi.
+    """
+    def run():
+        try:
+            func(*args)
+        except Exception:
+            logger.warning('Could not schedule dashboard refresh (%s%r)', func.__name__, args, exc_info=True)
+
+    transaction.on_commit(run)
+
+
+def schedule_refresh(user_id):
+    """Queue a background refresh for the teacher (debounced, after commit, never raises)."""
+    _after_commit(_queue_refresh, user_id)
+
+
+def _refresh_owner(model, pk, owner_path):
+    owner_id = model.objects.filter(pk=pk).values_list(owner_path, flat=True).first()
+    if owner_id:
+        _queue_refresh(owner_id)
+
+
+def schedule_refresh_for(model, pk, owner_path):
+    """Like schedule_refresh(), for the channel owner reached from `model` row `pk` by `owner_path`.
+
+    Egani topish so'rovi ham commit dan keyin (yozish tranzaksiyasidan tashqarida) bajariladi.
+    """
+    _after_commit(_refresh_owner, model, pk, owner_path)
+
+
+def get_snapshot(user, kind, channel=None):
+    """Latest (payload, generated_at); builds synchronously if missing or outdated."""
+    snap = (
+        models.TeacherDashboardSnapshot.objects
+        .filter(user=user, kind=kind, scope=_scope(channel), schema_version=SNAPSHOT_SCHEMA_VERSION)
+        .only('payload', 'generated_at')
+        .first()
+    )
+    if snap is None:
+        return store_snapshot(user, kind, channel, BUILDERS[kind](user, channel))
+    if timezone.now() - snap.generated_at > SNAPSHOT_MAX_AGE:
+        schedule_refresh(user.id)
+    return snap.payload, snap.generated_at
+
+
+def serve(user, kind, channel=None):
+    if channel is None and not models.Channel.objects.filter(user=user).exists():
+        # Kanali yo'q foydalanuvchi uchun snapshot saqlanmaydi: (bo'sh) hisobot joyida quriladi
+        payload = json.loads(json.dumps(BUILDERS[kind](user, None), cls=JSONEncoder))
+        return Response(dict(payload, generated_at=timezone.now()), status=200)
+    payload, generated_at = get_snapshot(user, kind, channel)
+    return Response(dict(payload, generated_at=generated_at), status=200)
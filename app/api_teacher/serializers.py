@@ -18,7 +18,6 @@ class CourseTypeBriefSerializer(serializers.ModelSerializer):
 class TeacherCourseSerializer(serializers.ModelSerializer):
     course_types_count = serializers.SerializerMethodField()
     videos_count = serializers.SerializerMethodField()
-    students_count = serializers.SerializerMethodField()
 
     class Meta:
         model = models.Course
@@ -26,15 +25,13 @@ class TeacherCourseSerializer(serializers.ModelSerializer):
             'id', 'title', 'slug', 'status', 'reason','is_active', 'students_count', 'created_at', 'price','cover', 'thumbnail',
             'course_types_count', 'videos_count', 'purchase_scope'
         )
+        read_only_fields = ('students_count',)
 
     def get_course_types_count(self, obj):
         return models.CourseType.objects.filter(course=obj).count()
 
     def get_videos_count(self, obj):
-        return models.CourseVideo.objects.filter(course=obj).count()
-    
-    def get_students_count(self, obj):
-        return models.WalletTransaction.objects.filter(course=obj, transaction_type='course_purchase').count()
+        return obj.lessons_count
 
 class TeacherCourseVideoSerializer(serializers.ModelSerializer):
     course_type = CourseTypeBriefSerializer(read_only=True)
@@ -202,6 +199,8 @@ class TeacherStudentRowSerializer(serializers.Serializer):
     purchases_count = serializers.IntegerField()
     tests_count = serializers.IntegerField()
     assignments_count = serializers.IntegerField()
+    last_purchase_at = serializers.DateTimeField(allow_null=True, required=False)
+    last_activity_at = serializers.DateTimeField(allow_null=True, required=False)
 
 
 class TeacherVideoTestResultBriefSerializer(serializers.ModelSerializer):
@@ -5,13 +5,16 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Avg, Sum, Q, Max
+from django.db.models import Count, Avg, Q, Max
 from django.utils import timezone
 from datetime import timedelta
 
 from app import models
 from app.pagination import CoursePagination
 from . import serializers
+from . import analytics
+from . import dashboard
+from app import entitlements, rollups
 import shutil
 import os
 from django.conf import settings
@@ -22,8 +25,7 @@ from app.pagination import *
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework.response import Response
-from django.db.models import Count, Sum, F
-from django.db.models.functions import TruncDate, TruncWeek
+from django.db.models import Count, F, OuterRef, Subquery, ExpressionWrapper, DateTimeField
 from datetime import timedelta
 
 
@@ -40,33 +42,7 @@ class TeacherAnalyticsOverviewAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        channels = models.Channel.objects.filter(user=user)
-        courses = models.Course.objects.filter(channel__in=channels)
-        videos = models.CourseVideo.objects.filter(course__in=courses)
-
-        reels = models.Reel.objects.filter(channel__in=channels)
-        video_tests = models.VideoTest.objects.filter(course_video__in=videos)
-        video_assigns = models.VideoAssignment.objects.filter(course_video__in=videos)
-        ct_tests = models.CourseTypeTest.objects.filter(course_type__course__in=courses)
-        ct_assigns = models.CourseTypeAssignment.objects.filter(course_type__course__in=courses)
-
-        total_students = courses.aggregate(s=Sum('students_count'))['s'] or 0
-        unique_learners = models.CourseVideoProgress.objects.filter(course_video__in=videos).values('user').distinct().count()
-        completed_events = models.CourseVideoProgress.objects.filter(course_video__in=videos, completed=True).count()
-
-        data = {
-            'channels_count': channels.count(),
-            'courses_count': courses.count(),
-            'videos_count': videos.count(),
-            'reels_count': reels.count(),
-            'students_total': total_students,
-            'unique_learners': unique_learners,
-            'tests_count': video_tests.count() + ct_tests.count(),
-            'assignments_count': video_assigns.count() + ct_assigns.count(),
-            'completed_video_events': completed_events,
-        }
-        return Response(data, status=200)
+        return dashboard.serve(request.user, 'overview')
 
 
 # =============================
@@ -120,32 +96,44 @@ class TeacherTestsListAPIView(APIView):
             courses = courses.filter(slug=course_slug)
         course_ids = list(courses.values_list('id', flat=True))
 
-        # Collect tests for these courses
-        video_tests = models.VideoTest.objects.filter(course_video__course_id__in=course_ids).select_related('course_video__course', 'created_by')
-        ct_tests = models.CourseTypeTest.objects.filter(course_type__course_id__in=course_ids).select_related('course_type__course', 'created_by')
-
-        items = []
-        # Video tests
-        for t in video_tests:
-            course = t.course_video.course
-            results = t.results.all()
-            total_attempts = results.count()
-            unique_students = results.values('user').distinct().count()
-            passed = results.filter(score__gte=t.pass_score).count()
-            pass_rate = round((passed / total_attempts) * 100.0, 2) if total_attempts else 0.0
-            avg_score = results.aggregate(a=Avg('score'))['a']
+        # Collect tests for these courses (question counts annotated, one query per test kind)
+        video_tests = (
+            models.VideoTest.objects.filter(course_video__course_id__in=course_ids)
+            .select_related('course_video__course', 'created_by')
+            .annotate(questions_count=Count('questions'))
+        )
+        ct_tests = (
+            models.CourseTypeTest.objects.filter(course_type__course_id__in=course_ids)
+            .select_related('course_type__course', 'created_by')
+            .annotate(questions_count=Count('questions'))
+        )
+        if include_questions:
+            video_tests = video_tests.prefetch_related('questions__options')
+            ct_tests = ct_tests.prefetch_related('questions__options')
+        video_tests = list(video_tests)
+        ct_tests = list(ct_tests)
+
+        # Result metrics: one GROUP BY test_id query per test kind
+        vt_stats = analytics.test_result_stats(
+            models.TestResult.objects.filter(test__course_video__course_id__in=course_ids)
+        )
+        ct_stats = analytics.test_result_stats(
+            models.CourseTypeTestResult.objects.filter(test__course_type__course_id__in=course_ids)
+        )
 
+        def build_item(t, test_type, course, stats):
+            s = stats.get(t.id) or {'attempts': 0, 'passed': 0, 'avg_score': None}
             item = {
                 'id': t.id,
                 'title': t.title,
                 'description': t.description,
-                'type': 'video',
+                'type': test_type,
                 'course': {'id': course.id, 'title': course.title, 'slug': course.slug},
-                'questions_count': t.questions.count(),
+                'questions_count': t.questions_count,
                 'time_limit': t.time_limit_minutes,
-                'attempts_count': total_attempts,
-                'pass_rate': pass_rate,
-                'avg_score': float(avg_score) if avg_score is not None else None,
+                'attempts_count': s['attempts'],
+                'pass_rate': analytics.pass_rate(s['passed'], s['attempts']),
+                'avg_score': float(s['avg_score']) if s['avg_score'] is not None else None,
                 'max_score': 100,
                 'passing_score': t.pass_score,
                 'created_at': t.created_at,
@@ -156,41 +144,11 @@ class TeacherTestsListAPIView(APIView):
                 'creator': t.created_by or request.user,
             }
             if include_questions:
-                item['questions'] = t.questions.prefetch_related('options').all()
-            items.append(item)
-
-        # CourseType tests
-        for t in ct_tests:
-            course = t.course_type.course
-            results = t.results.all()
-            total_attempts = results.count()
-            passed = results.filter(score__gte=t.pass_score).count()
-            pass_rate = round((passed / total_attempts) * 100.0, 2) if total_attempts else 0.0
-            avg_score = results.aggregate(a=Avg('score'))['a']
+                item['questions'] = t.questions.all()
+            return item
 
-            item = {
-                'id': t.id,
-                'title': t.title,
-                'description': t.description,
-                'type': 'course_type',
-                'course': {'id': course.id, 'title': course.title, 'slug': course.slug},
-                'questions_count': t.questions.count(),
-                'time_limit': t.time_limit_minutes,
-                'attempts_count': total_attempts,
-                'pass_rate': pass_rate,
-                'avg_score': float(avg_score) if avg_score is not None else None,
-                'max_score': 100,
-                'passing_score': t.pass_score,
-                'created_at': t.created_at,
-                'updated_at': None,
-                'is_active': t.is_active,
-                'difficulty': course.level if hasattr(course, 'level') else None,
-                'tags': [],
-                'creator': t.created_by or request.user,
-            }
-            if include_questions:
-                item['questions'] = t.questions.prefetch_related('options').all()
-            items.append(item)
+        items = [build_item(t, 'video', t.course_video.course, vt_stats) for t in video_tests]
+        items += [build_item(t, 'course_type', t.course_type.course, ct_stats) for t in ct_tests]
 
         # Sort by created_at desc
         items.sort(key=lambda x: x['created_at'], reverse=True)
@@ -200,15 +158,26 @@ class TeacherTestsListAPIView(APIView):
         page = paginator.paginate_queryset(items, request)
         ser = serializers.TeacherTestListItemSerializer(page, many=True)
 
-        # Build filters
-        course_filters = []
-        for c in models.Course.objects.filter(channel=channel):
-            vt_cnt = models.VideoTest.objects.filter(course_video__course=c).count()
-            ct_cnt = models.CourseTypeTest.objects.filter(course_type__course=c).count()
-            course_filters.append({'id': c.id, 'title': c.title, 'slug': c.slug, 'tests_count': vt_cnt + ct_cnt})
+        # Build filters (tests per course grouped over all channel courses)
+        tests_per_course = {}
+        for row in (
+            models.VideoTest.objects.filter(course_video__course__channel=channel)
+            .values('course_video__course_id').annotate(n=Count('id')).order_by()
+        ):
+            tests_per_course[row['course_video__course_id']] = row['n']
+        for row in (
+            models.CourseTypeTest.objects.filter(course_type__course__channel=channel)
+            .values('course_type__course_id').annotate(n=Count('id')).order_by()
+        ):
+            cid = row['course_type__course_id']
+            tests_per_course[cid] = tests_per_course.get(cid, 0) + row['n']
+        course_filters = [
+            {'id': c['id'], 'title': c['title'], 'slug': c['slug'], 'tests_count': tests_per_course.get(c['id'], 0)}
+            for c in models.Course.objects.filter(channel=channel).values('id', 'title', 'slug')
+        ]
         available_types = [
-            {'type': 'video', 'label': 'Video Testlar', 'count': video_tests.count()},
-            {'type': 'course_type', 'label': 'Oylik Testlar', 'count': ct_tests.count()},
+            {'type': 'video', 'label': 'Video Testlar', 'count': len(video_tests)},
+            {'type': 'course_type', 'label': 'Oylik Testlar', 'count': len(ct_tests)},
         ]
         diff_counts = (
             models.Course.objects.filter(id__in=course_ids)
@@ -321,160 +290,7 @@ class TeacherAssignmentsStatsAPIView(APIView):
 
     def get(self, request, channel_slug):
         channel = get_object_or_404(models.Channel, slug=channel_slug, user=request.user)
-        assignments = models.VideoAssignment.objects.filter(course_video__course__channel=channel)
-        submissions = models.AssignmentSubmission.objects.filter(assignment__in=assignments)
-
-        total_assignments = assignments.count()
-        total_submissions = submissions.count()
-        total_students = submissions.values('student').distinct().count()
-        avg_score = float(submissions.aggregate(a=Avg('grade'))['a'] or 0)
-
-        now = timezone.now()
-        overview = {
-            'total_assignments': total_assignments,
-            'total_submissions': total_submissions,
-            'total_students': total_students,
-            'avg_score': avg_score,
-            'active_assignments': assignments.filter(is_active=True).count(),
-            'overdue_assignments': assignments.filter(is_active=True, due_at__lt=now).count(),
-            'completed_assignments': assignments.filter(is_active=False).count(),
-            'pending_grading': submissions.filter(grade__isnull=True).count(),
-        }
-
-        # Difficulty breakdown by course level
-        courses = models.Course.objects.filter(channel=channel)
-        diff_map = {'beginner': "Boshlang'ich", 'intermediate': "O'rta", 'advanced': 'Murakkab'}
-        difficulty_breakdown = {}
-        for level, label in diff_map.items():
-            level_courses = courses.filter(level=level)
-            level_assign = assignments.filter(course_video__course__in=level_courses)
-            level_subs = submissions.filter(assignment__in=level_assign)
-            difficulty_breakdown[level] = {
-                'count': level_assign.count(),
-                'submissions': level_subs.count(),
-                'avg_score': float(level_subs.aggregate(a=Avg('grade'))['a'] or 0),
-            }
-
-        # Course performance
-        course_performance = []
-        for c in courses:
-            c_assign = assignments.filter(course_video__course=c)
-            c_subs = submissions.filter(assignment__in=c_assign)
-            course_performance.append({
-                'course_id': c.id,
-                'course_title': c.title,
-                'assignments_count': c_assign.count(),
-                'total_submissions': c_subs.count(),
-                'avg_score': float(c_subs.aggregate(a=Avg('grade'))['a'] or 0),
-                'students_count': models.WalletTransaction.objects.filter(course=c, transaction_type='course_purchase').values('wallet__user').distinct().count(),
-            })
-
-        # Recent activity
-        recent = []
-        for s in submissions.order_by('-submitted_at')[:10]:
-            recent.append({
-                'assignment_id': s.assignment_id,
-                'assignment_title': s.assignment.title,
-                'action': 'submission_received',
-                'student_name': s.student.get_full_name() or s.student.username,
-                'timestamp': s.submitted_at,
-            })
-        for s in submissions.filter(grade__isnull=False).order_by('-submitted_at')[:10]:
-            recent.append({
-                'assignment_id': s.assignment_id,
-                'assignment_title': s.assignment.title,
-                'action': 'graded',
-                'student_name': s.student.get_full_name() or s.student.username,
-                'score': s.grade,
-                'timestamp': s.submitted_at,
-            })
-        for a in assignments.order_by('-created_at')[:5]:
-            recent.append({
-                'assignment_id': a.id,
-                'assignment_title': a.title,
-                'action': 'assignment_created',
-                'timestamp': a.created_at,
-            })
-
-        # Time series
-        daily_submissions = (
-            submissions.annotate(date=TruncDate('submitted_at')).values('date')
-            .annotate(submissions=Count('id'), graded=Count('id', filter=Q(grade__isnull=False)))
-            .order_by('date')
-        )
-        weekly_performance = (
-            assignments.annotate(week=TruncWeek('created_at')).values('week')
-            .annotate(assignments_created=Count('id')).order_by('week')
-        )
-
-        # Top performing (by avg score and submissions)
-        top_performing = []
-        for a in assignments:
-            a_subs = submissions.filter(assignment=a)
-            if not a_subs.exists():
-                continue
-            top_performing.append({
-                'assignment_id': a.id,
-                'title': a.title,
-                'avg_score': float(a_subs.aggregate(a=Avg('grade'))['a'] or 0),
-                'submissions_count': a_subs.count(),
-            })
-        top_performing.sort(key=lambda x: (x['avg_score'], x['submissions_count']), reverse=True)
-        top_performing = top_performing[:5]
-
-        # Struggling areas (lowest avg score)
-        struggling = []
-        for a in assignments:
-            a_subs = submissions.filter(assignment=a, grade__isnull=False)
-            if not a_subs.exists():
-                continue
-            struggling.append({
-                'assignment_id': a.id,
-                'title': a.title,
-                'avg_score': float(a_subs.aggregate(a=Avg('grade'))['a'] or 0),
-            })
-        struggling.sort(key=lambda x: x['avg_score'])
-        struggling = struggling[:5]
-
-        # Grading workload
-        pending_assignments = []
-        overdue_grading = []
-        for a in assignments:
-            a_subs = submissions.filter(assignment=a)
-            pend = a_subs.filter(grade__isnull=True).count()
-            if pend:
-                pending_assignments.append({
-                    'assignment_id': a.id,
-                    'title': a.title,
-                    'pending_count': pend,
-                    'due_date': a.due_at,
-                })
-            if a.due_at and a.due_at < now:
-                overdue_count = a_subs.filter(grade__isnull=True).count()
-                if overdue_count:
-                    overdue_grading.append({
-                        'assignment_id': a.id,
-                        'title': a.title,
-                        'overdue_count': overdue_count,
-                    })
-
-        payload = {
-            'overview': overview,
-            'difficulty_breakdown': difficulty_breakdown,
-            'course_performance': course_performance,
-            'recent_activity': recent,
-            'time_series': {
-                'daily_submissions': list(daily_submissions),
-                'weekly_performance': list(weekly_performance),
-            },
-            'top_performing_assignments': top_performing,
-            'struggling_areas': struggling,
-            'grading_workload': {
-                'pending_assignments': pending_assignments,
-                'overdue_grading': overdue_grading,
-            }
-        }
-        return Response(payload, status=200)
+        return dashboard.serve(request.user, 'assignments_stats', channel)
 
 
 class TeacherAssignmentSubmissionsListAPIView(APIView):
@@ -484,55 +300,61 @@ class TeacherAssignmentSubmissionsListAPIView(APIView):
     def get(self, request, channel_slug, assignment_id):
         channel = get_object_or_404(models.Channel, slug=channel_slug, user=request.user)
         assignment = get_object_or_404(models.VideoAssignment, id=assignment_id, course_video__course__channel=channel)
-        subs = models.AssignmentSubmission.objects.filter(assignment=assignment).select_related('student')
+        subs = models.AssignmentSubmission.objects.filter(assignment=assignment).select_related('student', 'assignment')
 
         paginator = self.pagination_class()
         page = paginator.paginate_queryset(subs, request)
         ser = serializers.TeacherAssignmentSubmissionOutSerializer(page, many=True)
         resp = paginator.get_paginated_response(ser.data)
 
-        # Compute late submissions
-        late_count = 0
+        # Compute late submissions (in the database)
         if getattr(assignment, 'due_days_after_completion', None):
             days = int(assignment.due_days_after_completion)
-            cv = assignment.course_video
-            for s in subs:
-                # Student's completion of the related CourseVideo
-                prog = models.CourseVideoProgress.objects.filter(
-                    user=s.student,
-                    course_video=cv,
-                    completed=True
-                ).order_by('-updated_at').first()
-                if prog:
-                    deadline = prog.updated_at + timedelta(days=days)
-                    if s.submitted_at and s.submitted_at > deadline:
-                        late_count += 1
-                else:
-                    # If student hasn't completed the video, we don't consider it late by this rule
-                    pass
+            # Student's completion of the related CourseVideo; not completed -> not late by this rule
+            completed_at = Subquery(
+                models.CourseVideoProgress.objects.filter(
+                    user=OuterRef('student'),
+                    course_video=assignment.course_video_id,
+                    completed=True,
+                ).order_by('-updated_at').values('updated_at')[:1]
+            )
+            late_count = (
+                subs.annotate(deadline=ExpressionWrapper(completed_at + timedelta(days=days), output_field=DateTimeField()))
+                .filter(deadline__isnull=False, submitted_at__gt=F('deadline'))
+                .count()
+            )
         else:
             # Fallback to fixed due_at if provided
-            from django.db.models import F
             late_count = subs.filter(assignment__due_at__isnull=False, submitted_at__gt=F('assignment__due_at')).count()
 
+        totals = subs.aggregate(
+            total=Count('id'),
+            graded=Count('id', filter=Q(grade__isnull=False)),
+            avg=Avg('grade'),
+        )
+        per_student_rows = list(
+            subs.values('student').annotate(cnt=Count('id'), best=Max('grade'), latest=Max('submitted_at')).order_by()
+        )
+        students = models.User.objects.in_bulk([s['student'] for s in per_student_rows])
+
         stats = {
-            'total_submissions': subs.count(),
-            'graded_submissions': subs.filter(grade__isnull=False).count(),
-            'pending_submissions': subs.filter(grade__isnull=True).count(),
+            'total_submissions': totals['total'],
+            'graded_submissions': totals['graded'],
+            'pending_submissions': totals['total'] - totals['graded'],
             'late_submissions': late_count,
-            'avg_score': float(subs.aggregate(a=Avg('grade'))['a'] or 0),
+            'avg_score': float(totals['avg'] or 0),
             'per_student': [
                 {
                     'student': {
                         'id': s['student'],
-                        'full_name': (models.User.objects.get(id=s['student']).get_full_name() or models.User.objects.get(id=s['student']).username),
-                        'username': models.User.objects.get(id=s['student']).username,
+                        'full_name': students[s['student']].get_full_name() or students[s['student']].username,
+                        'username': students[s['student']].username,
                     },
                     'submissions_count': s['cnt'],
                     'best_score': s['best'] if s['best'] is not None else None,
                     'latest_submission': s['latest']
                 }
-                for s in subs.values('student').annotate(cnt=Count('id'), best=Max('grade'), latest=Max('submitted_at'))
+                for s in per_student_rows
             ]
         }
 
@@ -552,161 +374,7 @@ class TeacherTestsStatsAPIView(APIView):
 
     def get(self, request, channel_slug):
         channel = get_object_or_404(models.Channel, slug=channel_slug, user=request.user)
-        courses = models.Course.objects.filter(channel=channel)
-        videos = models.CourseVideo.objects.filter(course__in=courses)
-
-        # Collections
-        vt = models.VideoTest.objects.filter(course_video__in=videos)
-        ctt = models.CourseTypeTest.objects.filter(course_type__course__in=courses)
-
-        vt_results = models.TestResult.objects.filter(test__in=vt)
-        ctt_results = models.CourseTypeTestResult.objects.filter(test__in=ctt)
-
-        total_tests = vt.count() + ctt.count()
-        total_attempts = vt_results.count() + ctt_results.count()
-        total_students = (
-            vt_results.values('user').distinct().count() +
-            ctt_results.values('user').distinct().count()
-        )
-
-        def agg_pass_rate(qs, pass_score_field):
-            total = qs.count()
-            if not total:
-                return 0.0
-            # approximate using join filter
-            passed = qs.filter(score__gte=F(pass_score_field)).count()
-            return round((passed / total) * 100.0, 2)
-
-        avg_pass_rate = 0.0
-        if total_tests:
-            avg_pass_rate = round(
-                (
-                    agg_pass_rate(vt_results, 'test__pass_score') +
-                    agg_pass_rate(ctt_results, 'test__pass_score')
-                ) / 2.0, 2
-            )
-
-        # average completion time not tracked -> 0
-        overview = {
-            'total_tests': total_tests,
-            'total_attempts': total_attempts,
-            'total_students': total_students,
-            'avg_pass_rate': avg_pass_rate,
-            'avg_completion_time': 0,
-            'active_tests': vt.filter(is_active=True).count() + ctt.filter(is_active=True).count(),
-            'inactive_tests': vt.filter(is_active=False).count() + ctt.filter(is_active=False).count(),
-        }
-
-        test_types = {
-            'video_tests': {
-                'count': vt.count(),
-                'attempts': vt_results.count(),
-                'pass_rate': agg_pass_rate(vt_results, 'test__pass_score'),
-                'avg_score': float(vt_results.aggregate(a=Avg('score'))['a'] or 0),
-            },
-            'course_type_tests': {
-                'count': ctt.count(),
-                'attempts': ctt_results.count(),
-                'pass_rate': agg_pass_rate(ctt_results, 'test__pass_score'),
-                'avg_score': float(ctt_results.aggregate(a=Avg('score'))['a'] or 0),
-            }
-        }
-
-        # Difficulty breakdown by course level
-        diff_map = {'beginner': "Boshlang'ich", 'intermediate': "O'rta", 'advanced': 'Murakkab'}
-        diff_breakdown = {}
-        for level, label in diff_map.items():
-            level_courses = courses.filter(level=level)
-            level_videos = models.CourseVideo.objects.filter(course__in=level_courses)
-            level_vt = models.VideoTest.objects.filter(course_video__in=level_videos)
-            level_ctt = models.CourseTypeTest.objects.filter(course_type__course__in=level_courses)
-            level_results = models.TestResult.objects.filter(test__in=level_vt)
-            level_ctt_results = models.CourseTypeTestResult.objects.filter(test__in=level_ctt)
-            diff_breakdown[level] = {
-                'count': level_vt.count() + level_ctt.count(),
-                'attempts': level_results.count() + level_ctt_results.count(),
-                'pass_rate': round((
-                    agg_pass_rate(level_results, 'test__pass_score') +
-                    agg_pass_rate(level_ctt_results, 'test__pass_score')
-                ) / 2.0, 2) if (level_vt.exists() or level_ctt.exists()) else 0.0,
-                'avg_score': float((level_results.aggregate(a=Avg('score'))['a'] or 0) + (level_ctt_results.aggregate(a=Avg('score'))['a'] or 0)) / 2.0,
-            }
-
-        # Course performance
-        course_performance = []
-        for c in courses:
-            c_videos = models.CourseVideo.objects.filter(course=c)
-            c_vt = models.VideoTest.objects.filter(course_video__in=c_videos)
-            c_ctt = models.CourseTypeTest.objects.filter(course_type__course=c)
-            c_vt_res = models.TestResult.objects.filter(test__in=c_vt)
-            c_ctt_res = models.CourseTypeTestResult.objects.filter(test__in=c_ctt)
-            attempts = c_vt_res.count() + c_ctt_res.count()
-            pr = round((
-                agg_pass_rate(c_vt_res, 'test__pass_score') +
-                agg_pass_rate(c_ctt_res, 'test__pass_score')
-            ) / 2.0, 2) if (c_vt.exists() or c_ctt.exists()) else 0.0
-            avg_score = float((c_vt_res.aggregate(a=Avg('score'))['a'] or 0) + (c_ctt_res.aggregate(a=Avg('score'))['a'] or 0)) / 2.0
-            course_performance.append({
-                'course_id': c.id,
-                'course_title': c.title,
-                'tests_count': c_vt.count() + c_ctt.count(),
-                'total_attempts': attempts,
-                'pass_rate': pr,
-                'avg_score': avg_score,
-                'students_count': models.WalletTransaction.objects.filter(course=c, transaction_type='course_purchase').values('wallet__user').distinct().count(),
-            })
-
-        # Recent activity: last 15 events (results completed + new tests)
-        recent = []
-        for r in vt_results.order_by('-completed_at')[:10]:
-            if r.completed_at:
-                recent.append({
-                    'test_id': r.test_id,
-                    'test_title': r.test.title,
-                    'action': 'attempt_completed',
-                    'student_name': r.user.get_full_name() or r.user.username,
-                    'score': r.score,
-                    'timestamp': r.completed_at,
-                })
-        for t in vt.order_by('-created_at')[:5]:
-            recent.append({
-                'test_id': t.id,
-                'test_title': t.title,
-                'action': 'test_created',
-                'timestamp': t.created_at,
-            })
-
-        # Time series
-        daily_attempts = (
-            vt_results.annotate(date=TruncDate('completed_at')).values('date')
-            .annotate(attempts=Count('id'), completions=Count('id'), pass_count=Count('id', filter=Q(score__gte=F('test__pass_score'))))
-            .order_by('date')
-        )
-        weekly_perf = (
-            vt.annotate(week=TruncWeek('created_at')).values('week').annotate(tests_created=Count('id')).order_by('week')
-        )
-
-        payload = {
-            'overview': overview,
-            'test_types': test_types,
-            'difficulty_breakdown': diff_breakdown,
-            'course_performance': course_performance,
-            'recent_activity': recent,
-            'time_series': {
-                'daily_attempts': list(daily_attempts),
-                'weekly_performance': list(weekly_perf),
-            },
-            'top_performing_tests': [
-                {
-                    'test_id': t.id,
-                    'title': t.title,
-                    'pass_rate': agg_pass_rate(models.TestResult.objects.filter(test=t), 'test__pass_score'),
-                    'attempts': models.TestResult.objects.filter(test=t).count(),
-                } for t in vt.order_by('-created_at')[:5]
-            ],
-            'struggling_areas': [],
-        }
-        return Response(payload, status=200)
+        return dashboard.serve(request.user, 'tests_stats', channel)
 
 
 class TeacherTestAttemptsAPIView(APIView):
@@ -862,35 +530,7 @@ class TeacherAnalyticsCoursesAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        channels = models.Channel.objects.filter(user=user)
-        courses = models.Course.objects.filter(channel__in=channels).order_by('-created_at')
-        course_list = []
-        for c in courses:
-            videos = models.CourseVideo.objects.filter(course=c)
-            vids_ids = list(videos.values_list('id', flat=True))
-            tests_cnt = models.VideoTest.objects.filter(course_video__in=videos).count()
-            assigns_cnt = models.VideoAssignment.objects.filter(course_video__in=videos).count()
-            ct_tests_cnt = models.CourseTypeTest.objects.filter(course_type__course=c).count()
-            ct_assigns_cnt = models.CourseTypeAssignment.objects.filter(course_type__course=c).count()
-
-            unique_learners = models.CourseVideoProgress.objects.filter(course_video__in=videos).values('user').distinct().count()
-            completed_events = models.CourseVideoProgress.objects.filter(course_video__in=videos, completed=True).count()
-
-            course_list.append({
-                'id': c.id,
-                'title': c.title,
-                'slug': c.slug,
-                'students_count': c.students_count,
-                'videos_count': videos.count(),
-                'tests_count': tests_cnt + ct_tests_cnt,
-                'assignments_count': assigns_cnt + ct_assigns_cnt,
-                'unique_learners': unique_learners,
-                'completed_video_events': completed_events,
-                'created_at': c.created_at,
-            })
-
-        return Response({'courses': course_list}, status=200)
+        return dashboard.serve(request.user, 'courses')
 
 
 class TeacherAnalyticsEngagementAPIView(APIView):
@@ -898,45 +538,13 @@ class TeacherAnalyticsEngagementAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
         try:
-            days = int(request.query_params.get('days', 30))
+            days = int(request.query_params.get('days', dashboard.ENGAGEMENT_DEFAULT_DAYS))
         except (TypeError, ValueError):
-            days = 30
-        since = timezone.now() - timedelta(days=max(1, days))
-
-        channels = models.Channel.objects.filter(user=user)
-        courses = models.Course.objects.filter(channel__in=channels)
-        videos = models.CourseVideo.objects.filter(course__in=courses)
-
-        progress_qs = models.CourseVideoProgress.objects.filter(course_video__in=videos, updated_at__gte=since)
-        progress_events = progress_qs.count()
-        active_learners = progress_qs.values('user').distinct().count()
-
-        # Video-level tests
-        vr_qs = models.TestResult.objects.filter(test__course_video__in=videos, completed_at__gte=since)
-        video_test_results = vr_qs.count()
-        video_test_passed = vr_qs.filter(score__gte=F('test__pass_score')).count()
-
-        # CourseType-level tests
-        ct_vr_qs = models.CourseTypeTestResult.objects.filter(test__course_type__course__in=courses, completed_at__gte=since)
-        ct_test_results = ct_vr_qs.count()
-        ct_test_passed = ct_vr_qs.filter(score__gte=F('test__pass_score')).count()
-
-        # Assignments
-        va_qs = models.AssignmentSubmission.objects.filter(assignment__course_video__in=videos, submitted_at__gte=since)
-        ct_va_qs = models.CourseTypeAssignmentSubmission.objects.filter(assignment__course_type__course__in=courses, submitted_at__gte=since)
-
-        data = {
-            'window_days': days,
-            'progress_events': progress_events,
-            'active_learners': active_learners,
-            'video_test_pass_rate': round((video_test_passed / video_test_results) * 100.0, 2) if video_test_results else 0.0,
-            'ct_test_results': ct_test_results,
-            'ct_test_pass_rate': round((ct_test_passed / ct_test_results) * 100.0, 2) if ct_test_results else 0.0,
-            'assignment_submissions': va_qs.count() + ct_va_qs.count(),
-        }
-        return Response(data, status=200)
+            days = dashboard.ENGAGEMENT_DEFAULT_DAYS
+        if days == dashboard.ENGAGEMENT_DEFAULT_DAYS:
+            return dashboard.serve(request.user, 'engagement')
+        return Response(dashboard.build_engagement(request.user, days), status=200)
 
 
 # =============================
@@ -1044,7 +652,13 @@ class TeacherReelSummaryAPIView(APIView):
 # Teacher: Students (buyers) per course
 # =============================
 class TeacherCourseStudentsAPIView(APIView):
-    """List students who purchased the course (full or course_type)."""
+    """List students who purchased the course (full or course_type).
+
+    Paginated in the database; per-row metrics for the current page come from
+    grouped aggregates over the page's user ids. `?ordering=` accepts
+    purchased_at, purchases, tests, assignments, last_activity, username
+    (prefix with '-' for descending; default -purchased_at).
+    """
     permission_classes = [IsAuthenticated]
     pagination_class = CustomPagination
 
@@ -1053,40 +667,63 @@ class TeacherCourseStudentsAPIView(APIView):
         course = get_object_or_404(models.Course, slug=course_slug, channel=channel)
 
         # Purchases for this course: full course or course_type under this course
-        purchase_qs = models.WalletTransaction.objects.filter(
-            Q(course=course, transaction_type='course_purchase') |
-            Q(course_type__course=course, transaction_type='course_type_purchase')
-        ).select_related('wallet__user').order_by('-created_at')
+        purchase_qs = entitlements.students(course)
+        test_qs = models.TestResult.objects.filter(test__course_video__course=course)
+        ct_test_qs = models.CourseTypeTestResult.objects.filter(test__course_type__course=course)
+        assignment_qs = models.AssignmentSubmission.objects.filter(assignment__course_video__course=course)
+        progress_qs = models.CourseVideoProgress.objects.filter(course_video__course=course)
+
+        students = models.User.objects.filter(id__in=purchase_qs.values('user_id'))
+
+        # Sorting: only the requested column is annotated (correlated subquery on indexed user columns)
+        ordering = request.query_params.get('ordering') or '-purchased_at'
+        sort_key = ordering.lstrip('-')
+        if sort_key == 'purchased_at':
+            students = students.annotate(sort_value=analytics.user_subquery(purchase_qs, 'user', Max('created_at')))
+        elif sort_key == 'purchases':
+            students = students.annotate(sort_value=analytics.user_subquery(purchase_qs, 'user', Count('id'), default=0))
+        elif sort_key == 'tests':
+            students = students.annotate(sort_value=(
+                analytics.user_subquery(test_qs, 'user', Count('id'), default=0) +
+                analytics.user_subquery(ct_test_qs, 'user', Count('id'), default=0)
+            ))
+        elif sort_key == 'assignments':
+            students = students.annotate(sort_value=analytics.user_subquery(assignment_qs, 'student', Count('id'), default=0))
+        elif sort_key == 'last_activity':
+            students = students.annotate(sort_value=analytics.user_subquery(progress_qs, 'user', Max('updated_at')))
+        elif sort_key == 'username':
+            students = students.annotate(sort_value=F('username'))
+        else:
+            return Response({'detail': f'Unknown ordering: {ordering}'}, status=400)
+        sort_value = F('sort_value').desc(nulls_last=True) if ordering.startswith('-') else F('sort_value').asc(nulls_last=True)
+        students = students.order_by(sort_value, '-id' if ordering.startswith('-') else 'id')
 
-        user_ids = list(purchase_qs.values_list('wallet__user_id', flat=True).distinct())
-        users = {u.id: u for u in models.User.objects.filter(id__in=user_ids)}
+        # Pagination
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(students, request)
+        page_users = list(page if page is not None else students)
+        page_ids = [u.id for u in page_users]
 
-        # Precompute counts per user
-        videos = models.CourseVideo.objects.filter(course=course)
-        video_ids = list(videos.values_list('id', flat=True))
+        # Page metrics: one grouped query per source
+        purchases = analytics.grouped_by_user(purchase_qs, 'user_id', page_ids, n=Count('id'), last=Max('created_at'))
+        tests = analytics.grouped_by_user(test_qs, 'user_id', page_ids, n=Count('id'))
+        ct_tests = analytics.grouped_by_user(ct_test_qs, 'user_id', page_ids, n=Count('id'))
+        assignments = analytics.grouped_by_user(assignment_qs, 'student_id', page_ids, n=Count('id'))
+        activity = analytics.grouped_by_user(progress_qs, 'user_id', page_ids, last=Max('updated_at'))
 
         rows = []
-        for uid in user_ids:
-            user = users.get(uid)
-            if not user:
-                continue
-            purchases_count = purchase_qs.filter(wallet__user_id=uid).count()
-            tests_count = models.TestResult.objects.filter(user_id=uid, test__course_video_id__in=video_ids).count() \
-                + models.CourseTypeTestResult.objects.filter(user_id=uid, test__course_type__course=course).count()
-            assignments_count = models.AssignmentSubmission.objects.filter(student_id=uid, assignment__course_video_id__in=video_ids).count()
-
+        for user in page_users:
             rows.append({
                 'user': user,
-                'purchases_count': purchases_count,
-                'tests_count': tests_count,
-                'assignments_count': assignments_count,
+                'purchases_count': purchases.get(user.id, {}).get('n', 0),
+                'tests_count': tests.get(user.id, {}).get('n', 0) + ct_tests.get(user.id, {}).get('n', 0),
+                'assignments_count': assignments.get(user.id, {}).get('n', 0),
+                'last_purchase_at': purchases.get(user.id, {}).get('last'),
+                'last_activity_at': activity.get(user.id, {}).get('last'),
             })
 
-        # Pagination
-        paginator = self.pagination_class()
-        page = paginator.paginate_queryset(rows, request)
         if page is not None:
-            data = serializers.TeacherStudentRowSerializer(page, many=True).data
+            data = serializers.TeacherStudentRowSerializer(rows, many=True).data
             resp = paginator.get_paginated_response(data)
             resp.data['course'] = {'id': course.id, 'title': course.title}
             return resp
@@ -1137,74 +774,41 @@ class TeacherCourseStudentsStatsAPIView(APIView):
         days = max(1, min(days, 365))
         since = timezone.now() - timedelta(days=days)
 
-        # Purchases (distinct buyers)
-        purchases = models.WalletTransaction.objects.filter(
-            Q(course=course, transaction_type='course_purchase') |
-            Q(course_type__course=course, transaction_type='course_type_purchase')
-        )
-        total_students = purchases.values('wallet__user').distinct().count()
-        new_students_window = purchases.filter(created_at__gte=since).values('wallet__user').distinct().count()
-
-        # Purchases by day
-        purchases_daily = (
-            purchases.filter(created_at__gte=since)
-            .annotate(day=TruncDate('created_at'))
-            .values('day')
-            .annotate(count=Count('id', distinct=True), buyers=Count('wallet__user', distinct=True))
-            .order_by('day')
-        )
+        # Purchases (distinct buyers): CourseEntitlement arxivlangan oylarni ham saqlaydi
+        buyers = entitlements.students(course)
+        total_students = buyers.values('user').distinct().count()
+        new_students_window = buyers.filter(created_at__gte=since).values('user').distinct().count()
 
-        # Revenue (teacher earnings)
-        earnings_qs = models.WalletTransaction.objects.filter(
-            Q(course=course, transaction_type='course_earning') |
-            Q(course_type__course=course, transaction_type='course_type_earning'),
-            wallet__user=channel.user,
-        )
-        revenue_total = earnings_qs.aggregate(s=Sum('amount'))['s'] or 0
-        revenue_window = earnings_qs.filter(created_at__gte=since).aggregate(s=Sum('amount'))['s'] or 0
-        revenue_daily = (
-            earnings_qs.filter(created_at__gte=since)
-            .annotate(day=TruncDate('created_at'))
-            .values('day')
-            .annotate(amount=Sum('amount'))
-            .order_by('day')
-        )
+        # Daily series from rollups (+ live delta for today)
+        series = rollups.daily_series([course.id], since_day=timezone.localdate(since))
+        purchases_daily = [
+            {'day': r['day'], 'count': r['purchases'], 'buyers': r['buyers']} for r in series if r['purchases']
+        ]
+
+        # Revenue (teacher earnings): saqlangan kunlik rollup, tranzaksiyalar arxivlansa ham
+        revenue_total = rollups.series_totals(rollups.daily_series([course.id]))['revenue']
+        revenue_daily = [{'day': r['day'], 'amount': r['revenue']} for r in series if r['revenue']]
+        revenue_window = sum((r['amount'] for r in revenue_daily), 0)
 
         # Engagement within the course (progress events per day, active learners per day)
-        videos = models.CourseVideo.objects.filter(course=course)
-        progress_qs = models.CourseVideoProgress.objects.filter(course_video__in=videos, updated_at__gte=since)
-        progress_daily = (
-            progress_qs.annotate(day=TruncDate('updated_at'))
-            .values('day')
-            .annotate(events=Count('id'), active_learners=Count('user', distinct=True))
-            .order_by('day')
-        )
+        progress_daily = [
+            {'day': r['day'], 'events': r['progress_events'], 'active_learners': r['active_learners']}
+            for r in series if r['progress_events']
+        ]
 
         # Test results (video + course_type) by day
-        video_results = models.TestResult.objects.filter(test__course_video__in=videos, completed_at__gte=since)
-        ct_results = models.CourseTypeTestResult.objects.filter(test__course_type__course=course, completed_at__gte=since)
-        def _results_agg(qs):
-            return (
-                qs.annotate(day=TruncDate('completed_at'))
-                .values('day')
-                .annotate(
-                    attempts=Count('id'),
-                    passed=Count('id', filter=Q(score__gte=F('test__pass_score')))
-                )
-                .order_by('day')
-            )
-        video_tests_daily = _results_agg(video_results)
-        ct_tests_daily = _results_agg(ct_results)
+        video_tests_daily = [
+            {'day': r['day'], 'attempts': r['video_test_attempts'], 'passed': r['video_test_passed']}
+            for r in series if r['video_test_attempts']
+        ]
+        ct_tests_daily = [
+            {'day': r['day'], 'attempts': r['ct_test_attempts'], 'passed': r['ct_test_passed']}
+            for r in series if r['ct_test_attempts']
+        ]
 
         # Assignment submissions by day
-        va_qs = models.AssignmentSubmission.objects.filter(assignment__course_video__in=videos, submitted_at__gte=since)
-        ct_va_qs = models.CourseTypeAssignmentSubmission.objects.filter(assignment__course_type__course=course, submitted_at__gte=since)
-        submissions_daily = (
-            va_qs.annotate(day=TruncDate('submitted_at')).values('day').annotate(count=Count('id')).order_by('day')
-        )
-        ct_submissions_daily = (
-            ct_va_qs.annotate(day=TruncDate('submitted_at')).values('day').annotate(count=Count('id')).order_by('day')
-        )
+        submissions_daily = [{'day': r['day'], 'count': r['video_submissions']} for r in series if r['video_submissions']]
+        ct_submissions_daily = [{'day': r['day'], 'count': r['ct_submissions']} for r in series if r['ct_submissions']]
 
         return Response({
             'course': {'id': course.id, 'title': course.title},
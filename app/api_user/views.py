@@ -1,12 +1,14 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Sum, Avg
+from django.db.models import Count
 from django.utils import timezone
 
-from app import models
+from app import models, user_activity
 from . import serializers
 from app.api.wallet_serializers import WalletSerializer, WalletTransactionSerializer
+from app.api.wallet_views import wallet_transactions_queryset
+from app.pagination import KeysetPagination
 
 
 def ensure_student(user):
@@ -19,47 +21,8 @@ class UserOverviewAPIView(APIView):
 
     def get(self, request):
         user = request.user
-        # Video progress
-        progress_qs = models.CourseVideoProgress.objects.filter(user=user)
-        videos_watched = progress_qs.values('course_video_id').distinct().count()
-        seconds_watched = int(progress_qs.aggregate(s=Sum('seconds_watched'))['s'] or 0)
-        # Tests
-        test_results = models.TestResult.objects.filter(user=user)
-        ct_test_results = models.CourseTypeTestResult.objects.filter(user=user)
-        tests_attempts = test_results.count() + ct_test_results.count()
-        avg1 = test_results.aggregate(a=Avg('score'))['a'] or 0
-        avg2 = ct_test_results.aggregate(a=Avg('score'))['a'] or 0
-        denom = (1 if test_results.exists() else 0) + (1 if ct_test_results.exists() else 0)
-        avg_test_score = round(((avg1 + avg2) / denom), 2) if denom else None
-        # Assignments
-        assignments_submitted = models.AssignmentSubmission.objects.filter(student=user).count() \
-                               + models.CourseTypeAssignmentSubmission.objects.filter(student=user).count()
-        # Likes
-        liked_reels = models.LikeReels.objects.filter(user=user).count()
-        # Comments (sum across comment models)
-        comments_count = (
-            models.MovieComment.objects.filter(user=user).count() +
-            models.CourseVideoComment.objects.filter(user=user).count() +
-            models.ReelComment.objects.filter(user=user).count() +
-            models.ChannelComment.objects.filter(user=user).count() +
-            models.PlaylistComment.objects.filter(user=user).count()
-        )
-        # Playlists
-        playlists_count = models.Playlist.objects.filter(owner=user).count()
-        # Wallet
-        wallet, _ = models.Wallet.objects.get_or_create(user=user)
-
-        data = serializers.OverviewStatsSerializer({
-            'videos_watched': videos_watched,
-            'seconds_watched': seconds_watched,
-            'tests_attempts': tests_attempts,
-            'avg_test_score': avg_test_score,
-            'assignments_submitted': assignments_submitted,
-            'liked_reels': liked_reels,
-            'comments_count': comments_count,
-            'playlists_count': playlists_count,
-            'wallet_balance': wallet.balance,
-        }).data
+        # Barcha hisoblagichlar bitta so'rovda (app.user_activity)
+        data = serializers.OverviewStatsSerializer(user_activity.overview_counters(user)).data
         return Response({'is_student': ensure_student(user), 'stats': data}, status=200)
 
 
@@ -136,22 +99,14 @@ class UserLikesCommentsAPIView(APIView):
     def get(self, request):
         user = request.user
         likes = list(models.LikeReels.objects.filter(user=user).values('id', 'reel_id', 'reel__poster', 'created_at').order_by('-created_at')[:100])
-        # Latest comments across all comment models
-        comments = []
-        for m, key in [
-            (models.MovieComment, 'movie_id'),
-            (models.CourseVideoComment, 'course_video_id'),
-            (models.ReelComment, 'reel_id'),
-            (models.ChannelComment, 'channel_id'),
-            (models.PlaylistComment, 'playlist_id'),
-        ]:
-            for c in m.objects.filter(user=user).order_by('-created_at')[:20].values('id', 'text', 'created_at', key):
-                item = dict(c)
-                item['target_field'] = key
-                comments.append(item)
-        comments.sort(key=lambda x: x['created_at'], reverse=True)
-        comments = comments[:100]
-        return Response({'likes': likes, 'comments': comments}, status=200)
+        # Barcha izoh jadvallari bitta UNION ALL so'rovida; ?cursor= bilan keyingi sahifa
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 100)), 100))
+        except (TypeError, ValueError):
+            limit = 100
+        cursor = user_activity.decode_cursor(request.query_params.get('cursor'))
+        comments, next_cursor = user_activity.comment_feed(user, limit=limit, cursor=cursor)
+        return Response({'likes': likes, 'comments': comments, 'comments_next_cursor': next_cursor}, status=200)
 
 
 class UserSubmittedAssignmentsAPIView(APIView):
@@ -481,15 +436,26 @@ class UserCertificatesAPIView(APIView):
         return Response({'certificates': []}, status=200)
 
 
+class UserWalletTransactionPagination(KeysetPagination):
+    page_size = 50
+    max_page_size = 100
+
+
 class UserWalletAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         wallet, _ = models.Wallet.objects.get_or_create(user=request.user)
         wallet_data = WalletSerializer(wallet).data
-        tx = models.WalletTransaction.objects.filter(wallet=wallet).order_by('-created_at')[:50]
+        paginator = UserWalletTransactionPagination()
+        tx = paginator.paginate_queryset(wallet_transactions_queryset(request.user), request, view=self)
         tx_data = WalletTransactionSerializer(tx, many=True).data
-        return Response({'wallet': wallet_data, 'transactions': tx_data}, status=200)
+        return Response({
+            'wallet': wallet_data,
+            'transactions': tx_data,
+            'next': paginator.get_next_link(),
+            'next_cursor': paginator.next_cursor,
+        }, status=200)
 
 
 class UserSettingsAPIView(APIView):
@@ -0,0 +1,238 @@
+"""Savat (cart) orqali bir nechta kurs / kurs turini bitta tranzaksiyada sotib olish.
+
+`price_cart()` butun savatni o'zgarmas sondagi so'rovlar bilan tekshiradi va
+narxlaydi (kurslar, kurs turlari va avval sotib olinganlar bittadan so'rov,
+promokod qoidalari keshdan - `app.promos`). `checkout()` esa barcha
+hamyonlarni id tartibida qulflaydi, egalikni qulf ostida qayta tekshiradi va barcha ledger qatorlarini bitta
+`ledger.post()` bilan yozadi: har bir hamyonga bitta balans UPDATE.
+"""
+import json
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from app import entitlements, ledger, models, promos
+
+
+PLATFORM_COMMISSION_RATE = Decimal('0.05')
+MAX_CART_ITEMS = 50
+
+
+class CheckoutError(ValueError):
+    """Savatdagi elementlar yoki promokod noto'g'ri bo'lsa."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(json.dumps(errors, ensure_ascii=False, default=str))
+
+
+def build_purchase(buyer_wallet, seller_wallet, *, course, course_type=None, amount,
+                   original_amount=None, discount_amount=None, promo_code=None,
+                   transaction_type='course_purchase', commission_rate=PLATFORM_COMMISSION_RATE):
+    """Unsaved (buyer_tx, seller_tx, pending_commission_or_None) for one purchase."""
+    amount = Decimal(str(amount))
+    commission = amount * Decimal(str(commission_rate))
+    purchase_type = "Kurs turi" if course_type else "Kurs"
+    item_name = f"{course_type.name}" if course_type else course.title
+    buyer_id, seller_id = buyer_wallet.user_id, seller_wallet.user_id
+    buyer_tx = models.WalletTransaction(
+        wallet=buyer_wallet,
+        transaction_type=transaction_type,
+        amount=-amount,
+        description=f"{purchase_type} sotib olish: {item_name}",
+        course=course,
+        course_type=course_type,
+        from_user_id=buyer_id,
+        to_user_id=seller_id,
+        promo_code_id=promo_code.id if promo_code else None,
+        original_amount=Decimal(str(original_amount)) if original_amount is not None else amount,
+        discount_amount=Decimal(str(discount_amount)) if discount_amount is not None else Decimal('0.00'),
+    )
+    seller_tx = models.WalletTransaction(
+        wallet=seller_wallet,
+        transaction_type=('course_type_earning' if course_type else 'course_earning'),
+        amount=amount - commission,
+        description=f"{purchase_type} sotishdan daromad: {item_name}",
+        course=course,
+        course_type=course_type,
+        from_user_id=buyer_id,
+        to_user_id=seller_id,
+    )
+    pending = None
+    if commission > 0:
+        pending = models.PendingCommission(
+            amount=commission,
+            course=course,
+            course_type=course_type,
+            from_user_id=buyer_id,
+            description=f"Platforma komissiyasi: {item_name}",
+        )
+    return buyer_tx, seller_tx, pending
+
+
+def link_purchases(pairs, pending):
+    """Save buyer<->seller links and commission journal rows for posted purchases."""
+    for buyer_tx, seller_tx in pairs:
+        buyer_tx.related_transaction = seller_tx
+        seller_tx.related_transaction = buyer_tx
+    models.WalletTransaction.objects.bulk_update(
+        [tx for pair in pairs for tx in pair], ['related_transaction']
+    )
+    pending = [p for p in pending if p is not None]
+    for p in pending:
+        p.purchase_transaction_id = p.purchase_transaction.pk
+    if pending:
+        models.PendingCommission.objects.bulk_create(pending)
+
+
+# ----------------------------
+# Cart
+# ----------------------------
+def _load_promo(code):
+    if not code:
+        return None
+    rule = promos.get_rule(code)
+    if rule is None:
+        raise CheckoutError({'promo_code': 'Promo code not found'})
+    if not rule.is_valid_at(timezone.now()):
+        raise CheckoutError({'promo_code': 'Promo code is not valid now'})
+    return rule
+
+
+def price_cart(user, items, promo_code=None):
+    """Validate and price cart `items` ([{'course_id': ..} | {'course_type_id': ..}]).
+
+    Returns (lines, promo); raises CheckoutError with per-item errors.
+    """
+    keys = [('course', i['course_id']) if i.get('course_id') else ('course_type', i['course_type_id']) for i in items]
+    course_ids = [pk for kind, pk in keys if kind == 'course']
+    course_type_ids = [pk for kind, pk in keys if kind == 'course_type']
+    courses = models.Course.objects.select_related('channel__user').in_bulk(course_ids)
+    course_types = models.CourseType.objects.select_related('course__channel__user').in_bulk(course_type_ids)
+    owned = entitlements.owned(user, course_ids, course_type_ids)
+    promo = _load_promo(promo_code)
+
+    lines, errors, seen = [], {}, set()
+    for idx, (kind, pk) in enumerate(keys):
+        label = f'item {idx + 1}'
+        if (kind, pk) in seen:
+            errors[label] = 'Duplicate item'
+            continue
+        seen.add((kind, pk))
+        if kind == 'course':
+            course, course_type = courses.get(pk), None
+            if course is None:
+                errors[label] = 'Course not found'
+                continue
+            price = course.price
+            if course.is_free:
+                errors[label] = 'This course is free'
+            elif not price or price <= 0:
+                errors[label] = 'Course price not set'
+            elif getattr(course, 'purchase_scope', 'course') == 'course_type':
+                errors[label] = "Bu kursda to'lov CourseType darajasida amalga oshiriladi"
+            elif (kind, pk) in owned:
+                errors[label] = 'Siz bu kursni allaqachon sotib olgansiz'
+        else:
+            course_type = course_types.get(pk)
+            if course_type is None:
+                errors[label] = 'Course type not found'
+                continue
+            course = course_type.course
+            price = course_type.price if course_type.price is not None else course.price
+            if course_type.price is None and (not course.price or course.price <= 0):
+                errors[label] = 'Price is not set for this course type or its parent course'
+            elif course.is_free:
+                errors[label] = 'This course is free'
+            elif getattr(course, 'purchase_scope', 'course') == 'course':
+                errors[label] = 'Bu kurs faqat butun kurs sifatida sotib olinadi'
+            elif (kind, pk) in owned:
+                errors[label] = 'Siz bu kurs turini allaqachon sotib olgansiz'
+        if label in errors:
+            continue
+        seller = course.channel.user if course.channel_id else None
+        if seller is None:
+            errors[label] = 'Seller not found'
+            continue
+        if seller.pk == user.pk:
+            errors[label] = "O'z kursini sotib olish mumkin emas"
+            continue
+
+        discount = Decimal('0')
+        applied = promo is not None and promo.applies_to(course, course_type)
+        if applied:
+            discount = promo.discount(price)
+        lines.append({
+            'kind': kind,
+            'course': course,
+            'course_type': course_type,
+            'seller': seller,
+            'price': price,
+            'discount': discount,
+            'amount': price - discount,
+            'promo_applied': applied,
+        })
+
+    if promo is not None and not errors and not any(l['promo_applied'] for l in lines):
+        errors['promo_code'] = 'Promo not applicable to cart items'
+    if errors:
+        raise CheckoutError(errors)
+    return lines, promo
+
+
+def checkout(user, items, promo_code=None):
+    """Price the cart and post every purchase in one atomic batch."""
+    lines, promo = price_cart(user, items, promo_code)
+
+    buyer_wallet, _ = models.Wallet.objects.get_or_create(user=user)
+    sellers = {l['seller'].pk: l['seller'] for l in lines}
+    wallets = {w.user_id: w for w in models.Wallet.objects.filter(user_id__in=sellers)}
+    missing = [models.Wallet(user_id=uid) for uid in sellers if uid not in wallets]
+    if missing:
+        models.Wallet.objects.bulk_create(missing, ignore_conflicts=True)
+        wallets = {w.user_id: w for w in models.Wallet.objects.filter(user_id__in=sellers)}
+
+    with transaction.atomic():
+        ledger.lock_wallets([buyer_wallet.pk] + [w.pk for w in wallets.values()])
+        # Parallel so'rov shu orada sotib olgan bo'lishi mumkin: qulf ostida qayta tekshirish
+        owned = entitlements.owned(
+            user,
+            [l['course'].id for l in lines if l['kind'] == 'course'],
+            [l['course_type'].id for l in lines if l['kind'] == 'course_type'],
+        )
+        if owned:
+            raise CheckoutError({'items': 'Some items are already purchased'})
+
+        entries, pairs, pending = [], [], []
+        for line in lines:
+            buyer_tx, seller_tx, commission = build_purchase(
+                buyer_wallet, wallets[line['seller'].pk],
+                course=line['course'],
+                course_type=line['course_type'],
+                amount=line['amount'],
+                original_amount=line['price'],
+                discount_amount=line['discount'],
+                promo_code=promo if line['promo_applied'] else None,
+                transaction_type='course_type_purchase' if line['kind'] == 'course_type' else 'course_purchase',
+            )
+            if commission is not None:
+                commission.purchase_transaction = buyer_tx
+            entries += [buyer_tx, seller_tx]
+            pairs.append((buyer_tx, seller_tx))
+            pending.append(commission)
+        ledger.post(entries, insufficient_message="Yetarli mablag' mavjud emas")
+        link_purchases(pairs, pending)
+
+        if promo is not None:
+            try:
+                promos.claim(promo, n=sum(1 for l in lines if l['promo_applied']))
+            except promos.PromoError as e:
+                raise CheckoutError({'promo_code': str(e)})
+
+    return {
+        'lines': lines,
+        'promo': promo,
+        'transactions': [buyer_tx for buyer_tx, _ in pairs],
+        'balance': buyer_wallet.balance,
+    }
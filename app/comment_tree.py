@@ -0,0 +1,206 @@
+"""Izohlar daraxti (CommentBase): saqlangan path va hisoblagichlar, daraxtni yuklash.
+
+Har bir izohda `path` (ota-bobolar va o'zining id lari, har biri PATH_STEP
+xonali raqam), `root_id`, `depth`, `replies_count` (to'g'ridan-to'g'ri
+javoblar) va `descendants_count` (barcha javoblar) saqlanadi. Ular izoh
+qo'shilganda va o'chirilganda signal orqali F() bilan yangilanadi
+(izohni boshqa otaga ko'chirish qo'llab-quvvatlanmaydi). `bulk_create`
+signal yubormaydi: shunday yozilgan izohlar (va keyin ularga yozilgan
+javoblar) path='' bilan qoladi va daraxtda ko'rinmaydi, shuning uchun har
+qanday bulk insertdan keyin `manage.py comment_tree --fix` ishga tushirilishi kerak.
+
+path uzunligi cheklangan, shuning uchun MAX_DEPTH dan chuqur javob otasining
+yoniga (bobosining javobi sifatida) ulanadi.
+
+path bo'yicha tartib daraxt tartibiga teng, subtree esa bitta indeksli
+oraliq (`subtree_q`). `load_replies()` sahifadagi izohlarning javoblarini
+(`?replies=N` bo'lsa har bir otaning birinchi N tasini) bitta so'rovda,
+muallif (user) JOIN qilingan holda oladi va daraxtni Python da yig'adi.
+Movie, CourseVideo, Reel, Channel va Playlist izohlari uchun bir xil.
+"""
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from app import models
+
+
+COMMENT_MODELS = (
+    models.MovieComment, models.CourseVideoComment, models.ReelComment,
+    models.ChannelComment, models.PlaylistComment,
+)
+TREE_FIELDS = ('path', 'root_id', 'depth', 'replies_count', 'descendants_count')
+PATH_STEP = 10
+# path max_length=1000 -> 100 ta segment, depth 0..99
+MAX_DEPTH = models.MovieComment._meta.get_field('path').max_length // PATH_STEP - 1
+
+
+def segment(pk):
+    return f'{pk:0{PATH_STEP}d}'
+
+
+def ancestor_ids(path):
+    """Ids encoded in `path`, root first."""
+    return [int(path[i:i + PATH_STEP]) for i in range(0, len(path), PATH_STEP)]
+
+
+def subtree_q(path):
+    """Strict descendants of the node at `path` (one index range)."""
+    upper = path[:-PATH_STEP] + segment(int(path[-PATH_STEP:]) + 1)
+    return Q(path__gt=path, path__lt=upper)
+
+
+# ----------------------------
+# Signals
+# ----------------------------
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    parent = None
+    if instance.parent_id is not None:
+        parent = sender.objects.filter(pk=instance.parent_id).values('path', 'root_id', 'depth', 'parent_id').first()
+    if parent is not None and not parent['path']:
+        # Ota bulk_create bilan yozilgan va hali daraxtda yo'q: ikkalasini `comment_tree --fix` tuzatadi
+        return
+    if parent is not None and parent['depth'] >= MAX_DEPTH:
+        # Chegaradan chuqur: javob otasining yoniga ulanadi (path sig'maydi)
+        instance.parent_id = parent['parent_id']
+        parent = sender.objects.filter(pk=instance.parent_id).values('path', 'root_id', 'depth', 'parent_id').first()
+    if parent is None:
+        instance.path, instance.root_id, instance.depth = segment(instance.pk), instance.pk, 0
+    else:
+        instance.path = parent['path'] + segment(instance.pk)
+        instance.root_id, instance.depth = parent['root_id'], parent['depth'] + 1
+    with transaction.atomic():
+        sender.objects.filter(pk=instance.pk).update(
+            parent_id=instance.parent_id, path=instance.path, root_id=instance.root_id, depth=instance.depth,
+        )
+        if parent is not None:
+            _bump(sender, instance.path, 1)
+
+
+def comment_deleted(sender, instance, **kwargs):
+    # CASCADE bilan o'chgan javoblar uchun ham alohida chaqiriladi; o'chib ketgan
+    # ota-bobolarni yangilash shunchaki hech narsa qilmaydi
+    if instance.path and instance.parent_id is not None:
+        _bump(sender, instance.path, -1)
+
+
+def _bump(model, path, delta):
+    ancestors = ancestor_ids(path)[:-1]
+    model.objects.filter(pk=ancestors[-1]).update(replies_count=F('replies_count') + delta)
+    model.objects.filter(pk__in=ancestors).update(descendants_count=F('descendants_count') + delta)
+
+
+# ----------------------------
+# Loading
+# ----------------------------
+def descendants(model, nodes, reply_limit=None):
+    """Replies under `nodes` (any depth) in tree order, users joined; one query.
+
+    `reply_limit` bo'lsa har bir otaning faqat birinchi N ta javobi olinadi
+    (ROW_NUMBER() OVER (PARTITION BY parent_id ORDER BY path)): katta
+    threadlarda ham har bir ota uchun ko'pi bilan N ta qator o'qiladi.
+    """
+    paths = [n.path for n in nodes if n.path]
+    if not paths or reply_limit == 0:
+        return model.objects.none()
+    replies = model.objects.filter(reduce(or_, (subtree_q(p) for p in paths)))
+    if reply_limit is not None:
+        replies = replies.annotate(
+            reply_rank=Window(RowNumber(), partition_by=F('parent_id'), order_by=F('path').asc()),
+        ).filter(reply_rank__lte=reply_limit)
+    return replies.select_related('user').order_by('path')
+
+
+def load_replies(model, nodes, reply_limit=None):
+    """Attach `tree_replies` to `nodes` and all their replies.
+
+    `reply_limit` har bir tugunda ko'rsatiladigan birinchi javoblar soni;
+    qolganlari replies endpointi orqali sahifalab ochiladi (`replies_count`).
+    Yashirilgan javoblarning javoblari ham ko'rsatilmaydi (otasi yuklanmagan).
+    """
+    nodes = list(nodes)
+    children = defaultdict(list)
+    for node in descendants(model, nodes, reply_limit):
+        children[node.parent_id].append(node)
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        node.tree_replies = children.get(node.pk, [])
+        stack.extend(node.tree_replies)
+    return nodes
+
+
+def serialize(comment):
+    """Nested dict for a node prepared by `load_replies`."""
+    user = comment.user
+    return {
+        "id": comment.id,
+        "user": {
+            "username": user.username if user else "Anonymous",
+            "avatar": user.avatar.url if user and user.avatar else None,
+        },
+        "text": comment.text,
+        "created_at": comment.created_at,
+        "replies_count": comment.replies_count,
+        "replies": [serialize(reply) for reply in comment.tree_replies],
+    }
+
+
+# ----------------------------
+# Rebuild
+# ----------------------------
+def compute(model):
+    """{pk: {path, root_id, depth, replies_count, descendants_count}} from `parent` links."""
+    rows = list(model.objects.order_by('pk').values_list('pk', 'parent_id'))
+    parent_of = dict(rows)
+    result = {}
+
+    def resolve(pk):
+        chain = []
+        while pk is not None and pk not in result:
+            chain.append(pk)
+            pk = parent_of.get(pk)
+        for node in reversed(chain):
+            parent = result.get(parent_of[node])
+            if parent is None:
+                result[node] = {'path': segment(node), 'root_id': node, 'depth': 0}
+            else:
+                result[node] = {
+                    'path': parent['path'] + segment(node),
+                    'root_id': parent['root_id'], 'depth': parent['depth'] + 1,
+                }
+
+    for pk, _ in rows:
+        resolve(pk)
+    for values in result.values():
+        values['replies_count'] = values['descendants_count'] = 0
+    for pk, parent_id in rows:
+        if parent_id is not None:
+            result[parent_id]['replies_count'] += 1
+            for ancestor in ancestor_ids(result[pk]['path'])[:-1]:
+                result[ancestor]['descendants_count'] += 1
+    return result
+
+
+def rebuild(comment_models=COMMENT_MODELS, dry_run=False):
+    """{model label: drifted row count}; rows are rewritten unless `dry_run`."""
+    result = {}
+    for model in comment_models:
+        with transaction.atomic():
+            expected = compute(model)
+            stored = model.objects.values('pk', *TREE_FIELDS)
+            drifted = [
+                model(pk=row['pk'], **expected[row['pk']])
+                for row in stored
+                if any(row[f] != expected[row['pk']][f] for f in TREE_FIELDS)
+            ]
+            if drifted and not dry_run:
+                model.objects.bulk_update(drifted, list(TREE_FIELDS), batch_size=500)
+        result[model._meta.label] = len(drifted)
+    return result
@@ -0,0 +1,255 @@
+"""Course kartochkasidagi keshlangan agregatlar.
+
+students_count (kursga huquqi bor foydalanuvchilar), lessons_count va
+total_duration_* (kurs videolari), rating_sum/rating_count/rating_avg
+(kurs videolariga qo'yilgan baholar). Video va baho o'zgarishlari shu
+tranzaksiya ichida F() bilan bitta UPDATE orqali yangilanadi:
+
+- CourseVideo qo'shish, o'chirish, duration yoki kursini o'zgartirish: signal
+- CourseVideoRating saqlash / o'chirish: signal (eski qiymat app/ratings.py dan)
+
+students_count esa xarid tranzaksiyasida kurs qatorini qulflamaydi:
+`entitlements.grant()` / `revoke_on_delete` CourseStudentDelta jurnaliga
+yozadi, `fold_students()` (Celery beat, har daqiqa) kurs qatoriga yig'adi.
+Shu sababli students_count bir daqiqagacha orqada qolishi mumkin.
+
+`verify()` / `rebuild()` va `course_stats` komandasi manba jadvallardan
+qayta hisoblab drift ni topadi va tuzatadi.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from app import models
+from app import ratings as ratings_module
+
+
+AGGREGATE_FIELDS = (
+    'students_count', 'lessons_count', 'total_duration_seconds', 'total_duration_minutes',
+    'rating_sum', 'rating_count', 'rating_avg',
+)
+
+
+def _minutes(seconds):
+    # Yarim daqiqadan boshlab yuqoriga yaxlitlanadi
+    return (seconds + 30) // 60
+
+
+def _update(course_id, *, students=0, lessons=0, seconds=0, rating_sum=0, ratings=0):
+    """Apply deltas to one course with F() (derived columns included)."""
+    fields = {}
+    if students:
+        fields['students_count'] = F('students_count') + students
+    if lessons:
+        fields['lessons_count'] = F('lessons_count') + lessons
+    if seconds:
+        new_seconds = F('total_duration_seconds') + seconds
+        fields['total_duration_seconds'] = new_seconds
+        fields['total_duration_minutes'] = (new_seconds + 30) / 60
+    ratings_module.apply(models.Course, course_id, rating_sum=rating_sum, ratings=ratings, **fields)
+
+
+# ----------------------------
+# Students
+# ----------------------------
+# fold_students() bir partiyada yig'adigan jurnal qatorlari soni
+FOLD_BATCH_SIZE = 5000
+
+
+def add_students(deltas):
+    """{course_id: +n/-n} distinct o'quvchilar o'zgarishi: jurnalga bitta INSERT."""
+    rows = [
+        models.CourseStudentDelta(course_id=course_id, delta=n)
+        for course_id, n in sorted(deltas.items()) if n
+    ]
+    if rows:
+        models.CourseStudentDelta.objects.bulk_create(rows)
+
+
+def fold_students_batch(batch_size=FOLD_BATCH_SIZE):
+    """Add one batch of journal rows to Course.students_count and delete them; returns rows folded."""
+    with transaction.atomic():
+        ids = list(
+            models.CourseStudentDelta.objects.select_for_update(skip_locked=True)
+            .order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        for course_id, n in sorted(_pending_students(pk__in=ids).items()):
+            if n:
+                _update(course_id, students=n)
+        models.CourseStudentDelta.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def fold_students(batch_size=FOLD_BATCH_SIZE):
+    """Fold the whole students journal in batches (Celery beat); returns rows folded."""
+    total = 0
+    while True:
+        n = fold_students_batch(batch_size)
+        total += n
+        if n < batch_size:
+            return total
+
+
+def _pending_students(**filters):
+    """{course_id: sum of unfolded deltas}."""
+    rows = (
+        models.CourseStudentDelta.objects.filter(**filters)
+        .values('course_id').annotate(n=Sum('delta')).order_by()
+    )
+    return {row['course_id']: row['n'] for row in rows}
+
+
+def count_new_students(pairs):
+    """(user_id, course_id) juftliklari ichidan hali huquqi yo'qlari, kurs bo'yicha soni.
+
+    `entitlements.grant()` yozishdan oldin chaqiradi (xaridor hamyoni qulf ostida).
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return Counter()
+    existing = set(
+        models.CourseEntitlement.objects
+        .filter(user_id__in={u for u, _ in pairs}, course_id__in={c for _, c in pairs})
+        .values_list('user_id', 'course_id')
+    )
+    return Counter(course_id for _, course_id in pairs - existing)
+
+
+# ----------------------------
+# Videos (signals)
+# ----------------------------
+def remember_video(sender, instance, raw=False, **kwargs):
+    instance._course_stats_old = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._course_stats_old = (
+        sender.objects.filter(pk=instance.pk).values('course_id', 'duration').first()
+    )
+
+
+def _video_ratings(video_id):
+    # Videoning o'z saqlangan reytingi (app/ratings.py)
+    row = models.CourseVideo.objects.filter(pk=video_id).values('rating_sum', 'rating_count').first()
+    return (row['rating_sum'], row['rating_count']) if row else (0, 0)
+
+
+def video_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    duration = instance.duration or 0
+    old = getattr(instance, '_course_stats_old', None)
+    if created or old is None:
+        if created:
+            _update(instance.course_id, lessons=1, seconds=duration)
+        return
+    if old['course_id'] != instance.course_id:
+        # Video boshqa kursga ko'chirildi: darslar, davomiylik va baholar ham ko'chadi
+        rating_sum, ratings = _video_ratings(instance.pk)
+        _update(old['course_id'], lessons=-1, seconds=-(old['duration'] or 0), rating_sum=-rating_sum, ratings=-ratings)
+        _update(instance.course_id, lessons=1, seconds=duration, rating_sum=rating_sum, ratings=ratings)
+    elif (old['duration'] or 0) != duration:
+        _update(instance.course_id, seconds=duration - (old['duration'] or 0))
+
+
+def video_deleted(sender, instance, **kwargs):
+    # Videoning baholari CASCADE bilan o'chadi va rating_deleted da hisobga olinadi
+    _update(instance.course_id, lessons=-1, seconds=-(instance.duration or 0))
+
+
+# ----------------------------
+# Ratings (signals)
+# ----------------------------
+def _rating_course_id(instance):
+    return models.CourseVideo.objects.filter(pk=instance.course_video_id).values_list('course_id', flat=True).first()
+
+
+def rating_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # Eski qiymatni ratings.remember_rating o'qib qo'ygan (qulf ostida)
+    old = getattr(instance, '_ratings_old', None)
+    if created or old is None:
+        if created:
+            _update(_rating_course_id(instance), rating_sum=instance.value, ratings=1)
+        return
+    if old['course_video_id'] != instance.course_video_id:
+        old_course = models.CourseVideo.objects.filter(pk=old['course_video_id']).values_list('course_id', flat=True).first()
+        _update(old_course, rating_sum=-old['value'], ratings=-1)
+        _update(_rating_course_id(instance), rating_sum=instance.value, ratings=1)
+    elif old['value'] != instance.value:
+        _update(_rating_course_id(instance), rating_sum=instance.value - old['value'])
+
+
+def rating_deleted(sender, instance, **kwargs):
+    _update(_rating_course_id(instance), rating_sum=-instance.value, ratings=-1)
+
+
+# ----------------------------
+# Verify / rebuild
+# ----------------------------
+def compute(course_ids=None):
+    """{course_id: {field: value}} from source tables (three grouped queries)."""
+    courses = models.Course.objects.all()
+    if course_ids is not None:
+        courses = courses.filter(pk__in=course_ids)
+    result = {
+        pk: {'students_count': 0, 'lessons_count': 0, 'total_duration_seconds': 0, 'rating_sum': 0, 'rating_count': 0}
+        for pk in courses.values_list('pk', flat=True)
+    }
+    students = (
+        models.CourseEntitlement.objects.filter(course_id__in=courses.values('pk'))
+        .values('course_id').annotate(n=Count('user', distinct=True)).order_by()
+    )
+    for row in students:
+        result[row['course_id']]['students_count'] = row['n']
+    videos = (
+        models.CourseVideo.objects.filter(course_id__in=courses.values('pk'))
+        .values('course_id').annotate(n=Count('id'), s=Sum('duration')).order_by()
+    )
+    for row in videos:
+        result[row['course_id']].update(lessons_count=row['n'], total_duration_seconds=row['s'] or 0)
+    ratings = (
+        models.CourseVideoRating.objects.filter(course_video__course_id__in=courses.values('pk'))
+        .values('course_video__course_id').annotate(s=Sum('value'), n=Count('id')).order_by()
+    )
+    for row in ratings:
+        result[row['course_video__course_id']].update(rating_sum=row['s'] or 0, rating_count=row['n'])
+    for values in result.values():
+        values['total_duration_minutes'] = _minutes(values['total_duration_seconds'])
+        values['rating_avg'] = ratings_module.average(values['rating_sum'], values['rating_count'])
+    return result
+
+
+def verify(course_ids=None):
+    """[(course_id, field, stored, expected)] for drifted columns.
+
+    students_count uchun "stored" - kurs qatori va hali yig'ilmagan jurnal yig'indisi.
+    """
+    expected = compute(course_ids)
+    stored = models.Course.objects.filter(pk__in=list(expected)).values('pk', *AGGREGATE_FIELDS)
+    pending = _pending_students(course_id__in=list(expected))
+    drift = []
+    for row in stored.order_by('pk'):
+        row['students_count'] += pending.get(row['pk'], 0)
+        for field in AGGREGATE_FIELDS:
+            if row[field] != expected[row['pk']][field]:
+                drift.append((row['pk'], field, row[field], expected[row['pk']][field]))
+    return drift
+
+
+def rebuild(course_ids=None, dry_run=False):
+    """Recompute and store aggregates of drifted courses; returns the drift list."""
+    with transaction.atomic():
+        drift = verify(course_ids)
+        if drift and not dry_run:
+            expected = compute(sorted({d[0] for d in drift}))
+            pending = _pending_students(course_id__in=list(expected))
+            for pk, values in expected.items():
+                # Jurnal qatorlari keyin fold_students() da qo'shiladi
+                values['students_count'] -= pending.get(pk, 0)
+            courses = [models.Course(pk=pk, **values) for pk, values in expected.items()]
+            models.Course.objects.bulk_update(courses, list(AGGREGATE_FIELDS), batch_size=500)
+    return drift
@@ -0,0 +1,171 @@
+"""Kim qaysi kurs / kurs turini sotib olgani (CourseEntitlement).
+
+Yozish: `ledger.post()` xarid tranzaksiyalari bilan bitta DB tranzaksiyasida
+`grant()` ni chaqiradi; admin orqali yaratilgan/o'chirilgan xaridlar
+signal bilan (`grant_on_save`, `revoke_on_delete`), eski tarix esa
+`backfill_entitlements` komandasi bilan. O'qish: `WalletTransaction` ni
+`wallet__user` join bilan skan qilish o'rniga indekslangan point lookup.
+"""
+from collections import Counter
+
+from django.db.models import Q
+
+from app import course_stats, models, partitions
+
+
+# transaction_type -> course_type to'ldiriladimi
+PURCHASE_TYPES = {'course_purchase': False, 'course_type_purchase': True}
+BACKFILL_BATCH_SIZE = 5000
+
+
+def _entitlement(user_id, course_id, course_type_id, tx_id, created_at):
+    return models.CourseEntitlement(
+        user_id=user_id,
+        course_id=course_id,
+        course_type_id=course_type_id,
+        purchase_transaction_id=tx_id,
+        created_at=created_at,
+    )
+
+
+def grant(transactions, wallet_users):
+    """Create entitlements for the purchase rows among saved `transactions`.
+
+    `wallet_users` - {wallet_id: user_id}. Mavjud huquqlar o'zgarmaydi.
+    """
+    rows = []
+    for tx in transactions:
+        if tx.transaction_type not in PURCHASE_TYPES:
+            continue
+        per_type = PURCHASE_TYPES[tx.transaction_type]
+        course_id = tx.course_id
+        if course_id is None and tx.course_type_id is not None:
+            course_id = tx.course_type.course_id
+        if course_id is None or (per_type and tx.course_type_id is None):
+            continue
+        rows.append(_entitlement(
+            wallet_users[tx.wallet_id], course_id,
+            tx.course_type_id if per_type else None, tx.pk, tx.created_at,
+        ))
+    if rows:
+        new_students = course_stats.count_new_students((r.user_id, r.course_id) for r in rows)
+        models.CourseEntitlement.objects.bulk_create(rows, ignore_conflicts=True)
+        course_stats.add_students(new_students)
+    return len(rows)
+
+
+def grant_on_save(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.transaction_type in PURCHASE_TYPES:
+        grant([instance], {instance.wallet_id: instance.wallet.user_id})
+
+
+def revoke_on_delete(sender, instance, **kwargs):
+    if instance.transaction_type not in PURCHASE_TYPES:
+        return
+    revoked = models.CourseEntitlement.objects.filter(purchase_transaction_id=instance.pk)
+    pairs = set(revoked.values_list('user_id', 'course_id'))
+    revoked.delete()
+    gone = Counter(
+        course_id for user_id, course_id in pairs
+        if not models.CourseEntitlement.objects.filter(user_id=user_id, course_id=course_id).exists()
+    )
+    course_stats.add_students({course_id: -n for course_id, n in gone.items()})
+
+
+# ----------------------------
+# Reads
+# ----------------------------
+def owns_course(user, course):
+    """Butun kurs sotib olinganmi (course_purchase)."""
+    return models.CourseEntitlement.objects.filter(user=user, course=course, course_type__isnull=True).exists()
+
+
+def owns_course_type(user, course_type):
+    return models.CourseEntitlement.objects.filter(user=user, course_type=course_type).exists()
+
+
+def owns_any_course_type(user, course):
+    """Shu kursning biror turi sotib olinganmi (course_type_purchase)."""
+    return models.CourseEntitlement.objects.filter(user=user, course=course, course_type__isnull=False).exists()
+
+
+def can_watch(user, course, course_type=None):
+    """Butun kurs yoki videoning kurs turi sotib olingan (bitta so'rov)."""
+    q = Q(course_type__isnull=True)
+    if course_type is not None:
+        q |= Q(course_type=course_type)
+    return models.CourseEntitlement.objects.filter(q, user=user, course=course).exists()
+
+
+def owned(user, course_ids=(), course_type_ids=()):
+    """{('course', id), ('course_type', id)} among the given ids, one query."""
+    rows = models.CourseEntitlement.objects.filter(user=user).filter(
+        Q(course_type__isnull=True, course_id__in=list(course_ids)) |
+        Q(course_type_id__in=list(course_type_ids))
+    ).values_list('course_id', 'course_type_id')
+    return {('course', cid) if ctid is None else ('course_type', ctid) for cid, ctid in rows}
+
+
+def purchased_course_ids(user, courses):
+    """Ids of `courses` the user has bought, honouring `purchase_scope` (one query).
+
+    scope 'course' - butun kurs xaridi; 'course_type' - kursning biror turi.
+    """
+    if not user or not user.is_authenticated:
+        return set()
+    scopes = {c.id: getattr(c, 'purchase_scope', 'course') for c in courses}
+    if not scopes:
+        return set()
+    rows = (
+        models.CourseEntitlement.objects.filter(user=user, course_id__in=list(scopes))
+        .values_list('course_id', 'course_type_id')
+    )
+    return {
+        cid for cid, ctid in rows
+        if (ctid is None) == (scopes[cid] == 'course')
+    }
+
+
+def students(course):
+    """Entitlements of `course` (full course or any of its types)."""
+    return models.CourseEntitlement.objects.filter(course=course)
+
+
+# ----------------------------
+# Backfill
+# ----------------------------
+def backfill(batch_size=BACKFILL_BATCH_SIZE, allow_archived=False):
+    """Create missing entitlements from purchase transactions (idempotent).
+
+    Xaridlar id bo'yicha partiyalab o'qiladi; yangi o'quvchilar
+    CourseStudentDelta jurnaliga tushadi. Returns (scanned, total).
+    Arxivlangan oylardagi xaridlar ko'rinmaydi, shuning uchun arxiv bo'lsa
+    faqat `allow_archived` bilan ishlaydi (ular uchun huquqlar xarid paytida
+    yozilgan bo'ladi).
+    """
+    if not allow_archived:
+        partitions.require_live(None, 'entitlements backfill')
+    txs = (
+        models.WalletTransaction.objects.filter(transaction_type__in=list(PURCHASE_TYPES))
+        .order_by('id')
+        .values_list('id', 'transaction_type', 'wallet__user_id', 'course_id', 'course_type_id',
+                     'course_type__course_id', 'created_at')
+    )
+    scanned = last_id = 0
+    while True:
+        batch = list(txs.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return scanned, models.CourseEntitlement.objects.count()
+        rows = []
+        for tx_id, tx_type, user_id, course_id, course_type_id, type_course_id, created_at in batch:
+            per_type = PURCHASE_TYPES[tx_type]
+            course_id = course_id or type_course_id
+            if course_id is None or (per_type and course_type_id is None):
+                continue
+            rows.append(_entitlement(user_id, course_id, course_type_id if per_type else None, tx_id, created_at))
+        # grant() dagidek: yangi o'quvchilar students_count jurnaliga ham yoziladi
+        new_students = course_stats.count_new_students((r.user_id, r.course_id) for r in rows)
+        models.CourseEntitlement.objects.bulk_create(rows, ignore_conflicts=True)
+        course_stats.add_students(new_students)
+        scanned += len(batch)
+        last_id = batch[-1][0]
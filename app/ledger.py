@@ -0,0 +1,104 @@
+"""Hamyon balanslarini o'zgartirish uchun ledger engine.
+
+Barcha balans o'zgarishlari `post()` orqali o'tadi: tegishli hamyonlar id
+tartibida `select_for_update` bilan qulflanadi (deadlock bo'lmasligi uchun),
+yetarli mablag' qulf ostida tekshiriladi, har bir hamyonga bitta
+`balance = balance + delta` UPDATE yuboriladi (running totallar ham shu
+UPDATE da) va barcha tranzaksiya qatorlari bitta `bulk_create` bilan
+yoziladi.
+
+Xarid tranzaksiyasi qulflaydigan qatorlar: faqat xaridor va sotuvchi
+hamyonlari (bitta o'qituvchining kurslari xaridlari uning hamyonida navbatga
+turadi) va promokod ishlatilsa PromoCode qatori. Umumiy qatorlar qulflanmaydi:
+platforma komissiyasi (PendingCommission), PlatformCounter o'zgarishlari
+(PlatformCounterDelta) va Course.students_count (CourseStudentDelta) faqat
+append-only jurnallarga INSERT qilinadi va Celery beat yig'adi.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from app import entitlements, models, platform_counters
+
+
+class InsufficientFunds(ValueError):
+    """Hamyonda yetarli mablag' yo'q (ValueError: eski chaqiruvchilar shuni ushlaydi)."""
+
+
+def _wallet_deltas(entries):
+    """Balance and running-total increments for one wallet's entries."""
+    amounts = [e.amount for e in entries]
+    types = [e.transaction_type for e in entries]
+    return {
+        'balance': sum(amounts),
+        'total_income': sum(a for a in amounts if a > 0),
+        'total_expense': -sum(a for a in amounts if a < 0),
+        # NULL (hali hisoblanmagan) NULL bo'lib qoladi, Wallet.get_stats() to'ldiradi
+        'transactions_count': len(entries),
+        'courses_purchased': types.count('course_purchase'),
+        'courses_sold': types.count('course_earning'),
+    }
+
+
+def _lock_rows(wallet_ids):
+    return {
+        row['pk']: row for row in
+        models.Wallet.objects.select_for_update()
+        .filter(pk__in=sorted(set(wallet_ids))).order_by('pk')
+        .values('pk', 'user_id', 'balance', *models.Wallet.STATS_FIELDS)
+    }
+
+
+def lock_wallets(wallet_ids):
+    """Lock wallets in id order; returns {wallet_id: balance}. Call inside atomic()."""
+    return {pk: row['balance'] for pk, row in _lock_rows(wallet_ids).items()}
+
+
+def post(entries, insufficient_message='Insufficient balance'):
+    """Apply unsaved WalletTransaction `entries` atomically and return them saved.
+
+    `amount` is the signed balance delta of each entry; `balance_after` is
+    filled in here in entry order. A debit that would take a wallet below
+    zero raises InsufficientFunds and nothing is written. In-memory wallet
+    objects attached to the entries get their new balance and totals.
+    """
+    if not entries:
+        return []
+    with transaction.atomic():
+        wallet_ids = sorted({e.wallet_id for e in entries})
+        rows = _lock_rows(wallet_ids)
+        balances = {pk: row['balance'] for pk, row in rows.items()}
+        by_wallet = defaultdict(list)
+        for entry in entries:
+            entry.amount = Decimal(str(entry.amount))
+            new_balance = balances[entry.wallet_id] + entry.amount
+            if entry.amount < 0 and new_balance < 0:
+                raise InsufficientFunds(insufficient_message)
+            balances[entry.wallet_id] = new_balance
+            entry.balance_after = new_balance
+            by_wallet[entry.wallet_id].append(entry)
+
+        created = models.WalletTransaction.objects.bulk_create(entries)
+        # bulk_create signal yubormaydi
+        platform_counters.record_transactions(created)
+        # Xarid qilingan kurs / kurs turi huquqlari shu tranzaksiyada
+        entitlements.grant(created, {pk: row['user_id'] for pk, row in rows.items()})
+        now = timezone.now()
+        for wallet_id in wallet_ids:
+            deltas = _wallet_deltas(by_wallet[wallet_id])
+            last_at = max(e.created_at for e in by_wallet[wallet_id])
+            models.Wallet.objects.filter(pk=wallet_id).update(
+                updated_at=now, last_transaction_at=last_at,
+                **{field: F(field) + delta for field, delta in deltas.items()},
+            )
+            row = rows[wallet_id]
+            row.update({f: row[f] + d for f, d in deltas.items() if row[f] is not None}, last_transaction_at=last_at)
+
+    for entry in entries:
+        if models.WalletTransaction.wallet.is_cached(entry):
+            for field in ('balance',) + models.Wallet.STATS_FIELDS:
+                setattr(entry.wallet, field, rows[entry.wallet_id][field])
+    return created
@@ -0,0 +1,45 @@
+"""WalletTransaction ledgerini CSV/NDJSON ko'rinishida stream qilish."""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+EXPORT_FIELDS = (
+    'id', 'created_at', 'wallet_id', 'wallet__user__username', 'transaction_type',
+    'amount', 'original_amount', 'discount_amount', 'balance_after',
+    'course_id', 'course_type_id', 'from_user_id', 'to_user_id',
+    'promo_code__code', 'related_transaction_id', 'description',
+)
+EXPORT_COLUMNS = (
+    'id', 'created_at', 'wallet_id', 'username', 'transaction_type',
+    'amount', 'original_amount', 'discount_amount', 'balance_after',
+    'course_id', 'course_type_id', 'from_user_id', 'to_user_id',
+    'promo_code', 'related_transaction_id', 'description',
+)
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """csv.writer uchun: yozilgan qatorni qaytaradi (buffer saqlamaydi)."""
+
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    # To'liq aniqlikdagi ISO vaqt (DjangoJSONEncoder millisekundgacha qisqartiradi)
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow('' if v is None else _plain(v) for v in row)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, map(_plain, row)))
+        yield json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
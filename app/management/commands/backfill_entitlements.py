@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import entitlements, partitions
+
+
+class Command(BaseCommand):
+    help = "CourseEntitlement jadvalini mavjud xarid tranzaksiyalaridan to'ldirish (qayta ishga tushirish xavfsiz)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=entitlements.BACKFILL_BATCH_SIZE)
+        parser.add_argument('--allow-archived', action='store_true',
+                            help="Arxivlangan oylar bo'lsa ham faqat jonli xaridlarni skan qilish")
+
+    def handle(self, *args, **opts):
+        try:
+            scanned, total = entitlements.backfill(batch_size=opts['batch_size'], allow_archived=opts['allow_archived'])
+        except partitions.PartitionError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'{scanned} purchase(s) scanned, {total} entitlement(s) in table'))
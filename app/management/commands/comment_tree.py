@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import comment_tree
+
+
+class Command(BaseCommand):
+    help = (
+        "Izohlar daraxti ustunlarini (path, root_id, depth, replies_count, descendants_count) "
+        "parent bog'lanishlaridan qayta hisoblab tekshirish; --fix bilan farqlar tuzatiladi. "
+        "bulk_create bilan izoh qo'shilgandan keyin --fix bilan ishga tushirish shart."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Farqli izohlarni qayta yozish')
+
+    def handle(self, *args, **opts):
+        result = comment_tree.rebuild(dry_run=not opts['fix'])
+        for label, drifted in result.items():
+            if drifted:
+                self.stdout.write(f"{label}: {drifted} comment(s) drifted")
+        total = sum(result.values())
+        if total and not opts['fix']:
+            raise CommandError(f"{total} comment(s) drifted; run with --fix")
+        self.stdout.write(self.style.SUCCESS(f"{total} comment(s) fixed" if total else 'no drift'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import course_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Course agregatlarini (students_count, lessons_count, total_duration_*, rating_*) manba "
+        "jadvallardan qayta hisoblab tekshirish; --fix bilan farqlar tuzatiladi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Farqli kurslarni qayta yozish')
+        parser.add_argument('--course', type=int, action='append', dest='course_ids', help='Faqat shu kurs(lar)')
+
+    def handle(self, *args, **opts):
+        drift = course_stats.rebuild(opts['course_ids'], dry_run=not opts['fix'])
+        for course_id, field, stored, expected in drift:
+            self.stdout.write(f"course {course_id}: {field} {stored} -> {expected}")
+        courses = len({d[0] for d in drift})
+        if drift and not opts['fix']:
+            raise CommandError(f"{courses} course(s) drifted ({len(drift)} field(s)); run with --fix")
+        verb = 'fixed' if drift else 'no drift'
+        self.stdout.write(self.style.SUCCESS(f"{courses} course(s) {verb}" if drift else verb))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import question_bank
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a JSON/CSV question bank into a VideoTest or CourseTypeTest. "
+        "The whole file is validated in memory before a single transactional write."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to a .json or .csv question bank')
+        parser.add_argument('--test-id', type=int, required=True, help='Target test id')
+        parser.add_argument('--kind', choices=sorted(question_bank.TEST_KINDS), default='video',
+                            help='video = VideoTest, course_type = CourseTypeTest')
+        parser.add_argument('--format', choices=['json', 'csv'], help='Override format detection by extension')
+        parser.add_argument('--replace', action='store_true', help='Delete existing questions first')
+
+    def handle(self, *args, **options):
+        test_model = question_bank.TEST_KINDS[options['kind']][0]
+        try:
+            test = test_model.objects.get(id=options['test_id'])
+        except test_model.DoesNotExist:
+            raise CommandError(f"{test_model.__name__} {options['test_id']} not found")
+
+        try:
+            with open(options['path'], 'rb') as fp:
+                raw_questions = question_bank.load_file(fp, fmt=options['format'])
+            summary = question_bank.import_questions(options['kind'], test, raw_questions, replace=options['replace'])
+        except OSError as e:
+            raise CommandError(str(e))
+        except question_bank.QuestionBankError as e:
+            for key, err in e.errors.items():
+                self.stderr.write(f"{key}: {err}")
+            raise CommandError('Question bank is invalid; nothing was written')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary['questions_created']} questions / {summary['options_created']} options "
+            f"into {test_model.__name__} {test.id}"
+        ))
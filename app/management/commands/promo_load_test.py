@@ -0,0 +1,73 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+
+from app import models, promos
+
+
+class Command(BaseCommand):
+    help = (
+        "Vaqtinchalik promokodni ko'p oqimdan bir vaqtda ishlatishga urinib, "
+        "max_uses dan oshib ketmasligini va validatsiya kechikishini tekshiradi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--attempts', type=int, default=20, help='Har bir oqimdagi urinishlar soni')
+        parser.add_argument('--max-uses', type=int, default=50)
+        parser.add_argument('--keep', action='store_true', help="Test promokodini o'chirmaslik")
+
+    def handle(self, *args, **opts):
+        course = models.Course.objects.order_by('id').first()
+        if course is None:
+            raise CommandError('At least one course is required')
+        promo = models.PromoCode.objects.create(
+            code=f'LOAD-{uuid.uuid4().hex[:8].upper()}', discount_type='percent', value=10,
+            max_uses=opts['max_uses'],
+        )
+
+        def worker(_):
+            stats = {'claimed': 0, 'rejected': 0, 'errors': 0, 'latency': []}
+            try:
+                for _ in range(opts['attempts']):
+                    started = time.perf_counter()
+                    try:
+                        with transaction.atomic():
+                            rule = promos.validate(promo.code, course)
+                            promos.claim(rule)
+                        stats['claimed'] += 1
+                    except promos.PromoError:
+                        stats['rejected'] += 1
+                    except DatabaseError:
+                        stats['errors'] += 1
+                    stats['latency'].append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            return stats
+
+        with ThreadPoolExecutor(max_workers=opts['threads']) as pool:
+            results = list(pool.map(worker, range(opts['threads'])))
+
+        claimed = sum(r['claimed'] for r in results)
+        rejected = sum(r['rejected'] for r in results)
+        errors = sum(r['errors'] for r in results)
+        latency = sorted(x for r in results for x in r['latency'])
+        p50 = latency[len(latency) // 2] * 1000 if latency else 0
+        p99 = latency[min(len(latency) - 1, int(len(latency) * 0.99))] * 1000 if latency else 0
+        promo.refresh_from_db()
+        self.stdout.write(
+            f"claimed={claimed} rejected={rejected} db_errors={errors} uses={promo.uses} "
+            f"max_uses={promo.max_uses} p50={p50:.1f}ms p99={p99:.1f}ms"
+        )
+        if not opts['keep']:
+            promo.delete()
+
+        attempts = opts['threads'] * opts['attempts']
+        if promo.uses > promo.max_uses or promo.uses != claimed:
+            raise CommandError('Promo usage limit was exceeded or miscounted')
+        if attempts - errors >= promo.max_uses and claimed != promo.max_uses:
+            raise CommandError('Promo usage limit was not reached')
+        self.stdout.write(self.style.SUCCESS('Promo usage limit held'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Movie, Channel, Reel, Playlist va CourseVideo reytinglarini (rating_sum, rating_count, "
+        "rating_avg) baholardan qayta hisoblab tekshirish; --fix bilan farqlar tuzatiladi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Farqli obyektlarni qayta yozish')
+
+    def handle(self, *args, **opts):
+        result = ratings.rebuild(dry_run=not opts['fix'])
+        drifted = 0
+        for label, drift in result.items():
+            for pk, field, stored, expected in drift:
+                self.stdout.write(f"{label} {pk}: {field} {stored} -> {expected}")
+            drifted += len({d[0] for d in drift})
+        if drifted and not opts['fix']:
+            raise CommandError(f"{drifted} object(s) drifted; run with --fix")
+        self.stdout.write(self.style.SUCCESS(f"{drifted} object(s) fixed" if drifted else 'no drift'))
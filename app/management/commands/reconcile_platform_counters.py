@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import partitions, platform_counters
+
+
+class Command(BaseCommand):
+    help = "PlatformCounter hisoblagichlarini manba jadvallardan qayta hisoblash (drift tuzatish)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Faqat farqlarni ko'rsatish, yozmaslik")
+
+    def handle(self, *args, **opts):
+        try:
+            drift = platform_counters.reconcile(dry_run=opts['dry_run'])
+        except partitions.PartitionError as e:
+            raise CommandError(str(e))
+        for key, (stored, actual) in drift.items():
+            self.stdout.write(f"{key}: {stored} -> {actual}")
+        verb = 'found' if opts['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f"{len(drift)} drifted counter(s) {verb}"))
@@ -0,0 +1,56 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from app import reconciliation
+
+
+def _init_worker():
+    # Fork qilingan jarayon ota-jarayon ulanishlarini ishlatmasligi kerak
+    connections.close_all()
+
+
+def _verify(args):
+    first_id, last_id, full, write_checkpoints = args
+    try:
+        return reconciliation.verify_range(first_id, last_id, full=full, write_checkpoints=write_checkpoints)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Barcha hamyonlar balansini ledger bilan solishtirish: oxirgi checkpointdan keyingi "
+        "tranzaksiyalar chunklar bo'yicha parallel jarayonlarda tekshiriladi, farqlar chiqariladi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Parallel jarayonlar soni')
+        parser.add_argument('--chunk-size', type=int, default=reconciliation.DEFAULT_CHUNK_SIZE,
+                            help='Bitta chunkdagi wallet id oralig\'i')
+        parser.add_argument('--full', action='store_true', help="Checkpointlarni e'tiborsiz qoldirib butun tarixni tekshirish")
+        parser.add_argument('--no-checkpoint', action='store_true', help='Yangi checkpoint yozmaslik')
+
+    def handle(self, *args, **opts):
+        ranges = reconciliation.chunk_ranges(opts['chunk_size'])
+        jobs = [(lo, hi, opts['full'], not opts['no_checkpoint']) for lo, hi in ranges]
+        if opts['workers'] > 1 and len(jobs) > 1:
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=opts['workers'], initializer=_init_worker) as pool:
+                results = list(pool.map(_verify, jobs))
+        else:
+            results = [reconciliation.verify_range(lo, hi, full=full, write_checkpoints=write)
+                       for lo, hi, full, write in jobs]
+
+        wallets = sum(r['wallets'] for r in results)
+        checkpoints = sum(r['checkpoints'] for r in results)
+        drift = [d for r in results for d in r['drift']]
+        for d in drift:
+            self.stdout.write(
+                f"wallet {d['wallet_id']}: balance={d['balance']} ledger={d['ledger_balance']} diff={d['diff']}"
+            )
+        summary = f"{wallets} wallet(s) in {len(jobs)} chunk(s), {checkpoints} checkpoint(s) written, {len(drift)} drifted"
+        if drift:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app import partitions, rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill CourseDailyStat rollups. Without arguments runs the incremental job "
+        "(high-water mark -> yesterday); with --since it backfills a date range."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Backfill start day (YYYY-MM-DD)')
+        parser.add_argument('--until', help='Backfill end day, inclusive (default: yesterday)')
+        parser.add_argument('--course', type=int, action='append', dest='courses',
+                            help='Limit backfill to course id (repeatable)')
+
+    def handle(self, *args, **options):
+        if not options['since']:
+            if options['until'] or options['courses']:
+                raise CommandError('--until/--course require --since')
+            try:
+                result = rollups.run_rollup()
+            except partitions.PartitionError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f"Rolled up {result['first_day']}..{result['last_day']}: {result['rows']} rows"
+            ))
+            return
+
+        try:
+            first_day = date.fromisoformat(options['since'])
+            last_day = (
+                date.fromisoformat(options['until']) if options['until']
+                else timezone.localdate() - timedelta(days=1)
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        if last_day >= timezone.localdate():
+            raise CommandError('Today is computed live and is never stored; use --until yesterday or earlier')
+        if first_day > last_day:
+            raise CommandError('--since must not be after --until')
+
+        try:
+            rows = rollups.rollup_range(first_day, last_day, options['courses'])
+        except partitions.PartitionError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {first_day}..{last_day}: {rows} rows"))
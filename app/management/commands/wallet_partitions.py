@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "WalletTransaction oylik partitionlarini boshqarish (PostgreSQL): ro'yxat, kelgusi oylar "
+        "uchun partition yaratish va eski oylarni wallet_archive sxemasiga ajratish (DETACH)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=None,
+                            help=f'Joriy oydan shuncha oy oldinga partition yaratish (beat: {partitions.PARTITIONS_AHEAD})')
+        parser.add_argument('--archive-before', metavar='YYYY-MM',
+                            help='Shu oydan oldingi partitionlarni arxivga ajratish')
+        parser.add_argument('--force', action='store_true',
+                            help='Checkpoint bilan qoplanmagan hamyonlar bo\'lsa ham arxivlash')
+        parser.add_argument('--dry-run', action='store_true', help="Faqat nima qilinishini ko'rsatish")
+
+    def handle(self, *args, **opts):
+        if not partitions.is_partitioned():
+            raise CommandError(f'{partitions.PARENT} is not partitioned (PostgreSQL + migration 0051 required)')
+
+        try:
+            if opts['ahead'] is not None:
+                created = [] if opts['dry_run'] else partitions.ensure_ahead(opts['ahead'])
+                self.stdout.write(f"created: {', '.join(created) or '-'}")
+            if opts['archive_before']:
+                try:
+                    cutoff = datetime.strptime(opts['archive_before'], '%Y-%m').date()
+                except ValueError:
+                    raise CommandError('--archive-before must be YYYY-MM')
+                archived = partitions.archive_before(cutoff, force=opts['force'], dry_run=opts['dry_run'])
+                verb = 'would archive' if opts['dry_run'] else f'archived to {partitions.ARCHIVE_SCHEMA}'
+                self.stdout.write(f"{verb}: {', '.join(archived) or '-'}")
+        except partitions.PartitionError as e:
+            raise CommandError(str(e))
+
+        for p in partitions.list_partitions():
+            self.stdout.write(f"{p['name']}: ~{p['rows']} row(s)")
@@ -0,0 +1,68 @@
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from app import ledger, models
+
+
+class Command(BaseCommand):
+    help = (
+        "Bitta vaqtinchalik hamyonga ko'p oqimdan parallel deposit/withdrawal yuborib, "
+        "yakuniy balansni recalculate_balance() bilan solishtiradi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--ops', type=int, default=50, help='Har bir oqimdagi amallar soni')
+        parser.add_argument('--initial', type=Decimal, default=Decimal('1000'), help="Boshlang'ich balans")
+        parser.add_argument('--keep', action='store_true', help="Test foydalanuvchisini o'chirmaslik")
+
+    def handle(self, *args, **opts):
+        user = models.User.objects.create_user(username=f'ledger-stress-{uuid.uuid4().hex[:8]}')
+        wallet = models.Wallet.objects.create(user=user)
+        if opts['initial'] > 0:
+            wallet.add_balance(opts['initial'], description='stress test: initial')
+
+        def worker(seed):
+            rnd = random.Random(seed)
+            stats = {'ok': 0, 'rejected': 0, 'errors': 0}
+            w = models.Wallet.objects.get(pk=wallet.pk)
+            try:
+                for _ in range(opts['ops']):
+                    amount = Decimal(rnd.randint(1, 100))
+                    try:
+                        if rnd.random() < 0.5:
+                            w.add_balance(amount, description='stress test')
+                        else:
+                            w.subtract_balance(amount, description='stress test')
+                        stats['ok'] += 1
+                    except ledger.InsufficientFunds:
+                        stats['rejected'] += 1
+                    except DatabaseError:
+                        stats['errors'] += 1
+            finally:
+                connection.close()
+            return stats
+
+        with ThreadPoolExecutor(max_workers=opts['threads']) as pool:
+            results = list(pool.map(worker, range(opts['threads'])))
+        totals = {k: sum(r[k] for r in results) for k in ('ok', 'rejected', 'errors')}
+
+        wallet.refresh_from_db()
+        expected = wallet.recalculate_balance()
+        last = wallet.transactions.order_by('-created_at', '-id').values_list('balance_after', flat=True).first()
+        negative = wallet.transactions.filter(balance_after__lt=0).count()
+        self.stdout.write(
+            f"ops ok={totals['ok']} rejected={totals['rejected']} db_errors={totals['errors']}; "
+            f"balance={wallet.balance} ledger_sum={expected} last_balance_after={last} negative_rows={negative}"
+        )
+        if not opts['keep']:
+            user.delete()
+
+        if wallet.balance != expected or negative:
+            raise CommandError('Balance does not match the ledger')
+        self.stdout.write(self.style.SUCCESS('Balance matches the ledger'))
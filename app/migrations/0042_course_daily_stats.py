@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:21
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0041_moviefile_poster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('rolled_up_to', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CourseDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('progress_events', models.PositiveIntegerField(default=0)),
+                ('active_learners', models.PositiveIntegerField(default=0)),
+                ('video_test_attempts', models.PositiveIntegerField(default=0)),
+                ('video_test_passed', models.PositiveIntegerField(default=0)),
+                ('ct_test_attempts', models.PositiveIntegerField(default=0)),
+                ('ct_test_passed', models.PositiveIntegerField(default=0)),
+                ('video_submissions', models.PositiveIntegerField(default=0)),
+                ('video_submissions_graded', models.PositiveIntegerField(default=0)),
+                ('ct_submissions', models.PositiveIntegerField(default=0)),
+                ('purchases', models.PositiveIntegerField(default=0)),
+                ('buyers', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='app.course')),
+            ],
+            options={
+                'verbose_name': 'Course Daily Stat',
+                'verbose_name_plural': 'Course Daily Stats',
+                'ordering': ['day'],
+                'indexes': [models.Index(fields=['day', 'course'], name='app_coursed_day_2de0f3_idx')],
+                'unique_together': {('course', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0042_course_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignmentsubmission',
+            index=models.Index(fields=['student', 'assignment'], name='app_assignm_student_de2b79_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursetypetestresult',
+            index=models.Index(fields=['user', 'test'], name='app_courset_user_id_ee7537_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(fields=['user', 'test'], name='app_testres_user_id_698b2b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['course', 'transaction_type', 'created_at'], name='app_wallett_course__b9f55e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['course_type', 'transaction_type', 'created_at'], name='app_wallett_course__af3920_idx'),
+        ),
+    ]
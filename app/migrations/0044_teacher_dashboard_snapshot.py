@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0043_student_metrics_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeacherDashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('overview', 'Overview'), ('courses', 'Courses'), ('engagement', 'Engagement'), ('tests_stats', 'Tests stats'), ('assignments_stats', 'Assignments stats')], max_length=30)),
+                ('scope', models.CharField(blank=True, default='', help_text='Masalan kanal id (kanal bo‘yicha statistikalar uchun)', max_length=64)),
+                ('schema_version', models.PositiveSmallIntegerField(default=1)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('payload', models.JSONField(default=dict)),
+                ('generated_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Teacher Dashboard Snapshot',
+                'verbose_name_plural': 'Teacher Dashboard Snapshots',
+                'unique_together': {('user', 'kind', 'scope')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0045_platform_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['created_at', 'id'], name='app_wallett_created_f4e7f1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['transaction_type', 'created_at', 'id'], name='app_wallett_transac_0b33b2_idx'),
+        ),
+    ]
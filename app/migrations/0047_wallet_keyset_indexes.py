@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0046_ledger_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'created_at', 'id'], name='app_wallett_wallet__ed46e9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'transaction_type', 'created_at', 'id'], name='app_wallett_wallet__108f6b_idx'),
+        ),
+    ]
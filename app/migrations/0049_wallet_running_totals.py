@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:39
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0048_pending_commission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallet',
+            name='courses_purchased',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='wallet',
+            name='courses_sold',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='wallet',
+            name='last_transaction_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='wallet',
+            name='total_expense',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Musbat qiymat', max_digits=15),
+        ),
+        migrations.AddField(
+            model_name='wallet',
+            name='total_income',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15),
+        ),
+        # Mavjud hamyonlar NULL bo'lib qoladi (Wallet.get_stats() birinchi o'qishda hisoblaydi),
+        # yangi hamyonlar esa 0 bilan yaratiladi.
+        migrations.AddField(
+            model_name='wallet',
+            name='transactions_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='wallet',
+            name='transactions_count',
+            field=models.PositiveIntegerField(blank=True, default=0, null=True),
+        ),
+    ]
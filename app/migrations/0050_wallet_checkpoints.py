@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0049_wallet_running_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('last_transaction_id', models.BigIntegerField()),
+                ('last_transaction_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='app.wallet')),
+            ],
+            options={
+                'ordering': ['-last_transaction_id'],
+                'indexes': [models.Index(fields=['wallet', '-last_transaction_id'], name='app_walletc_wallet__42f815_idx')],
+            },
+        ),
+    ]
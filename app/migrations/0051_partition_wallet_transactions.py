@@ -0,0 +1,156 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:44
+
+import re
+from datetime import date
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# WalletTransaction ni created_at bo'yicha oylik RANGE partitionlarga o'tkazish
+# (faqat PostgreSQL; sqlite va boshqalarda jadval o'zgarmaydi). Partitionlangan
+# jadvalning PK si partition kalitini o'z ichiga olishi shart, shuning uchun PK
+# (id, created_at) bo'ladi va WalletTransaction ga qaragan FK lar yuqorida
+# db_constraint=False qilinadi. Katta jadvalda ma'lumot ko'chirish ACCESS
+# EXCLUSIVE lock ostida bajariladi - texnik oynada ishga tushiring.
+TABLE = 'app_wallettransaction'
+OLD_TABLE = f'{TABLE}_unpartitioned'
+SEQUENCE = f'{TABLE}_id_seq'
+PARTITIONS_AHEAD = 3
+
+
+def _rows(cursor, sql, params=()):
+    cursor.execute(sql, list(params))
+    return cursor.fetchall()
+
+
+def _add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _next_id(cursor):
+    """Next id the old table's sequence would hand out (never below MAX(id) + 1)."""
+    sequence, max_id = _rows(cursor, f"SELECT pg_get_serial_sequence(%s, 'id'), MAX(id) FROM {OLD_TABLE}", [OLD_TABLE])[0]
+    next_id = (max_id or 0) + 1
+    if sequence:
+        last_value, is_called = _rows(cursor, f'SELECT last_value, is_called FROM {sequence}')[0]
+        next_id = max(next_id, last_value + 1 if is_called else last_value)
+    return next_id
+
+
+def _rebuild(cursor, partitioned):
+    """Recreate TABLE as partitioned (or plain again), keeping indexes, FKs and ids."""
+    cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+    cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}')
+
+    # Eski nomlar yangi jadvalga o'tadi, eskilariga vaqtinchalik nom beriladi
+    pk_name = _rows(cursor, "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", [OLD_TABLE])[0][0]
+    indexes = _rows(
+        cursor,
+        "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s",
+        [OLD_TABLE, pk_name],
+    )
+    fks = _rows(
+        cursor,
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+        [OLD_TABLE],
+    )
+    cursor.execute(f'ALTER TABLE {OLD_TABLE} RENAME CONSTRAINT "{pk_name}" TO "{pk_name[:50]}_old"')
+    for i, (name, _) in enumerate(indexes):
+        cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{name[:50]}_old{i}"')
+    for i, (name, _) in enumerate(fks):
+        cursor.execute(f'ALTER TABLE {OLD_TABLE} RENAME CONSTRAINT "{name}" TO "{name[:50]}_old{i}"')
+
+    # id uchun yangi sequence (identity LIKE orqali ko'chmaydi). Eski sequence
+    # bergan eng katta qiymatdan davom etadi: o'chirilgan qatorlar id si qayta berilmaydi
+    next_id = _next_id(cursor)
+    suffix = ' PARTITION BY RANGE (created_at)' if partitioned else ''
+    cursor.execute(f'CREATE TABLE {TABLE} (LIKE {OLD_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS){suffix}')
+    cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+    if partitioned:
+        # PostgreSQL < 17 da partitionlangan jadvalda identity yo'q: oddiy sequence default
+        cursor.execute(f'CREATE SEQUENCE {SEQUENCE}_new START WITH {next_id}')
+        cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}_new')")
+        cursor.execute(f'ALTER SEQUENCE {SEQUENCE}_new OWNED BY {TABLE}.id')
+    else:
+        # Django yaratgan ko'rinishga qaytarish (GENERATED BY DEFAULT AS IDENTITY)
+        cursor.execute(f'ALTER TABLE {TABLE} ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY '
+            f'(SEQUENCE NAME {SEQUENCE}_new START WITH {next_id})'
+        )
+    pk_columns = 'id, created_at' if partitioned else 'id'
+    cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT "{pk_name}" PRIMARY KEY ({pk_columns})')
+
+    if partitioned:
+        cursor.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+        first = _rows(cursor, f'SELECT MIN(created_at) FROM {OLD_TABLE}')[0][0]
+        today = date.today()
+        month = date(first.year, first.month, 1) if first else date(today.year, today.month, 1)
+        last = _add_months(date(today.year, today.month, 1), PARTITIONS_AHEAD)
+        while month <= last:
+            upper = _add_months(month, 1)
+            cursor.execute(
+                f"CREATE TABLE {TABLE}_p{month:%Y_%m} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{upper:%Y-%m-%d} 00:00:00+00')"
+            )
+            month = upper
+
+    cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {OLD_TABLE}')
+    # Indekslar va FK lar ma'lumot yuklangandan keyin (tezroq)
+    for _, indexdef in indexes:
+        # partitionlangan jadval indeksi "ON ONLY ..." ko'rinishida bo'ladi
+        cursor.execute(re.sub(rf' ON (ONLY )?(\S+\.)?"?{OLD_TABLE}"? ', rf' ON \g<2>{TABLE} ', indexdef, count=1))
+    for name, definition in fks:
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT "{name}" {definition}')
+
+    cursor.execute(f'DROP TABLE {OLD_TABLE} CASCADE')
+    cursor.execute(f'ALTER SEQUENCE {SEQUENCE}_new RENAME TO {SEQUENCE}')
+    cursor.execute(f'ANALYZE {TABLE}')
+
+
+def _is_partitioned(cursor):
+    return bool(_rows(cursor, "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [TABLE]))
+
+
+def partition_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if not _is_partitioned(cursor):
+            _rebuild(cursor, partitioned=True)
+
+
+def unpartition_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if _is_partitioned(cursor):
+            _rebuild(cursor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0050_wallet_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pendingcommission',
+            name='purchase_transaction',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.wallettransaction'),
+        ),
+        migrations.AlterField(
+            model_name='pendingcommission',
+            name='settlement',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='settled_commissions', to='app.wallettransaction'),
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='related_transaction',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text="Bog'langan tranzaksiya", null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.wallettransaction'),
+        ),
+        migrations.RunPython(partition_table, unpartition_table),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    # Kirish tekshiruvlari shu jadvalga o'tgani uchun deploy paytida to'ldiriladi
+    # (keyinchalik qayta kerak bo'lsa: manage.py backfill_entitlements)
+    WalletTransaction = apps.get_model('app', 'WalletTransaction')
+    CourseEntitlement = apps.get_model('app', 'CourseEntitlement')
+    txs = (
+        WalletTransaction.objects.filter(transaction_type__in=['course_purchase', 'course_type_purchase'])
+        .order_by('id')
+        .values_list('id', 'transaction_type', 'wallet__user_id', 'course_id', 'course_type_id',
+                     'course_type__course_id', 'created_at')
+    )
+    last_id = 0
+    while True:
+        batch = list(txs.filter(id__gt=last_id)[:5000])
+        if not batch:
+            return
+        rows = []
+        for tx_id, tx_type, user_id, course_id, course_type_id, type_course_id, created_at in batch:
+            per_type = tx_type == 'course_type_purchase'
+            course_id = course_id or type_course_id
+            if course_id is None or (per_type and course_type_id is None):
+                continue
+            rows.append(CourseEntitlement(
+                user_id=user_id, course_id=course_id, course_type_id=course_type_id if per_type else None,
+                purchase_transaction_id=tx_id, created_at=created_at,
+            ))
+        CourseEntitlement.objects.bulk_create(rows, ignore_conflicts=True)
+        last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0051_partition_wallet_transactions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseEntitlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entitlements', to='app.course')),
+                ('course_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='entitlements', to='app.coursetype')),
+                ('purchase_transaction', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.wallettransaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entitlements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course', 'user'], name='app_coursee_course__132a01_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('course_type__isnull', True)), fields=('user', 'course'), name='entitlement_user_course_uniq'), models.UniqueConstraint(condition=models.Q(('course_type__isnull', False)), fields=('user', 'course_type'), name='entitlement_user_course_type_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
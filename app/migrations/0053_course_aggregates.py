@@ -0,0 +1,64 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:01
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+FIELDS = [
+    'students_count', 'lessons_count', 'total_duration_seconds', 'total_duration_minutes',
+    'rating_sum', 'rating_count', 'rating_avg',
+]
+
+
+def initialize(apps, schema_editor):
+    # Shu paytgacha hech kim yangilamagan ustunlarni manba jadvallardan to'ldirish;
+    # keyin app.course_stats inkremental yuritadi
+    Course = apps.get_model('app', 'Course')
+    values = {pk: {'students_count': 0, 'lessons_count': 0, 'total_duration_seconds': 0, 'rating_sum': 0, 'rating_count': 0}
+              for pk in Course.objects.values_list('pk', flat=True)}
+    for row in apps.get_model('app', 'CourseEntitlement').objects.values('course_id').annotate(n=Count('user', distinct=True)).order_by():
+        values[row['course_id']]['students_count'] = row['n']
+    for row in apps.get_model('app', 'CourseVideo').objects.values('course_id').annotate(n=Count('id'), s=Sum('duration')).order_by():
+        values[row['course_id']].update(lessons_count=row['n'], total_duration_seconds=row['s'] or 0)
+    for row in apps.get_model('app', 'CourseVideoRating').objects.values('course_video__course_id').annotate(s=Sum('value'), n=Count('id')).order_by():
+        values[row['course_video__course_id']].update(rating_sum=row['s'] or 0, rating_count=row['n'])
+    courses = []
+    for pk, v in values.items():
+        v['total_duration_minutes'] = (v['total_duration_seconds'] + 30) // 60
+        v['rating_avg'] = (
+            (Decimal(v['rating_sum']) / v['rating_count']).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
+            if v['rating_count'] else Decimal('0.0')
+        )
+        courses.append(Course(pk=pk, **v))
+    Course.objects.bulk_update(courses, FIELDS, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0052_course_entitlements'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='total_duration_seconds',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-students_count', '-created_at'], name='app_course_student_ce974a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-rating_avg', '-rating_count'], name='app_course_rating__f4c6b4_idx'),
+        ),
+        migrations.RunPython(initialize, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,140 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:06
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+# (rating model, target model, FK)
+TARGETS = [
+    ('MovieRating', 'Movie', 'movie'),
+    ('ChannelRating', 'Channel', 'channel'),
+    ('ReelRating', 'Reel', 'reel'),
+    ('PlaylistRating', 'Playlist', 'playlist'),
+    ('CourseVideoRating', 'CourseVideo', 'course_video'),
+]
+
+
+def initialize(apps, schema_editor):
+    # Mavjud baholardan to'ldirish; keyin app.ratings inkremental yuritadi
+    for rating_name, target_name, fk in TARGETS:
+        Target = apps.get_model('app', target_name)
+        rows = (
+            apps.get_model('app', rating_name).objects.filter(**{f'{fk}__isnull': False})
+            .values(f'{fk}_id').annotate(s=Sum('value'), n=Count('id')).order_by()
+        )
+        objs = [
+            Target(
+                pk=row[f'{fk}_id'], rating_sum=row['s'] or 0, rating_count=row['n'],
+                rating_avg=(Decimal(row['s'] or 0) / row['n']).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP),
+            )
+            for row in rows
+        ]
+        Target.objects.bulk_update(objs, ['rating_sum', 'rating_count', 'rating_avg'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0053_course_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='channel',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='channel',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='channel',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursevideo',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='coursevideo',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='coursevideo',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playlist',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='playlist',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='playlist',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reel',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='reel',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reel',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='channel',
+            index=models.Index(fields=['-rating_avg', '-rating_count'], name='app_channel_top_rated'),
+        ),
+        migrations.AddIndex(
+            model_name='coursevideo',
+            index=models.Index(fields=['-rating_avg', '-rating_count'], name='app_coursevideo_top_rated'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-rating_avg', '-rating_count'], name='app_movie_top_rated'),
+        ),
+        migrations.AddIndex(
+            model_name='playlist',
+            index=models.Index(fields=['-rating_avg', '-rating_count'], name='app_playlist_top_rated'),
+        ),
+        migrations.AddIndex(
+            model_name='reel',
+            index=models.Index(fields=['-rating_avg', '-rating_count'], name='app_reel_top_rated'),
+        ),
+        migrations.RunPython(initialize, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,176 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:10
+
+from django.db import migrations, models
+
+
+COMMENT_MODELS = ['MovieComment', 'CourseVideoComment', 'ReelComment', 'ChannelComment', 'PlaylistComment']
+STEP = 10
+
+
+def initialize(apps, schema_editor):
+    # Mavjud izohlar uchun path/root_id/depth va hisoblagichlar; keyin app.comment_tree yuritadi
+    for name in COMMENT_MODELS:
+        Comment = apps.get_model('app', name)
+        rows = list(Comment.objects.order_by('pk').values_list('pk', 'parent_id'))
+        parent_of = dict(rows)
+        tree = {}
+        for pk, _ in rows:
+            chain = []
+            while pk is not None and pk not in tree:
+                chain.append(pk)
+                pk = parent_of.get(pk)
+            for node in reversed(chain):
+                parent = tree.get(parent_of[node])
+                tree[node] = {
+                    'path': (parent['path'] if parent else '') + f'{node:0{STEP}d}',
+                    'root_id': parent['root_id'] if parent else node,
+                    'depth': parent['depth'] + 1 if parent else 0,
+                    'replies_count': 0,
+                    'descendants_count': 0,
+                }
+        for pk, parent_id in rows:
+            if parent_id is not None:
+                tree[parent_id]['replies_count'] += 1
+                path = tree[pk]['path']
+                for i in range(0, len(path) - STEP, STEP):
+                    tree[int(path[i:i + STEP])]['descendants_count'] += 1
+        Comment.objects.bulk_update(
+            [Comment(pk=pk, **values) for pk, values in tree.items()],
+            ['path', 'root_id', 'depth', 'replies_count', 'descendants_count'], batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0054_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='channelcomment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='channelcomment',
+            name='descendants_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='channelcomment',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='channelcomment',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='channelcomment',
+            name='root_id',
+            field=models.PositiveBigIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='coursevideocomment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='coursevideocomment',
+            name='descendants_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='coursevideocomment',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='coursevideocomment',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='coursevideocomment',
+            name='root_id',
+            field=models.PositiveBigIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='moviecomment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='moviecomment',
+            name='descendants_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='moviecomment',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='moviecomment',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='moviecomment',
+            name='root_id',
+            field=models.PositiveBigIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='playlistcomment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='playlistcomment',
+            name='descendants_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='playlistcomment',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='playlistcomment',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='playlistcomment',
+            name='root_id',
+            field=models.PositiveBigIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='reelcomment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='reelcomment',
+            name='descendants_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='reelcomment',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='reelcomment',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='reelcomment',
+            name='root_id',
+            field=models.PositiveBigIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(initialize, migrations.RunPython.noop),
+    ]
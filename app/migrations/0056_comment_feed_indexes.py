@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0055_comment_tree_paths'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='channelcomment',
+            index=models.Index(fields=['user', '-created_at'], name='app_channelcomment_feed'),
+        ),
+        migrations.AddIndex(
+            model_name='coursevideocomment',
+            index=models.Index(fields=['user', '-created_at'], name='app_coursevideocomment_feed'),
+        ),
+        migrations.AddIndex(
+            model_name='moviecomment',
+            index=models.Index(fields=['user', '-created_at'], name='app_moviecomment_feed'),
+        ),
+        migrations.AddIndex(
+            model_name='playlistcomment',
+            index=models.Index(fields=['user', '-created_at'], name='app_playlistcomment_feed'),
+        ),
+        migrations.AddIndex(
+            model_name='reelcomment',
+            index=models.Index(fields=['user', '-created_at'], name='app_reelcomment_feed'),
+        ),
+    ]
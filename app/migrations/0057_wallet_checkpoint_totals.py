@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0056_comment_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='walletcheckpoint',
+            name='courses_purchased',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='walletcheckpoint',
+            name='courses_sold',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='walletcheckpoint',
+            name='total_expense',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True),
+        ),
+        migrations.AddField(
+            model_name='walletcheckpoint',
+            name='total_income',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True),
+        ),
+        migrations.AddField(
+            model_name='walletcheckpoint',
+            name='transactions_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
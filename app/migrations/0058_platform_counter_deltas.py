@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:27
+
+from django.db import migrations, models
+
+
+def seed_keys(apps, schema_editor):
+    # Barcha ma'lum kalitlar oldindan mavjud bo'ladi: fold() qator qo'shishi
+    # kerak bo'lmaydi (qiymatlarni reconcile / mavjud qatorlar belgilaydi)
+    User = apps.get_model('app', 'User')
+    WalletTransaction = apps.get_model('app', 'WalletTransaction')
+    PlatformCounter = apps.get_model('app', 'PlatformCounter')
+    keys = ['courses.total', 'courses.active', 'videos.total', 'videos.active',
+            'channels.total', 'channels.verified', 'tx.count', 'tx.income', 'tx.expense']
+    keys += [f'users.role.{role}' for role, _ in User._meta.get_field('role').choices]
+    keys += [f'tx.type.{kind}' for kind, _ in WalletTransaction._meta.get_field('transaction_type').choices]
+    PlatformCounter.objects.bulk_create([PlatformCounter(key=k) for k in keys], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0057_wallet_checkpoint_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformCounterDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64)),
+                ('value', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(seed_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0058_platform_counter_deltas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStudentDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.course')),
+            ],
+        ),
+    ]
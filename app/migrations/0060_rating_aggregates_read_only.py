@@ -0,0 +1,88 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0059_course_student_deltas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='channel',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=1, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AlterField(
+            model_name='channel',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='channel',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='coursevideo',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=1, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AlterField(
+            model_name='coursevideo',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='coursevideo',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='movie',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=1, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AlterField(
+            model_name='movie',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='movie',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='playlist',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=1, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AlterField(
+            model_name='playlist',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='playlist',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='reel',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=1, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AlterField(
+            model_name='reel',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='reel',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0060_rating_aggregates_read_only'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='course',
+            name='lessons_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Keshlangan darslar soni (UI uchun)'),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=1, default=0, editable=False, help_text='Masalan: 4.8', max_digits=3),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='students_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='total_duration_minutes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='total_duration_seconds',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
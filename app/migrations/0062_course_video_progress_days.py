@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def seed_days(apps, schema_editor):
+    # Tarix yo'qolgan: mavjud progress qatorlaridan faqat birinchi (created_at)
+    # va oxirgi (updated_at) kunlar tiklanadi
+    Progress = apps.get_model('app', 'CourseVideoProgress')
+    ProgressDay = apps.get_model('app', 'CourseVideoProgressDay')
+    batch = []
+    rows = Progress.objects.values_list('user_id', 'course_video_id', 'created_at', 'updated_at')
+    for user_id, video_id, created_at, updated_at in rows.iterator(chunk_size=5000):
+        for day in {timezone.localdate(created_at), timezone.localdate(updated_at)}:
+            batch.append(ProgressDay(user_id=user_id, course_video_id=video_id, day=day))
+        if len(batch) >= 5000:
+            ProgressDay.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    ProgressDay.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0061_course_aggregates_read_only'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseVideoProgressDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('course_video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.coursevideo')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'course_video'], name='app_coursev_day_efe07d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'course_video', 'day'), name='progress_day_uniq')],
+            },
+        ),
+        migrations.RunPython(seed_days, migrations.RunPython.noop),
+    ]
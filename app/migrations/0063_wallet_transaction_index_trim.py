@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0062_course_video_progress_days'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='wallettransaction',
+            name='app_wallett_wallet__108f6b_idx',
+        ),
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='wallet',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='app.wallet'),
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from django.db.models import Q
@@ -37,7 +37,57 @@ class User(AbstractUser):
         return self.get_full_name() or self.username
 
 
-class Channel(models.Model):
+class MaintainedFieldsModel(models.Model):
+    """Signal / servis F() bilan yuritadigan ustunlari bor modellar uchun.
+
+    Mavjud qatorni `save()` qilganda `maintained_fields` UPDATE ga kirmaydi:
+    xotiradagi eski qiymat (admin formasi, serializer, `obj.save()`) F()
+    bilan yozilgan yangisini ustidan yozib yubormasligi uchun. Bu ustunlarni
+    faqat o'z servisi (`.update()` / `bulk_update`) yozadi.
+    """
+    maintained_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and self.maintained_fields:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [
+                    f.attname for f in self._meta.concrete_fields
+                    if not f.primary_key and f.attname not in deferred
+                ]
+            kwargs['update_fields'] = [f for f in update_fields if f not in self.maintained_fields]
+        return super().save(*args, **kwargs)
+
+
+class RatingAggregate(MaintainedFieldsModel):
+    """Baholanadigan obyekt uchun saqlangan reyting (app/ratings.py yangilab boradi).
+
+    rating_sum / rating_count rating saqlash/o'chirishda F() bilan o'zgaradi,
+    rating_avg ulardan hisoblanadi; "top rated" tartiblash indeksdan o'qiydi.
+    """
+    maintained_fields = ('rating_sum', 'rating_count', 'rating_avg')
+
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=1, default=0, editable=False)
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(fields=['-rating_avg', '-rating_count'], name='%(app_label)s_%(class)s_top_rated'),
+        ]
+
+    @property
+    def average_rating(self):
+        """Baho bo'lmasa None (API avvalgidek)."""
+        return float(self.rating_avg) if self.rating_count else None
+
+
+class Channel(RatingAggregate):
     """
     Kanallar — creator(yozuvchi)ga tegishli bo'lgan profil sahifasi.
 
@@ -64,7 +114,7 @@ class Channel(models.Model):
     location_city = models.CharField(max_length=100, blank=True, null=True)
     years_experience = models.PositiveIntegerField(blank=True, null=True)
 
-    class Meta:
+    class Meta(RatingAggregate.Meta):
         verbose_name = 'Channel'
         verbose_name_plural = 'Channels'
 
@@ -93,7 +143,7 @@ class Language(models.Model):
         return f"{self.id} {self.name} ({self.code})"
 
 
-class Movie(models.Model):
+class Movie(RatingAggregate):
     """
     Kino modeli: umumiy ma'lumotlar.
 
@@ -179,8 +229,13 @@ class CourseCategory(models.Model):
 
 
 
-class Course(models.Model):
+class Course(MaintainedFieldsModel):
     """Video darslik (masalan: Python darsligi). Bitta darslikda ko'p video bo'ladi."""
+    maintained_fields = (
+        'students_count', 'rating_avg', 'rating_count', 'rating_sum',
+        'lessons_count', 'total_duration_minutes', 'total_duration_seconds',
+    )
+
     title = models.CharField(max_length=255)
     slug = models.SlugField(max_length=280, unique=True)
     description = models.TextField(blank=True)
@@ -212,11 +267,14 @@ class Course(models.Model):
     is_bestseller = models.BooleanField(default=False)
     is_serial = models.BooleanField(default=True)
     certificate_available = models.BooleanField(default=True)
-    students_count = models.PositiveIntegerField(default=0)
-    rating_avg = models.DecimalField(max_digits=3, decimal_places=1, default=0, help_text='Masalan: 4.8')
-    rating_count = models.PositiveIntegerField(default=0)
-    lessons_count = models.PositiveIntegerField(default=0, help_text='Keshlangan darslar soni (UI uchun)')
-    total_duration_minutes = models.PositiveIntegerField(default=0)
+    # Keshlangan agregatlar: app.course_stats inkremental yangilaydi, `course_stats` komandasi tekshiradi
+    students_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=1, default=0, editable=False, help_text='Masalan: 4.8')
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    lessons_count = models.PositiveIntegerField(default=0, editable=False, help_text='Keshlangan darslar soni (UI uchun)')
+    total_duration_minutes = models.PositiveIntegerField(default=0, editable=False)
+    total_duration_seconds = models.PositiveBigIntegerField(default=0, editable=False)
     thumbnail = models.ImageField(upload_to='courses/thumbnails/', blank=True, null=True)
     cover = models.ImageField(upload_to='courses/covers/', blank=True, null=True)
     # Moderatsiya holati
@@ -228,6 +286,13 @@ class Course(models.Model):
     ]
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='moderation', db_index=True)
     reason = models.TextField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-students_count', '-created_at']),
+            models.Index(fields=['-rating_avg', '-rating_count']),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -254,7 +319,7 @@ class CourseType(models.Model):
         return self.name
 
 
-class CourseVideo(models.Model):
+class CourseVideo(RatingAggregate):
     """Darslik ichidagi video. 'order' yordamida tartiblanadi."""
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='videos')
     title = models.CharField(max_length=255)
@@ -271,7 +336,7 @@ class CourseVideo(models.Model):
     hls_playlist_url = models.CharField(max_length=500, blank=True, null=True)
     hls_segment_path = models.CharField(max_length=500, blank=True, null=True)
 
-    class Meta:
+    class Meta(RatingAggregate.Meta):
         ordering = ['order', 'created_at']
 
     # Moderatsiya holati
@@ -352,6 +417,7 @@ class CourseTypeTestResult(models.Model):
     class Meta:
         unique_together = ('test', 'user', 'attempt')
         ordering = ['-completed_at', '-started_at']
+        indexes = [models.Index(fields=['user', 'test'])]
 
     def __str__(self):
         return f"{self.user} -> {self.test} (#{self.attempt})"
@@ -425,10 +491,40 @@ class CourseVideoProgress(models.Model):
         unique_together = ('user', 'course_video')
         ordering = ['-updated_at']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # app.rollups.progress_saved: kunlik jurnal faqat progress o'zgarganda yoziladi
+        instance._loaded_progress = (instance.__dict__.get('seconds_watched'), instance.__dict__.get('completed'))
+        return instance
+
     def __str__(self):
         return f"{self.user} -> {self.course_video} @ {self.last_position}s completed={self.completed}"
 
 
+class CourseVideoProgressDay(models.Model):
+    """Learner video bo'yicha progress qilgan kunlar (append-only).
+
+    CourseVideoProgress qatori joyida yangilanadi (faqat oxirgi updated_at
+    qoladi), shuning uchun kunlik rollup (`app.rollups`) shu jadvalni o'qiydi:
+    har bir (user, video, kun) bitta qator, seconds_watched yoki completed
+    o'zgargan saqlashda signal yozadi (faqat last_position heartbeatlari
+    yozmaydi). Inkremental rollup va backfill bir xil natija beradi.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    course_video = models.ForeignKey(CourseVideo, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'course_video', 'day'], name='progress_day_uniq'),
+        ]
+        indexes = [models.Index(fields=['day', 'course_video'])]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.course_video_id} @ {self.day}"
+
+
 # =========================
 # Test (Quiz) modellari
 # =========================
@@ -490,6 +586,7 @@ class TestResult(models.Model):
     class Meta:
         unique_together = ('test', 'user', 'attempt')
         ordering = ['-completed_at', '-started_at']
+        indexes = [models.Index(fields=['user', 'test'])]
 
     def __str__(self):
         return f"{self.user} -> {self.test} (#{self.attempt})"
@@ -543,12 +640,13 @@ class AssignmentSubmission(models.Model):
     class Meta:
         ordering = ['-submitted_at']
         unique_together = ('assignment', 'student')
+        indexes = [models.Index(fields=['student', 'assignment'])]
 
     def __str__(self):
         return f"Submission: {self.student} -> {self.assignment}"
 
 
-class Reel(models.Model):
+class Reel(RatingAggregate):
     """Instagram-ga o'xshash qisqa videolar (reels)."""
     CHOICE_TYPE = (
         ('course', 'Course'),
@@ -611,7 +709,7 @@ class LikeReels(models.Model):
             self.reel.save(update_fields=['likes'])
         return super().delete(*args, **kwargs)
 
-class Playlist(models.Model):
+class Playlist(RatingAggregate):
     """Foydalanuvchi yoki kanal tomonidan yaratilgan playlist.
 
     Playlist ichiga film fayllari (MovieFile), CourseVideo yoki Reel'larni qo'shishingiz mumkin.
@@ -648,19 +746,33 @@ class Subscription(models.Model):
 
 
 
-class CommentBase(models.Model):
+class CommentBase(MaintainedFieldsModel):
     """Abstract comment base — har bir content turiga mos concrete modeldan meros olar.
 
     Ushbu yechim GenericForeignKey o'rniga aniq ForeignKey turlari bilan ishlash imkonini beradi.
     """
+    maintained_fields = ('path', 'root_id', 'depth', 'replies_count', 'descendants_count')
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     text = models.TextField()
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Daraxt (app/comment_tree.py yuritadi): path - ota-bobolar va o'zining id lari,
+    # har biri 10 xonali raqam; path bo'yicha tartib = daraxt tartibi, subtree = bitta oraliq
+    path = models.CharField(max_length=1000, blank=True, default='', db_index=True, editable=False)
+    root_id = models.PositiveBigIntegerField(null=True, blank=True, db_index=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    replies_count = models.PositiveIntegerField(default=0, editable=False)
+    descendants_count = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         abstract = True
+        indexes = [
+            # Foydalanuvchi izohlari lentasi (app.user_activity.comment_feed)
+            models.Index(fields=['user', '-created_at'], name='%(app_label)s_%(class)s_feed'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.user}: {self.text[:50]}"
@@ -687,7 +799,12 @@ class PlaylistComment(CommentBase):
 
 
 class RatingBase(models.Model):
-    """Abstract rating base; concrete klasslar user va value bilan meros oladi."""
+    """Abstract rating base; concrete klasslar user va value bilan meros oladi.
+
+    `target_field` - baholanayotgan obyektga FK (RatingAggregate) nomi.
+    """
+    target_field = None
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     value = models.PositiveSmallIntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
@@ -700,26 +817,34 @@ class RatingBase(models.Model):
             self.value = 1
         if self.value > 5:
             self.value = 5
-        return super().save(*args, **kwargs)
+        # Eski qiymatni o'qish (pre_save) va obyekt agregatini yangilash (post_save)
+        # bitta tranzaksiyada bo'lishi uchun (app/ratings.py)
+        with transaction.atomic():
+            return super().save(*args, **kwargs)
 
 
 class MovieRating(RatingBase):
+    target_field = 'movie'
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='ratings')
 
 
 class CourseVideoRating(RatingBase):
+    target_field = 'course_video'
     course_video = models.ForeignKey(CourseVideo, on_delete=models.CASCADE, related_name='ratings')
 
 
 class ReelRating(RatingBase):
+    target_field = 'reel'
     reel = models.ForeignKey(Reel, on_delete=models.CASCADE, related_name='ratings')
 
 
 class ChannelRating(RatingBase):
+    target_field = 'channel'
     channel = models.ForeignKey(Channel, on_delete=models.CASCADE, related_name='ratings')
 
 
 class PlaylistRating(RatingBase):
+    target_field = 'playlist'
     playlist = models.ForeignKey(Playlist, on_delete=models.CASCADE, related_name='ratings')
 
 
@@ -823,6 +948,19 @@ class Wallet(models.Model):
     balance = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'), help_text='FixCoin miqdori')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Running totals: ledger.post() balans bilan bitta UPDATE da oshiradi.
+    # transactions_count NULL bo'lsa hali hisoblanmagan -> refresh_stats()
+    total_income = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    total_expense = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'), help_text='Musbat qiymat')
+    transactions_count = models.PositiveIntegerField(null=True, blank=True, default=0)
+    courses_purchased = models.PositiveIntegerField(default=0)
+    courses_sold = models.PositiveIntegerField(default=0)
+    last_transaction_at = models.DateTimeField(null=True, blank=True)
+
+    STATS_FIELDS = (
+        'total_income', 'total_expense', 'transactions_count',
+        'courses_purchased', 'courses_sold', 'last_transaction_at',
+    )
 
     class Meta:
         verbose_name = 'Wallet'
@@ -832,43 +970,92 @@ class Wallet(models.Model):
         return f"{self.user.username} - {self.balance} FixCoin"
 
     def recalculate_balance(self):
-        """Tranzaksiyalar asosida balansni qayta hisoblash (debug uchun)."""
+        """Tranzaksiyalar asosida balansni qayta hisoblash (debug uchun).
+
+        Oxirgi checkpoint balansidan boshlanadi: arxivlangan (partitiondan
+        ajratilgan) tranzaksiyalar ledgerda endi ko'rinmaydi.
+        """
         from django.db.models import Sum
-        total = self.transactions.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        checkpoint = self.checkpoints.order_by('-last_transaction_id').first()
+        rows, total = self.transactions.all(), Decimal('0.00')
+        if checkpoint is not None:
+            rows, total = rows.filter(id__gt=checkpoint.last_transaction_id), checkpoint.balance
+        total += rows.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
         print(f"Calculated balance: {total}, Current balance: {self.balance}")
         return total
 
+    def compute_stats(self):
+        """Running totals: latest checkpoint plus newer ledger rows (one conditional-aggregation query).
+
+        Checkpointda shu tranzaksiyagacha bo'lgan totallar saqlanadi, shuning
+        uchun arxivlangan oylar qayta hisoblashda yo'qolmaydi.
+        """
+        from django.db.models import Count, Max, Q, Sum
+        checkpoint = (
+            self.checkpoints.filter(transactions_count__isnull=False)
+            .order_by('-last_transaction_id').first()
+        )
+        rows = self.transactions.order_by()
+        if checkpoint is not None:
+            rows = rows.filter(id__gt=checkpoint.last_transaction_id)
+        agg = rows.aggregate(
+            total_income=Sum('amount', filter=Q(amount__gt=0)),
+            total_expense=Sum('amount', filter=Q(amount__lt=0)),
+            transactions_count=Count('id'),
+            courses_purchased=Count('id', filter=Q(transaction_type='course_purchase')),
+            courses_sold=Count('id', filter=Q(transaction_type='course_earning')),
+            last_transaction_at=Max('created_at'),
+        )
+        agg['total_income'] = agg['total_income'] or Decimal('0.00')
+        agg['total_expense'] = abs(agg['total_expense'] or Decimal('0.00'))
+        if checkpoint is not None:
+            for field in WalletCheckpoint.STATS_FIELDS:
+                agg[field] += getattr(checkpoint, field)
+            agg['last_transaction_at'] = agg['last_transaction_at'] or checkpoint.last_transaction_at
+        return agg
+
+    def refresh_stats(self):
+        """Recompute and store the running totals (wallet row locked meanwhile)."""
+        from django.db import transaction
+        with transaction.atomic():
+            Wallet.objects.select_for_update().filter(pk=self.pk).values_list('pk').first()
+            stats = self.compute_stats()
+            Wallet.objects.filter(pk=self.pk).update(**stats)
+        for field, value in stats.items():
+            setattr(self, field, value)
+        return stats
+
+    def get_stats(self):
+        """Running totals from this row; computed once if not initialized yet."""
+        if self.transactions_count is None:
+            return self.refresh_stats()
+        return {field: getattr(self, field) for field in self.STATS_FIELDS}
+
     def add_balance(self, amount, transaction_type='deposit', description=''):
         """Balansga pul qo'shish va tranzaksiya yaratish."""
+        from app import ledger
         if amount <= 0:
             raise ValueError("Amount must be positive")
-        self.balance += Decimal(str(amount))
-        self.save()
-        # Tranzaksiya yaratish
-        return WalletTransaction.objects.create(
+        tx, = ledger.post([WalletTransaction(
             wallet=self,
             transaction_type=transaction_type,
             amount=amount,
-            balance_after=self.balance,
             description=description
-        )
+        )])
+        return tx
 
     def subtract_balance(self, amount, transaction_type='withdrawal', description=''):
-        """Balansdan pul yechish va tranzaksiya yaratish."""
+        """Balansdan pul yechish va tranzaksiya yaratish (mablag' qulf ostida tekshiriladi)."""
+        from app import ledger
         if amount <= 0:
             raise ValueError("Amount must be positive")
-        if self.balance < Decimal(str(amount)):
-            raise ValueError("Insufficient balance")
-        self.balance -= Decimal(str(amount))
-        self.save()
-        # Tranzaksiya yaratish
-        WalletTransaction.objects.create(
+        tx, = ledger.post([WalletTransaction(
             wallet=self,
             transaction_type=transaction_type,
-            amount=-amount,  # manfiy qiymat
-            balance_after=self.balance,
+            amount=-Decimal(str(amount)),  # manfiy qiymat
             description=description
-        )
+        )])
+        return tx
 
     @staticmethod
     def transfer_for_course_purchase(buyer_user, seller_user, course, amount, platform_commission_rate=0.05, course_type=None, transaction_type='course_purchase', *, original_amount=None, discount_amount=None, promo_code=None):
@@ -887,108 +1074,39 @@ class Wallet(models.Model):
             transaction_type: Tranzaksiya turi ('course_purchase' yoki 'course_type_purchase')
         """
         from django.db import transaction
+        from app import checkout, ledger, promos
         
         # O'zini-o'zi sotib olishni tekshirish
         if buyer_user == seller_user:
             raise ValueError("O'z kursini sotib olish mumkin emas")
         
-        amount = Decimal(str(amount))
-        orig_amount = Decimal(str(original_amount)) if original_amount is not None else amount
-        disc_amount = Decimal(str(discount_amount)) if discount_amount is not None else Decimal('0.00')
-        commission = amount * Decimal(str(platform_commission_rate))
-        seller_earning = amount - commission
-        
-        # Xaridorning hamyonini tekshirish
+        # Hamyonlar (balans ledger.post ichida qulf ostida tekshiriladi)
         buyer_wallet, _ = Wallet.objects.get_or_create(user=buyer_user)
-        if buyer_wallet.balance < amount:
-            raise ValueError("Yetarli mablag' mavjud emas")
-        
-        # Sotuvchining hamyonini yaratish/olish
         seller_wallet, _ = Wallet.objects.get_or_create(user=seller_user)
         
-        # Tranzaksiya tavsifi
-        purchase_type = "Kurs turi" if course_type else "Kurs"
-        item_name = f"{course_type.name}" if course_type else course.title
-        
         with transaction.atomic():
-            # 1. Xaridordan pul yechish
-            buyer_wallet.balance -= amount
-            buyer_wallet.save()
-            
-            transaction_data = {
-                'wallet': buyer_wallet,
-                'transaction_type': transaction_type,
-                'amount': -amount,
-                'balance_after': buyer_wallet.balance,
-                'description': f"{purchase_type} sotib olish: {item_name}",
-                'course': course,
-                'from_user': buyer_user,
-                'to_user': seller_user,
-                'promo_code': promo_code,
-                'original_amount': orig_amount,
-                'discount_amount': disc_amount,
-            }
-            
-            # Agar kurs turi kiritilgan bo'lsa, uni ham qo'shamiz
-            if course_type:
-                buyer_transaction = WalletTransaction.objects.create(
-                    **transaction_data,
-                    course_type=course_type
-                )
-            else:
-                buyer_transaction = WalletTransaction.objects.create(**transaction_data)
-            
-            # 2. Sotuvchiga pul qo'shish (komissiyasiz)
-            seller_wallet.balance += seller_earning
-            seller_wallet.save()
-            
-            seller_transaction = WalletTransaction.objects.create(
-                wallet=seller_wallet,
-                transaction_type=('course_type_earning' if course_type else 'course_earning'),
-                amount=seller_earning,
-                balance_after=seller_wallet.balance,
-                description=f"{purchase_type} sotishdan daromad: {item_name}",
+            # 1. Xaridordan pul yechish, 2. sotuvchiga pul qo'shish (komissiyasiz),
+            # 3. platforma komissiyasi faqat jurnalga yoziladi, platforma hamyoniga
+            # PendingCommission.settle_batch() (Celery beat) partiyalab o'tkazadi
+            buyer_transaction, seller_transaction, commission = checkout.build_purchase(
+                buyer_wallet, seller_wallet,
                 course=course,
                 course_type=course_type,
-                from_user=buyer_user,
-                to_user=seller_user,
-                related_transaction=buyer_transaction
+                amount=amount,
+                original_amount=original_amount,
+                discount_amount=discount_amount,
+                promo_code=promo_code,
+                transaction_type=transaction_type,
+                commission_rate=platform_commission_rate,
             )
+            if commission is not None:
+                commission.purchase_transaction = buyer_transaction
+            ledger.post([buyer_transaction, seller_transaction], insufficient_message="Yetarli mablag' mavjud emas")
+            checkout.link_purchases([(buyer_transaction, seller_transaction)], [commission])
             
-            # Bog'langan tranzaksiyani yangilash
-            buyer_transaction.related_transaction = seller_transaction
-            buyer_transaction.save()
-            # Promo usage increment
+            # Promokod ishlatilishi: max_uses dan oshmasligi shartli UPDATE bilan kafolatlanadi
             if promo_code:
-                try:
-                    PromoCode.objects.filter(id=promo_code.id).update(uses=models.F('uses') + 1)
-                except Exception:
-                    pass
-            
-            # 3. Agar komissiya bor bo'lsa, platforma uchun tranzaksiya (ixtiyoriy)
-            if commission > 0:
-                try:
-                    from django.contrib.auth import get_user_model
-                    User = get_user_model()
-                    platform_user = User.objects.filter(is_superuser=True).first()
-                    if platform_user:
-                        platform_wallet, _ = Wallet.objects.get_or_create(user=platform_user)
-                        platform_wallet.balance += commission
-                        platform_wallet.save()
-                        
-                        WalletTransaction.objects.create(
-                            wallet=platform_wallet,
-                            transaction_type='commission',
-                            amount=commission,
-                            balance_after=platform_wallet.balance,
-                            description=f"Platforma komissiyasi: {item_name}",
-                            course=course,
-                            course_type=course_type,
-                            from_user=buyer_user,
-                            to_user=platform_user
-                        )
-                except Exception:
-                    pass  # Komissiya tranzaksiyasi muvaffaqiyatsiz bo'lsa, asosiy tranzaksiya bajariladi
+                promos.claim(promo_code)
             
             return buyer_transaction, seller_transaction
 
@@ -1010,7 +1128,8 @@ class WalletTransaction(models.Model):
         ('penalty', 'Jarima'),
         ('commission', 'Komissiya (platforma)'),
     ]
-    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='transactions')
+    # alohida indeks kerak emas: (wallet, created_at, id) uni qoplaydi
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='transactions', db_index=False)
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
     amount = models.DecimalField(max_digits=15, decimal_places=2, help_text='Musbat - kirim, manfiy - chiqim')
     original_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0, help_text='Asl narx')
@@ -1025,7 +1144,9 @@ class WalletTransaction(models.Model):
     from_user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='sent_transactions', help_text="Pul jo'natuvchi")
     to_user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='received_transactions', help_text='Pul qabul qiluvchi')
     # Bog'langan tranzaksiya (masalan, kurs sotib olishda 2 ta tranzaksiya bir-biriga bog'langan)
-    related_transaction = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, help_text='Bog\'langan tranzaksiya')
+    # db_constraint=False: WalletTransaction PostgreSQL da created_at bo'yicha partitionlangan,
+    # partitionlangan jadvalga faqat id bo'yicha FK qo'yib bo'lmaydi (SET_NULL Django tomonidan bajariladi)
+    related_transaction = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False, help_text='Bog\'langan tranzaksiya')
     # Qo'llangan promokod
     promo_code = models.ForeignKey('PromoCode', on_delete=models.SET_NULL, null=True, blank=True, help_text='Agar promokod ishlatilgan bo\'lsa')
     
@@ -1035,6 +1156,17 @@ class WalletTransaction(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Wallet Transaction'
         verbose_name_plural = 'Wallet Transactions'
+        indexes = [
+            # Kurs xaridorlari ro'yxati (teacher students) uchun
+            models.Index(fields=['course', 'transaction_type', 'created_at']),
+            models.Index(fields=['course_type', 'transaction_type', 'created_at']),
+            # Director ledger: keyset (created_at, id) + type/date filtrlari
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['transaction_type', 'created_at', 'id']),
+            # Foydalanuvchi tranzaksiyalar tarixi: hamyon bo'yicha keyset; type filtri
+            # shu indeks yoki (transaction_type, created_at, id) bilan yetarli
+            models.Index(fields=['wallet', 'created_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.wallet.user.username} - {self.get_transaction_type_display()} - {self.amount} FixCoin"
@@ -1048,6 +1180,161 @@ class WalletTransaction(models.Model):
         return self.amount < 0
 
 
+
+class WalletCheckpoint(models.Model):
+    """
+    Hamyonning tekshirilgan (ledger bilan mos) balansi ma'lum tranzaksiyagacha.
+
+    `app.reconciliation` keyingi tekshiruvda faqat `last_transaction_id` dan
+    keyingi tranzaksiyalarni qo'shadi, butun tarixni emas. Running totallar
+    ham shu tranzaksiyagacha saqlanadi (`Wallet.compute_stats` shundan
+    boshlaydi); ular NULL bo'lgan eski checkpointlar faqat balansni biladi.
+    """
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='checkpoints')
+    balance = models.DecimalField(max_digits=15, decimal_places=2)
+    last_transaction_id = models.BigIntegerField()
+    last_transaction_at = models.DateTimeField(null=True, blank=True)
+    total_income = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    total_expense = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    transactions_count = models.PositiveIntegerField(null=True, blank=True)
+    courses_purchased = models.PositiveIntegerField(null=True, blank=True)
+    courses_sold = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    STATS_FIELDS = ('total_income', 'total_expense', 'transactions_count', 'courses_purchased', 'courses_sold')
+
+    class Meta:
+        ordering = ['-last_transaction_id']
+        indexes = [
+            models.Index(fields=['wallet', '-last_transaction_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id} @ {self.last_transaction_id}: {self.balance}"
+
+
+class PendingCommission(models.Model):
+    """
+    Platforma komissiyasi jurnali (append-only).
+
+    Xarid tranzaksiyasi ichida faqat shu jadvalga qator qo'shiladi; platforma
+    hamyoniga esa `settle_batch()` (Celery beat) yig'ilgan summani bitta
+    UPDATE bilan o'tkazadi. Shu sababli parallel xaridlar platforma hamyoni
+    qatori qulfida navbatga turmaydi (xarid qulflaydigan qatorlar - app/ledger.py).
+    """
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    course = models.ForeignKey('Course', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    course_type = models.ForeignKey('CourseType', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    from_user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    purchase_transaction = models.ForeignKey(WalletTransaction, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False, related_name='+')
+    description = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Platforma hamyoniga o'tkazilganda to'ldiriladi
+    settled_at = models.DateTimeField(null=True, blank=True)
+    settlement = models.ForeignKey(WalletTransaction, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False, related_name='settled_commissions')
+
+    SETTLE_BATCH_SIZE = 5000
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['id'], condition=Q(settled_at__isnull=True), name='pending_commission_open_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.amount} FixCoin - {'settled' if self.settled_at else 'pending'}"
+
+    @classmethod
+    def settle_batch(cls, batch_size=SETTLE_BATCH_SIZE):
+        """Kutilayotgan komissiyalarning bir qismini platforma hamyoniga o'tkazish.
+
+        Bitta tranzaksiyada: qatorlarni qulflash (band bo'lganlari o'tkazib
+        yuboriladi), summa, `ledger.post` orqali bitta 'commission'
+        tranzaksiya va qatorlarni settled deb belgilash. Superuser bo'lmasa
+        komissiyalar kutishda qoladi. Returns (rows, amount).
+        """
+        from django.contrib.auth import get_user_model
+        from django.db import transaction
+        from django.db.models import Sum
+        from app import ledger
+
+        platform_user = get_user_model().objects.filter(is_superuser=True).order_by('id').first()
+        if platform_user is None:
+            return 0, Decimal('0.00')
+        with transaction.atomic():
+            ids = list(
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(settled_at__isnull=True).order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return 0, Decimal('0.00')
+            total = cls.objects.filter(id__in=ids).aggregate(t=Sum('amount'))['t'] or Decimal('0.00')
+            platform_wallet, _ = Wallet.objects.get_or_create(user=platform_user)
+            settlement, = ledger.post([WalletTransaction(
+                wallet=platform_wallet,
+                transaction_type='commission',
+                amount=total,
+                description=f"Platforma komissiyasi: {len(ids)} ta xarid",
+                to_user=platform_user,
+            )])
+            cls.objects.filter(id__in=ids).update(settled_at=timezone.now(), settlement=settlement)
+        return len(ids), total
+
+    @classmethod
+    def settle_all(cls, batch_size=SETTLE_BATCH_SIZE):
+        """Kutilayotgan barcha komissiyalarni partiyalab o'tkazish."""
+        rows, amount = 0, Decimal('0.00')
+        while True:
+            n, total = cls.settle_batch(batch_size)
+            if not n:
+                return rows, amount
+            rows += n
+            amount += total
+
+
+class CourseEntitlement(models.Model):
+    """
+    Kimga nima sotib olingan: xarid tranzaksiyalaridan denormalizatsiya.
+
+    course_type bo'sh bo'lsa - butun kurs (course_purchase), aks holda shu kurs
+    turi (course_type_purchase). `ledger.post` xarid bilan bitta tranzaksiyada
+    yozadi (`app.entitlements`), eski ma'lumot `backfill_entitlements` bilan.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='entitlements')
+    course = models.ForeignKey('Course', on_delete=models.CASCADE, related_name='entitlements')
+    course_type = models.ForeignKey('CourseType', on_delete=models.CASCADE, null=True, blank=True, related_name='entitlements')
+    purchase_transaction = models.ForeignKey(WalletTransaction, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            # course_type NULL bo'lganda unique_together ishlamaydi, shuning uchun ikkita partial unique
+            models.UniqueConstraint(fields=['user', 'course'], condition=Q(course_type__isnull=True), name='entitlement_user_course_uniq'),
+            models.UniqueConstraint(fields=['user', 'course_type'], condition=Q(course_type__isnull=False), name='entitlement_user_course_type_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'user']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.course_id}/{self.course_type_id or '*'}"
+
+
+class CourseStudentDelta(models.Model):
+    """Course.students_count o'zgarishlari jurnali (append-only).
+
+    Xarid tranzaksiyasi mashhur kurs qatorini qulflamasligi uchun faqat shu
+    yerga qator qo'shiladi; `course_stats.fold_students()` (Celery beat)
+    kurs qatoriga yig'adi.
+    """
+    course = models.ForeignKey('Course', on_delete=models.CASCADE, related_name='+')
+    delta = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.course_id} {self.delta:+d}"
+
 # =============================
 # Promo Codes
 # =============================
@@ -1090,3 +1377,110 @@ class PromoCode(models.Model):
         if self.max_uses is not None and self.uses >= self.max_uses:
             return False
         return True
+
+
+# =============================
+# Analytics rollups
+# =============================
+class CourseDailyStat(models.Model):
+    """Kurs bo'yicha kunlik agregatlar (teacher analytics time series uchun).
+
+    `app.rollups` tomonidan to'ldiriladi; bugungi kun hech qachon saqlanmaydi,
+    u so'rov vaqtida live hisoblanadi.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    progress_events = models.PositiveIntegerField(default=0)
+    active_learners = models.PositiveIntegerField(default=0)
+    video_test_attempts = models.PositiveIntegerField(default=0)
+    video_test_passed = models.PositiveIntegerField(default=0)
+    ct_test_attempts = models.PositiveIntegerField(default=0)
+    ct_test_passed = models.PositiveIntegerField(default=0)
+    video_submissions = models.PositiveIntegerField(default=0)
+    video_submissions_graded = models.PositiveIntegerField(default=0)
+    ct_submissions = models.PositiveIntegerField(default=0)
+    purchases = models.PositiveIntegerField(default=0)
+    buyers = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Course Daily Stat'
+        verbose_name_plural = 'Course Daily Stats'
+        unique_together = ('course', 'day')
+        indexes = [models.Index(fields=['day', 'course'])]
+        ordering = ['day']
+
+    def __str__(self):
+        return f"{self.course_id} @ {self.day}"
+
+
+class RollupState(models.Model):
+    """Rollup joblari uchun high-water mark: `rolled_up_to` gacha (shu kun ham) hisoblangan."""
+    name = models.CharField(max_length=64, unique=True)
+    rolled_up_to = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.rolled_up_to}"
+
+
+class TeacherDashboardSnapshot(models.Model):
+    """Teacher dashboard endpointlari uchun oldindan hisoblangan JSON payload.
+
+    Har bir (user, kind, scope) uchun faqat oxirgi snapshot saqlanadi; `version`
+    har yangilanishda oshadi, `schema_version` payload formati o'zgarganda
+    eski snapshotlarni yaroqsiz qilish uchun.
+    """
+    KIND_CHOICES = [
+        ('overview', 'Overview'),
+        ('courses', 'Courses'),
+        ('engagement', 'Engagement'),
+        ('tests_stats', 'Tests stats'),
+        ('assignments_stats', 'Assignments stats'),
+    ]
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='dashboard_snapshots')
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    scope = models.CharField(max_length=64, blank=True, default='', help_text='Masalan kanal id (kanal bo‘yicha statistikalar uchun)')
+    schema_version = models.PositiveSmallIntegerField(default=1)
+    version = models.PositiveIntegerField(default=1)
+    payload = models.JSONField(default=dict)
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Teacher Dashboard Snapshot'
+        verbose_name_plural = 'Teacher Dashboard Snapshots'
+        unique_together = ('user', 'kind', 'scope')
+
+    def __str__(self):
+        return f"{self.user_id}:{self.kind}:{self.scope} v{self.version}"
+
+
+class PlatformCounter(models.Model):
+    """Platforma bo'yicha inkremental hisoblagichlar (director reports uchun).
+
+    Yozuvlar PlatformCounterDelta jurnali orqali keladi va `platform_counters.fold()`
+    shu yerga yig'adi; `reconcile_platform_counters` komandasi noldan qayta hisoblaydi.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    value = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class PlatformCounterDelta(models.Model):
+    """PlatformCounter o'zgarishlari jurnali (append-only).
+
+    Yozish tranzaksiyasi (xarid, signal) faqat shu jadvalga qator qo'shadi;
+    umumiy PlatformCounter qatorlarini `platform_counters.fold()` (Celery
+    beat) yangilaydi, shuning uchun parallel yozuvlar ularning qulfida
+    navbatga turmaydi. O'qishda hali yig'ilmagan qatorlar ham qo'shiladi.
+    """
+    key = models.CharField(max_length=64)
+    value = models.DecimalField(max_digits=20, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.key} += {self.value}"
@@ -1,4 +1,12 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class ReelPagination(PageNumberPagination):
     page_size = 10
@@ -40,4 +48,93 @@ class CoursePagination(PageNumberPagination):
 class ChannelPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
-    max_page_size = 50
\ No newline at end of file
+    max_page_size = 50
+
+class KeysetPagination(BasePagination):
+    """Keyset (cursor) pagination: newest first on (created_at, id).
+
+    Har bir sahifa `WHERE (created_at, id) < cursor ORDER BY created_at DESC,
+    id DESC LIMIT n` bilan olinadi, shuning uchun chuqur sahifalar ham
+    indeks bo'yicha tez va yangi qatorlar qo'shilsa sahifalar siljimaydi.
+    Cursor ochiq ko'rinmaydigan (opaque) base64 satr.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    # Eski limit/offset klientlar uchun: cursor berilmasa shu offsetdan boshlanadi
+    offset_query_param = None
+    ordering_field = 'created_at'
+
+    def encode_cursor(self, obj):
+        value = getattr(obj, self.ordering_field)
+        raw = f'{value.isoformat()}|{obj.pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)).decode()
+            value, pk = raw.rsplit('|', 1)
+            return datetime.fromisoformat(value), int(pk)
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            raise NotFound('Invalid cursor')
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        f = self.ordering_field
+        offset = 0
+        if cursor is not None:
+            value, pk = cursor
+            queryset = queryset.filter(Q(**{f'{f}__lt': value}) | Q(**{f: value, 'pk__lt': pk}))
+        elif self.offset_query_param:
+            try:
+                offset = max(0, int(request.query_params.get(self.offset_query_param, 0)))
+            except (TypeError, ValueError):
+                offset = 0
+        rows = list(queryset.order_by(f'-{f}', '-pk')[offset:offset + self.page_size_value + 1])
+        has_next = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        self.next_cursor = self.encode_cursor(rows[-1]) if has_next else None
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class WalletTransactionPagination(KeysetPagination):
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    offset_query_param = 'offset'
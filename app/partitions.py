@@ -0,0 +1,233 @@
+"""WalletTransaction jadvalining oylik partitionlari (faqat PostgreSQL).
+
+Jadval `created_at` bo'yicha RANGE partitionlangan (migratsiya 0051): har oy
+uchun `app_wallettransaction_pYYYY_MM` va oraliqdan tashqaridagi qatorlar
+uchun `app_wallettransaction_default`. `ensure_ahead()` (Celery beat) kelgusi
+oylar partitionlarini oldindan yaratadi; `archive_before()` eski oylarni
+jadvaldan ajratib (DETACH) `wallet_archive` sxemasiga ko'chiradi.
+Boshqa DB larda (sqlite) jadval oddiy bo'lib qoladi va bu funksiyalar ishlamaydi.
+
+Arxivlangan qatorlar ORM so'rovlarida ko'rinmaydi. Tarixni to'liq qayta
+hisoblaydigan iste'molchilar arxiv chegarasini (`archive_boundary()`)
+tekshiradi va arxivlangan oraliqda PartitionError bilan to'xtaydi
+(`require_live()`): `rollups.rollup_range`, `entitlements.backfill`,
+`platform_counters.reconcile` (tx.* kalitlari). Hamyon totallari va
+balans checkpointlardan davom etadi, teacher statistikasi CourseEntitlement
+va CourseDailyStat dan o'qiydi. Ledger ro'yxati / eksporti faqat jonli
+oylarni ko'rsatadi.
+"""
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import F, Max, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from app import models
+
+
+PARENT = models.WalletTransaction._meta.db_table
+DEFAULT_PARTITION = f'{PARENT}_default'
+ARCHIVE_SCHEMA = 'wallet_archive'
+# Beat har kuni ishlaydi; shuncha oy oldindan partition tayyor turadi
+PARTITIONS_AHEAD = 3
+
+_NAME_RE = re.compile(rf'^{PARENT}_p(\d{{4}})_(\d{{2}})$')
+
+
+class PartitionError(RuntimeError):
+    pass
+
+
+def _q(name):
+    return connection.ops.quote_name(name)
+
+
+def is_supported():
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned():
+    if not is_supported():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace",
+            [PARENT],
+        )
+        return cursor.fetchone() is not None
+
+
+def _require_partitioned():
+    if not is_partitioned():
+        raise PartitionError(f'{PARENT} is not a partitioned table (PostgreSQL + migration 0051 required)')
+
+
+def archive_boundary():
+    """Start of the oldest month still attached, if any month was archived; else None."""
+    if not is_supported():
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = %s AND c.relkind = 'r'",
+            [ARCHIVE_SCHEMA],
+        )
+        months = [date(int(m.group(1)), int(m.group(2)), 1) for m in map(_NAME_RE.match, (r[0] for r in cursor)) if m]
+    if not months:
+        return None
+    end = add_months(max(months), 1)
+    return datetime(end.year, end.month, 1, tzinfo=dt_timezone.utc)
+
+
+def require_live(since, what):
+    """PartitionError if transactions from `since` (None - all history) may be archived."""
+    boundary = archive_boundary()
+    if boundary is not None and (since is None or since < boundary):
+        raise PartitionError(
+            f'{what}: transactions before {boundary:%Y-%m-%d} are archived in {ARCHIVE_SCHEMA} '
+            'and not visible to this computation'
+        )
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{PARENT}_p{month:%Y_%m}'
+
+
+def _bound(month):
+    return f"'{month:%Y-%m-%d} 00:00:00+00'"
+
+
+def list_partitions():
+    """[{name, month, rows}] for attached partitions, oldest first (default last).
+
+    `rows` - pg_class.reltuples bahosi (ANALYZE dan keyin aniq).
+    """
+    _require_partitioned()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, c.reltuples::bigint FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND p.relnamespace = current_schema()::regnamespace",
+            [PARENT],
+        )
+        rows = cursor.fetchall()
+    result = []
+    for name, tuples in rows:
+        m = _NAME_RE.match(name)
+        result.append({
+            'name': name,
+            'month': date(int(m.group(1)), int(m.group(2)), 1) if m else None,
+            'rows': max(tuples, 0),
+        })
+    return sorted(result, key=lambda p: (p['month'] is None, p['month'] or date.min))
+
+
+def ensure_partition(month):
+    """Create the partition for `month` if missing; returns True if created.
+
+    Default partitionda shu oyga tegishli qatorlar bo'lsa, PostgreSQL yangi
+    partitionni qo'shishga ruxsat bermaydi, shuning uchun jadval alohida
+    yaratiladi, qatorlar default dan ko'chiriladi va keyin ATTACH qilinadi.
+    """
+    _require_partitioned()
+    month = month_start(month)
+    name = partition_name(month)
+    if any(p['name'] == name for p in list_partitions()):
+        return False
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {_q(DEFAULT_PARTITION)} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM {_q(DEFAULT_PARTITION)} '
+            f'WHERE created_at >= {lower} AND created_at < {upper})'
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f'CREATE TABLE {_q(name)} PARTITION OF {_q(PARENT)} '
+                f'FOR VALUES FROM ({lower}) TO ({upper})'
+            )
+            return True
+        cursor.execute(f'CREATE TABLE {_q(name)} (LIKE {_q(PARENT)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {_q(DEFAULT_PARTITION)} '
+            f'WHERE created_at >= {lower} AND created_at < {upper} RETURNING *) '
+            f'INSERT INTO {_q(name)} SELECT * FROM moved'
+        )
+        cursor.execute(
+            f'ALTER TABLE {_q(PARENT)} ATTACH PARTITION {_q(name)} '
+            f'FOR VALUES FROM ({lower}) TO ({upper})'
+        )
+    return True
+
+
+def ensure_ahead(months=PARTITIONS_AHEAD):
+    """Make sure partitions exist from the current month up to `months` ahead."""
+    current = month_start(timezone.now())
+    return [
+        partition_name(add_months(current, i))
+        for i in range(months + 1)
+        if ensure_partition(add_months(current, i))
+    ]
+
+
+def unverified_wallets(before):
+    """Wallets with transactions before `before` that no checkpoint covers yet.
+
+    Arxivlangan qatorlar endi ledgerda ko'rinmaydi, shuning uchun balansni
+    tekshirish (reconciliation), `Wallet.compute_stats` va
+    `recalculate_balance` ularni faqat checkpoint orqali hisobga oladi.
+    Running totallari yo'q (eski) checkpointlar qoplamaydi.
+    """
+    latest_checkpoint = (
+        models.WalletCheckpoint.objects.filter(wallet_id=OuterRef('wallet_id'), transactions_count__isnull=False)
+        .order_by('-last_transaction_id').values('last_transaction_id')[:1]
+    )
+    return (
+        models.WalletTransaction.objects.filter(created_at__lt=before)
+        .order_by().values('wallet_id')
+        .annotate(max_id=Max('id'), checkpoint=Subquery(latest_checkpoint))
+        .filter(Q(checkpoint__isnull=True) | Q(checkpoint__lt=F('max_id')))
+        .values_list('wallet_id', flat=True)
+    )
+
+
+def archive_before(cutoff, force=False, dry_run=False):
+    """Detach monthly partitions that end on/before `cutoff` into ARCHIVE_SCHEMA.
+
+    Qatorlar o'chirilmaydi: jadval `wallet_archive` sxemasida qoladi va kerak
+    bo'lsa qayta ATTACH qilinishi yoki pg_dump bilan olib qo'yilishi mumkin.
+    Checkpoint bilan qoplanmagan hamyonlar bo'lsa `force` siz rad etiladi.
+    """
+    _require_partitioned()
+    cutoff = month_start(cutoff)
+    targets = [p['name'] for p in list_partitions() if p['month'] and p['month'] < cutoff]
+    if not targets:
+        return []
+    if not force:
+        before = datetime(cutoff.year, cutoff.month, 1, tzinfo=dt_timezone.utc)
+        pending = list(unverified_wallets(before)[:20])
+        if pending:
+            raise PartitionError(
+                f'Wallets without a checkpoint covering the archived range: {pending} '
+                '(run reconcile_wallets first or pass force)'
+            )
+    if dry_run:
+        return targets
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {_q(ARCHIVE_SCHEMA)}')
+    for name in targets:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {_q(PARENT)} DETACH PARTITION {_q(name)}')
+            cursor.execute(f'ALTER TABLE {_q(name)} SET SCHEMA {_q(ARCHIVE_SCHEMA)}')
+    return targets
@@ -0,0 +1,304 @@
+"""Platforma hisoblagichlari (PlatformCounter) ni yuritish.
+
+Har bir kuzatiladigan model uchun `_contributions()` bitta obyektning
+hisoblagichlarga qo'shadigan hissasini qaytaradi. Signal handlerlar eski va
+yangi hissalar farqini PlatformCounterDelta jurnaliga yozadi (faqat INSERT,
+yozish tranzaksiyasi bilan birga commit/rollback bo'ladi). Umumiy
+PlatformCounter qatorlarini faqat `fold()` (Celery beat) yangilaydi, shuning
+uchun xaridlar va boshqa yozuvlar ularning qulfida navbatga turmaydi.
+`read_all()` hali yig'ilmagan jurnal qatorlarini ham qo'shadi.
+`queryset.update()` va `bulk_create` signal yubormaydi: bunday yo'llar
+`apply()` ni o'zi chaqirishi yoki `reconcile()` ga tayanishi kerak.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum, Q, F, Case, When, Value, DecimalField
+from django.utils import timezone
+
+from app import models, partitions
+
+
+INITIALIZED_KEY = 'meta.initialized'
+TX_PREFIX = 'tx.'
+
+# model -> tracked fields (old values are read in pre_save for updates)
+TRACKED_FIELDS = {
+    models.User: ('role',),
+    models.Course: ('is_active',),
+    models.CourseVideo: ('is_active',),
+    models.Channel: ('verified',),
+    models.WalletTransaction: ('transaction_type', 'amount'),
+}
+
+
+def _contributions(model, values):
+    """Counter deltas contributed by one row with field `values`."""
+    if model is models.User:
+        return {f"users.role.{values['role']}": 1}
+    if model is models.Course:
+        return {'courses.total': 1, 'courses.active': 1 if values['is_active'] else 0}
+    if model is models.CourseVideo:
+        return {'videos.total': 1, 'videos.active': 1 if values['is_active'] else 0}
+    if model is models.Channel:
+        return {'channels.total': 1, 'channels.verified': 1 if values['verified'] else 0}
+    if model is models.WalletTransaction:
+        amount = Decimal(values['amount'] or 0)
+        return {
+            'tx.count': 1,
+            f"tx.type.{values['transaction_type']}": 1,
+            'tx.income': amount if amount > 0 else Decimal('0'),
+            'tx.expense': amount if amount < 0 else Decimal('0'),
+        }
+    return {}
+
+
+def _merge(target, deltas, sign=1):
+    for key, delta in deltas.items():
+        target[key] = target.get(key, 0) + sign * delta
+    return target
+
+
+# fold() bir partiyada yig'adigan jurnal qatorlari soni
+FOLD_BATCH_SIZE = 5000
+
+
+def apply(deltas):
+    """Journal `deltas` ({key: number}) for fold(): one INSERT, no shared row is locked."""
+    rows = [
+        models.PlatformCounterDelta(key=k, value=Decimal(v))
+        for k, v in sorted(deltas.items()) if v
+    ]
+    if rows:
+        models.PlatformCounterDelta.objects.bulk_create(rows)
+
+
+def known_keys():
+    """Keys that always exist (seeded with 0 by reconcile / migration 0058)."""
+    keys = ['courses.total', 'courses.active', 'videos.total', 'videos.active',
+            'channels.total', 'channels.verified', 'tx.count', 'tx.income', 'tx.expense']
+    keys += [f'users.role.{role}' for role, _ in models.User._meta.get_field('role').choices]
+    keys += [
+        f'tx.type.{kind}'
+        for kind, _ in models.WalletTransaction._meta.get_field('transaction_type').choices
+    ]
+    return keys
+
+
+def _ensure_keys(keys):
+    # Nol qiymatli qator: parallel fold ikkalasi ham qo'shsa yo'qotiladigan delta yo'q
+    models.PlatformCounter.objects.bulk_create(
+        [models.PlatformCounter(key=k) for k in keys], ignore_conflicts=True,
+    )
+
+
+def fold_batch(batch_size=FOLD_BATCH_SIZE):
+    """Add one batch of journal rows to PlatformCounter and delete them; returns rows folded.
+
+    SKIP LOCKED: parallel ishga tushgan fold lar bir-birini kutmaydi va bir
+    qatorni ikki marta qo'shmaydi.
+    """
+    with transaction.atomic():
+        ids = list(
+            models.PlatformCounterDelta.objects.select_for_update(skip_locked=True)
+            .order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        sums = dict(
+            models.PlatformCounterDelta.objects.filter(pk__in=ids)
+            .values('key').annotate(total=Sum('value')).order_by().values_list('key', 'total')
+        )
+        keys = sorted(k for k, v in sums.items() if v)  # doim bir xil tartib -> deadlock yo'q
+        if keys:
+            _ensure_keys(keys)
+            increment = Case(
+                *[When(key=k, then=Value(sums[k])) for k in keys],
+                default=Value(Decimal('0')),
+                output_field=DecimalField(max_digits=20, decimal_places=2),
+            )
+            models.PlatformCounter.objects.filter(key__in=keys).update(
+                value=F('value') + increment, updated_at=timezone.now(),
+            )
+        models.PlatformCounterDelta.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def fold(batch_size=FOLD_BATCH_SIZE):
+    """Fold the whole journal in batches (Celery beat); returns rows folded."""
+    total = 0
+    while True:
+        n = fold_batch(batch_size)
+        total += n
+        if n < batch_size:
+            return total
+
+
+def record_transactions(transactions):
+    """For bulk_create'd WalletTransaction rows (no signals are sent)."""
+    deltas = {}
+    for tx in transactions:
+        _merge(deltas, _contributions(models.WalletTransaction, {
+            'transaction_type': tx.transaction_type, 'amount': tx.amount,
+        }))
+    apply(deltas)
+
+
+# ----------------------------
+# Signal handlers (connected in app/signals.py)
+# ----------------------------
+def _values(instance, fields):
+    return {f: getattr(instance, f) for f in fields}
+
+
+def remember_old_values(sender, instance, raw=False, **kwargs):
+    instance._platform_counter_old = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._platform_counter_old = (
+        sender.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS[sender]).first()
+    )
+
+
+def update_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    fields = TRACKED_FIELDS[sender]
+    deltas = _contributions(sender, _values(instance, fields))
+    old = getattr(instance, '_platform_counter_old', None)
+    if not created and old is not None:
+        _merge(deltas, _contributions(sender, old), sign=-1)
+    elif not created:
+        return
+    apply(deltas)
+
+
+def update_on_delete(sender, instance, **kwargs):
+    deltas = _merge({}, _contributions(sender, _values(instance, TRACKED_FIELDS[sender])), sign=-1)
+    apply(deltas)
+
+
+# ----------------------------
+# Read / reconcile
+# ----------------------------
+def compute_from_scratch(include_tx=True):
+    """Full recount from the source tables (used by reconcile); tx.* only if `include_tx`."""
+    values = {}
+    for row in models.User.objects.values('role').annotate(n=Count('id')).order_by():
+        values[f"users.role.{row['role']}"] = row['n']
+    values.update({
+        f'courses.{k}': v for k, v in models.Course.objects.aggregate(
+            total=Count('id'), active=Count('id', filter=Q(is_active=True))).items()
+    })
+    values.update({
+        f'videos.{k}': v for k, v in models.CourseVideo.objects.aggregate(
+            total=Count('id'), active=Count('id', filter=Q(is_active=True))).items()
+    })
+    values.update({
+        f'channels.{k}': v for k, v in models.Channel.objects.aggregate(
+            total=Count('id'), verified=Count('id', filter=Q(verified=True))).items()
+    })
+    values[INITIALIZED_KEY] = 1
+    if not include_tx:
+        return values
+    tx = models.WalletTransaction.objects.order_by()
+    totals = tx.aggregate(
+        count=Count('id'),
+        income=Sum('amount', filter=Q(amount__gt=0)),
+        expense=Sum('amount', filter=Q(amount__lt=0)),
+    )
+    values.update({f'tx.{k}': v or 0 for k, v in totals.items()})
+    for row in tx.values('transaction_type').annotate(n=Count('id')):
+        values[f"tx.type.{row['transaction_type']}"] = row['n']
+    return values
+
+
+def _stored_values():
+    """{key: Decimal}: counters plus unfolded journal rows, read in one statement (one snapshot)."""
+    rows = models.PlatformCounter.objects.values_list('key', 'value').union(
+        models.PlatformCounterDelta.objects.values_list('key', 'value'), all=True,
+    )
+    values = {}
+    for key, value in rows:
+        values[key] = values.get(key, Decimal('0')) + value
+    return values
+
+
+def reconcile(dry_run=False):
+    """Recompute every counter; returns {key: (stored, actual)} for drifted keys.
+
+    Yig'ilmagan jurnal qatorlari ham "stored" ga kiradi; tuzatishda ular
+    o'chiriladi, chunki noldan hisoblangan qiymat ularni o'z ichiga oladi.
+
+    WalletTransaction partitionlari arxivlangan bo'lsa (`app.partitions`)
+    tx.* ni jonli qatorlardan qayta hisoblash ularni kamaytirib yuborardi:
+    bu kalitlar (va ularning jurnal qatorlari) o'zgarmaydi, hisoblagichlar
+    hali boshlang'ich holatga keltirilmagan bo'lsa PartitionError.
+    """
+    with transaction.atomic():
+        counters = {
+            c.key: c.value for c in models.PlatformCounter.objects.select_for_update().order_by('key')
+        }
+        include_tx = partitions.archive_boundary() is None
+        if not include_tx and INITIALIZED_KEY not in counters:
+            raise partitions.PartitionError(
+                'tx.* counters were never initialized and WalletTransaction partitions are archived'
+            )
+        pending = models.PlatformCounterDelta.objects.select_for_update()
+        if not include_tx:
+            pending = pending.exclude(key__startswith=TX_PREFIX)
+        pending = list(pending.values_list('pk', flat=True))
+        stored = _stored_values()
+        actual = {k: Decimal(v) for k, v in compute_from_scratch(include_tx).items()}
+        keys = set(stored) | set(actual) | set(known_keys())
+        if not include_tx:
+            keys = {k for k in keys if not k.startswith(TX_PREFIX)}
+        drift = {
+            k: (stored.get(k), actual.get(k, Decimal('0')))
+            for k in sorted(keys) if stored.get(k) != actual.get(k, Decimal('0'))
+        }
+        if not dry_run and (drift or set(keys) - set(counters)):
+            now = timezone.now()
+            models.PlatformCounter.objects.bulk_create(
+                [models.PlatformCounter(key=k, value=actual.get(k, Decimal('0')), updated_at=now) for k in keys],
+                update_conflicts=True, unique_fields=['key'], update_fields=['value', 'updated_at'],
+            )
+            if pending:
+                models.PlatformCounterDelta.objects.filter(pk__in=pending).delete()
+    return drift
+
+
+def read_all():
+    """{key: Decimal} in one query (journal included); reconciles first if never initialized."""
+    values = _stored_values()
+    if INITIALIZED_KEY not in values:
+        reconcile()
+        values = _stored_values()
+    return values
+
+
+def overview():
+    """Counter section of the director reports overview (same shape as before)."""
+    values = read_all()
+
+    def count(key):
+        return int(values.get(key) or 0)
+
+    def prefixed(prefix, name):
+        return [
+            {name: key[len(prefix):], 'count': int(v)}
+            for key, v in sorted(values.items()) if key.startswith(prefix) and v
+        ]
+
+    return {
+        'users_by_role': prefixed('users.role.', 'role'),
+        'courses': {'total': count('courses.total'), 'active': count('courses.active')},
+        'videos': {'total': count('videos.total'), 'active': count('videos.active')},
+        'channels': {'total': count('channels.total'), 'verified': count('channels.verified')},
+        'wallet': {
+            'total_income': str(values.get('tx.income') or 0),
+            'total_expense': str(values.get('tx.expense') or 0),
+            'transactions_count': count('tx.count'),
+            'by_type': prefixed('tx.type.', 'transaction_type'),
+        },
+    }
@@ -0,0 +1,118 @@
+"""Promokodlarni tekshirish va ishlatish (redemption).
+
+Promokod qoidalari (amal qilish oynasi, kurs / kurs turi allowlistlari,
+chegirma) `PromoRule` ko'rinishida keshda saqlanadi, shuning uchun xarid
+paytida promokod va uning M2M ro'yxatlari qayta o'qilmaydi. `uses`
+keshlanmaydi: limit `claim()` dagi shartli UPDATE
+(`uses + n <= max_uses`) bilan xarid tranzaksiyasi ichida band qilinadi,
+rollback bo'lsa band qilingan ishlatish ham qaytadi.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.utils import timezone
+
+from app import models
+
+
+PROMO_RULE_CACHE_KEY = 'promo:rule:v1:{code}'
+PROMO_RULE_CACHE_TIMEOUT = 5 * 60
+# Mavjud bo'lmagan kodlar ham qisqa muddat keshlanadi (brute-force so'rovlar DB ga bormasin)
+PROMO_MISSING_CACHE_TIMEOUT = 30
+_MISSING = 'missing'
+
+
+class PromoError(ValueError):
+    """Promokod topilmadi, amal qilmaydi yoki limiti tugagan."""
+
+
+class PromoRule:
+    """Promokodning kompilyatsiya qilingan (keshlanadigan) qoidalari."""
+
+    def __init__(self, promo, course_ids, course_type_ids):
+        self.id = promo.id
+        self.code = promo.code
+        self.discount_type = promo.discount_type
+        self.value = promo.value
+        self.max_uses = promo.max_uses
+        self.valid_from = promo.valid_from
+        self.valid_to = promo.valid_to
+        self.is_active = promo.is_active
+        self.course_ids = frozenset(course_ids)
+        self.course_type_ids = frozenset(course_type_ids)
+
+    def is_valid_at(self, now):
+        if not self.is_active:
+            return False
+        if self.valid_from and now < self.valid_from:
+            return False
+        if self.valid_to and now > self.valid_to:
+            return False
+        return True
+
+    def applies_to(self, course, course_type=None):
+        if self.course_ids and course.id not in self.course_ids:
+            return False
+        if course_type is not None and self.course_type_ids and course_type.id not in self.course_type_ids:
+            return False
+        return True
+
+    def discount(self, price):
+        """Chegirma miqdori (0 <= discount <= price)."""
+        if self.discount_type == 'percent':
+            discount = (price * self.value) / Decimal('100')
+        else:  # coins
+            discount = self.value
+        return min(max(discount, Decimal('0')), price)
+
+
+def _compile(code):
+    promo = models.PromoCode.objects.filter(code=code).first()
+    if promo is None:
+        return None
+    return PromoRule(
+        promo,
+        promo.courses.values_list('id', flat=True),
+        promo.course_types.values_list('id', flat=True),
+    )
+
+
+def get_rule(code):
+    """Cached PromoRule for `code`, or None if there is no such code."""
+    key = PROMO_RULE_CACHE_KEY.format(code=code)
+    rule = cache.get(key)
+    if rule is None:
+        rule = _compile(code)
+        cache.set(key, rule or _MISSING, PROMO_RULE_CACHE_TIMEOUT if rule else PROMO_MISSING_CACHE_TIMEOUT)
+    return None if rule == _MISSING else rule
+
+
+def invalidate(code):
+    cache.delete(PROMO_RULE_CACHE_KEY.format(code=code))
+
+
+def validate(code, course, course_type=None):
+    """PromoRule for `code` applicable to the item, else PromoError."""
+    rule = get_rule(code)
+    if rule is None:
+        raise PromoError('Promo code not found')
+    if not rule.is_valid_at(timezone.now()):
+        raise PromoError('Promo code is not valid now')
+    if course_type is not None and rule.course_type_ids and course_type.id not in rule.course_type_ids:
+        raise PromoError('Promo not applicable to this course type')
+    if rule.course_ids and course.id not in rule.course_ids:
+        raise PromoError('Promo not applicable to this course')
+    return rule
+
+
+def claim(rule, n=1):
+    """Atomically use the promo `n` times; PromoError if the limit would be exceeded.
+
+    Call inside the purchase transaction so a rollback releases the claim.
+    """
+    claimed = models.PromoCode.objects.filter(pk=rule.id, is_active=True).filter(
+        Q(max_uses__isnull=True) | Q(uses__lte=F('max_uses') - n)
+    ).update(uses=F('uses') + n)
+    if not claimed:
+        raise PromoError('Promo code usage limit reached')
@@ -0,0 +1,197 @@
+"""Test savollari (question bank) uchun bulk yaratish va import yordamchilari.
+
+Nested serializerlar, import API va `import_test_bank` management komandasi shu
+modulni ishlatadi. Savollar va variantlar har doim ikkita `bulk_create` bilan
+yoziladi, shuning uchun so'rovlar soni savollar soniga bog'liq emas.
+"""
+import csv
+import io
+import json
+import os
+
+from django.db import transaction
+from django.db.models import Max
+
+from app import models
+
+
+# kind -> (test model, question model, option model)
+TEST_KINDS = {
+    'video': (models.VideoTest, models.TestQuestion, models.TestOption),
+    'course_type': (models.CourseTypeTest, models.CourseTypeTestQuestion, models.CourseTypeTestOption),
+}
+
+CSV_CORRECT_SEPARATORS = (';', '|', ',')
+
+
+class QuestionBankError(ValueError):
+    """Import fayli yoki savollar ro'yxati noto'g'ri bo'lsa."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(json.dumps(errors, ensure_ascii=False, default=str))
+
+
+def bulk_create_questions(test, questions_data, question_model, option_model, order_offset=0):
+    """Create questions and their options for `test` with two bulk inserts.
+
+    `questions_data` is a list of validated dicts (serializer format, each with
+    an optional `options` list). The input is not mutated. `order_offset` is
+    added to every question's order; questions without an explicit `order`
+    get their 1-based position, so appended questions land after the existing ones.
+    """
+    questions = []
+    for i, q in enumerate(questions_data, start=1):
+        fields = {k: v for k, v in q.items() if k != 'options'}
+        fields['order'] = fields.get('order', i) + order_offset
+        questions.append(question_model(test=test, **fields))
+    question_model.objects.bulk_create(questions)
+
+    options = [
+        option_model(question=question, **opt)
+        for question, q in zip(questions, questions_data)
+        for opt in q.get('options', [])
+    ]
+    if options:
+        option_model.objects.bulk_create(options)
+    return questions
+
+
+def bulk_replace_options(question, options_data, option_model):
+    """Replace all options of a single question (delete + one bulk insert)."""
+    question.options.all().delete()
+    options = [option_model(question=question, **opt) for opt in options_data]
+    if options:
+        option_model.objects.bulk_create(options)
+    return options
+
+
+# ----------------------------
+# Parsing
+# ----------------------------
+def parse_json(stream):
+    """JSON: `[{...}]` yoki `{"questions": [{...}]}` (nested serializer formati)."""
+    raw = stream.read()
+    if isinstance(raw, bytes):
+        raw = raw.decode('utf-8-sig')
+    try:
+        data = json.loads(raw)
+    except ValueError as e:
+        raise QuestionBankError({'file': f'Invalid JSON: {e}'})
+    if isinstance(data, dict):
+        data = data.get('questions')
+    if not isinstance(data, list):
+        raise QuestionBankError({'file': 'Expected a list of questions or {"questions": [...]}'})
+    return data
+
+
+def parse_csv(stream):
+    """CSV: har bir qator bitta savol.
+
+    Ustunlar: `question`, ixtiyoriy `points`, `correct` (1 dan boshlanadigan
+    variant raqami, bir nechta bo'lsa `;` yoki `|` bilan) va `option...` bilan
+    boshlanadigan variant ustunlari (`option_1`, `option_2`, ...).
+    """
+    raw = stream.read()
+    if isinstance(raw, bytes):
+        raw = raw.decode('utf-8-sig')
+    reader = csv.DictReader(io.StringIO(raw))
+    if not reader.fieldnames or 'question' not in [f.strip().lower() for f in reader.fieldnames]:
+        raise QuestionBankError({'file': 'CSV must have a "question" column'})
+    fieldnames = {f: f.strip().lower() for f in reader.fieldnames}
+    option_cols = [f for f, norm in fieldnames.items() if norm.startswith('option')]
+
+    questions = []
+    errors = {}
+    for idx, row in enumerate(reader):
+        row = {fieldnames.get(k, k): (v or '').strip() for k, v in row.items() if k is not None}
+        if not any(row.values()):
+            continue
+        option_texts = [row[fieldnames[c]] for c in option_cols if row.get(fieldnames[c])]
+        correct_raw = row.get('correct', '')
+        sep = next((s for s in CSV_CORRECT_SEPARATORS if s in correct_raw), None)
+        try:
+            correct = {int(x) for x in (correct_raw.split(sep) if sep else [correct_raw]) if x.strip()}
+        except ValueError:
+            errors[f'row {idx + 2}'] = 'correct must be option number(s), e.g. "2" or "1;3"'
+            continue
+        question = {
+            'text': row.get('question', ''),
+            'order': len(questions) + 1,
+            'options': [
+                {'text': text, 'is_correct': (i + 1) in correct, 'order': i + 1}
+                for i, text in enumerate(option_texts)
+            ],
+        }
+        if row.get('points'):
+            question['points'] = row['points']
+        questions.append(question)
+    if errors:
+        raise QuestionBankError(errors)
+    return questions
+
+
+def load_file(fp, fmt=None, name=None):
+    """Parse an uploaded/opened file. `fmt` is 'json' or 'csv' (else by extension)."""
+    name = name or getattr(fp, 'name', '') or ''
+    fmt = (fmt or os.path.splitext(name)[1].lstrip('.')).lower()
+    if fmt == 'json':
+        return parse_json(fp)
+    if fmt == 'csv':
+        return parse_csv(fp)
+    raise QuestionBankError({'file': 'Unsupported format; use .json or .csv'})
+
+
+# ----------------------------
+# Validation + write
+# ----------------------------
+def validate_questions(kind, raw_questions):
+    """Validate everything in memory; return validated data or raise QuestionBankError."""
+    from app.api import serializers
+
+    serializer_class = {
+        'video': serializers.TestQuestionSerializer,
+        'course_type': serializers.CTTestQuestionSerializer,
+    }[kind]
+    if not isinstance(raw_questions, list) or not raw_questions:
+        raise QuestionBankError({'questions': 'At least one question is required'})
+
+    ser = serializer_class(data=raw_questions, many=True)
+    if not ser.is_valid():
+        errors = {f'question {i + 1}': e for i, e in enumerate(ser.errors) if e}
+        raise QuestionBankError(errors)
+
+    errors = {}
+    for i, q in enumerate(ser.validated_data):
+        options = q.get('options', [])
+        if len(options) < 2:
+            errors[f'question {i + 1}'] = 'At least two options are required'
+        elif not any(o.get('is_correct') for o in options):
+            errors[f'question {i + 1}'] = 'At least one option must be correct'
+    if errors:
+        raise QuestionBankError(errors)
+    return ser.validated_data
+
+
+def import_questions(kind, test, raw_questions, replace=False):
+    """Validate `raw_questions` and write them to `test` in one transaction.
+
+    replace=True bo'lsa testdagi mavjud savollar o'chiriladi, aks holda yangi
+    savollar mavjudlarining oxiriga qo'shiladi.
+    """
+    _, question_model, option_model = TEST_KINDS[kind]
+    questions_data = validate_questions(kind, raw_questions)
+
+    with transaction.atomic():
+        order_offset = 0
+        if replace:
+            test.questions.all().delete()
+        else:
+            order_offset = test.questions.aggregate(m=Max('order'))['m'] or 0
+        created = bulk_create_questions(test, questions_data, question_model, option_model, order_offset=order_offset)
+    return {
+        'test_id': test.id,
+        'questions_created': len(created),
+        'options_created': sum(len(q.get('options', [])) for q in questions_data),
+        'replaced': bool(replace),
+    }
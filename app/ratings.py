@@ -0,0 +1,135 @@
+"""Baholanadigan obyektlarning saqlangan reytingi (RatingAggregate).
+
+Movie, Channel, Reel, Playlist va CourseVideo uchun rating_sum /
+rating_count rating saqlash va o'chirishda (signal) F() bilan o'zgaradi,
+qayta baholashda faqat qiymatlar farqi qo'shiladi; rating_avg shu
+tranzaksiya ichida yangi yig'indidan hisoblanadi. Serializerlar va
+"top rated" tartiblash shu ustunlarni o'qiydi.
+
+`verify()` / `rebuild()` va `rating_stats` komandasi drift ni tuzatadi.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from app import models
+
+
+RATING_MODELS = (
+    models.MovieRating, models.ChannelRating, models.ReelRating,
+    models.PlaylistRating, models.CourseVideoRating,
+)
+AGGREGATE_FIELDS = ('rating_sum', 'rating_count', 'rating_avg')
+
+
+def average(total, count):
+    if not count:
+        return Decimal('0.0')
+    return (Decimal(total) / Decimal(count)).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
+
+
+def target_model(rating_model):
+    return rating_model._meta.get_field(rating_model.target_field).related_model
+
+
+def apply(model, pk, rating_sum=0, ratings=0, **fields):
+    """F() deltas for rating_sum/rating_count (and extra `fields`) of one row, then rating_avg.
+
+    rating_avg Python da verify() bilan bir xil yaxlitlanadi: UPDATE qatorni
+    tranzaksiya oxirigacha qulflaydi, qayta o'qish parallel yozuvni ko'rmaydi.
+    """
+    if pk is None:
+        return
+    rows = model.objects.filter(pk=pk)
+    if not (rating_sum or ratings):
+        if fields:
+            rows.update(**fields)
+        return
+    with transaction.atomic():
+        rows.update(rating_sum=F('rating_sum') + rating_sum, rating_count=F('rating_count') + ratings, **fields)
+        row = rows.values('rating_sum', 'rating_count').first()
+        if row is not None:
+            rows.update(rating_avg=average(row['rating_sum'], row['rating_count']))
+
+
+# ----------------------------
+# Signals
+# ----------------------------
+def _target_id_field(sender):
+    return f'{sender.target_field}_id'
+
+
+def remember_rating(sender, instance, raw=False, **kwargs):
+    instance._ratings_old = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    # RatingBase.save tranzaksiyasi ichida: qayta baholash parallel ikki marta hisoblanmaydi
+    instance._ratings_old = (
+        sender.objects.select_for_update().filter(pk=instance.pk)
+        .values(_target_id_field(sender), 'value').first()
+    )
+
+
+def rating_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    model, id_field = target_model(sender), _target_id_field(sender)
+    target_id = getattr(instance, id_field)
+    old = getattr(instance, '_ratings_old', None)
+    if created or old is None:
+        if created:
+            apply(model, target_id, rating_sum=instance.value, ratings=1)
+        return
+    if old[id_field] != target_id:
+        apply(model, old[id_field], rating_sum=-old['value'], ratings=-1)
+        apply(model, target_id, rating_sum=instance.value, ratings=1)
+    elif old['value'] != instance.value:
+        apply(model, target_id, rating_sum=instance.value - old['value'])
+
+
+def rating_deleted(sender, instance, **kwargs):
+    apply(target_model(sender), getattr(instance, _target_id_field(sender)), rating_sum=-instance.value, ratings=-1)
+
+
+# ----------------------------
+# Verify / rebuild
+# ----------------------------
+def compute(rating_model):
+    """{object_id: {field: value}} for every target object (one grouped query)."""
+    model, id_field = target_model(rating_model), _target_id_field(rating_model)
+    result = {pk: {'rating_sum': 0, 'rating_count': 0} for pk in model.objects.values_list('pk', flat=True)}
+    rows = rating_model.objects.values(id_field).annotate(s=Sum('value'), n=Count('id')).order_by()
+    for row in rows:
+        if row[id_field] in result:
+            result[row[id_field]].update(rating_sum=row['s'] or 0, rating_count=row['n'])
+    for values in result.values():
+        values['rating_avg'] = average(values['rating_sum'], values['rating_count'])
+    return result
+
+
+def verify(rating_model):
+    """[(object_id, field, stored, expected)] for drifted columns."""
+    expected = compute(rating_model)
+    stored = target_model(rating_model).objects.values('pk', *AGGREGATE_FIELDS).order_by('pk')
+    drift = []
+    for row in stored:
+        for field in AGGREGATE_FIELDS:
+            if row['pk'] in expected and row[field] != expected[row['pk']][field]:
+                drift.append((row['pk'], field, row[field], expected[row['pk']][field]))
+    return drift
+
+
+def rebuild(rating_models=RATING_MODELS, dry_run=False):
+    """{model label: drift list}; drifted rows are rewritten unless `dry_run`."""
+    result = {}
+    for rating_model in rating_models:
+        model = target_model(rating_model)
+        with transaction.atomic():
+            drift = verify(rating_model)
+            if drift and not dry_run:
+                expected = compute(rating_model)
+                objs = [model(pk=pk, **expected[pk]) for pk in sorted({d[0] for d in drift})]
+                model.objects.bulk_update(objs, list(AGGREGATE_FIELDS), batch_size=500)
+        result[model._meta.label] = drift
+    return result
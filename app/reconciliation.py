@@ -0,0 +1,155 @@
+"""Hamyon balanslarini ledger bilan solishtirish (checkpoint asosida).
+
+Har bir hamyon uchun oxirgi `WalletCheckpoint` dan keyingi tranzaksiyalar
+yig'indisi qo'shiladi va `Wallet.balance` bilan solishtiriladi. Bitta chunk
+(wallet id oralig'i) bitta SQL so'rov bilan tekshiriladi, shuning uchun
+balans va ledger yig'indisi bir xil snapshotdan o'qiladi. Farq bo'lmagan
+hamyonlar uchun yangi checkpoint yoziladi (har hamyonda faqat oxirgi
+KEEP_CHECKPOINTS tasi qoladi); farq bo'lsa checkpoint yozilmaydi (keyingi
+tekshiruv ham uni ko'radi). Checkpoint running
+totallarni (Wallet.STATS_FIELDS) ham o'z ichiga oladi, shuning uchun eski
+partitionlar arxivlangandan keyin ham `Wallet.compute_stats` to'g'ri.
+"""
+import logging
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, IntegerField, Max, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from app import models
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+# Har bir hamyon uchun saqlanadigan checkpointlar soni (eng oxirgisi tekshiruv,
+# compute_stats va arxivlash uchun yetadi, qolganlari - tarix uchun)
+KEEP_CHECKPOINTS = 3
+ZERO = Value(Decimal('0.00'), output_field=DecimalField(max_digits=15, decimal_places=2))
+
+
+def _after_checkpoint(aggregate):
+    rows = (
+        models.WalletTransaction.objects
+        .filter(wallet=OuterRef('pk'), id__gt=OuterRef('cp_last_id'))
+        .order_by().values('wallet').annotate(v=aggregate).values('v')[:1]
+    )
+    return Subquery(rows)
+
+
+# Checkpoint dagi running totallar va ulardan keyingi ledger qatorlari uchun agregatlar
+STATS_AFTER_CHECKPOINT = {
+    'total_income': Sum('amount', filter=Q(amount__gt=0)),
+    'total_expense': Sum('amount', filter=Q(amount__lt=0)),
+    'transactions_count': Count('id'),
+    'courses_purchased': Count('id', filter=Q(transaction_type='course_purchase')),
+    'courses_sold': Count('id', filter=Q(transaction_type='course_earning')),
+}
+
+
+def _zero(field):
+    if isinstance(models.WalletCheckpoint._meta.get_field(field), DecimalField):
+        return ZERO
+    return Value(0, output_field=IntegerField())
+
+
+def verify_range(first_id, last_id, full=False, write_checkpoints=True):
+    """Verify wallets with first_id <= id <= last_id in one query.
+
+    full=True ignores checkpoints and sums the whole history. Only
+    checkpoints that carry running totals are used as the starting point,
+    so every new checkpoint can carry them forward. Returns
+    {'wallets': n, 'checkpoints': n, 'drift': [{wallet_id, balance, ledger_balance, diff}]}.
+    """
+    wallets = models.Wallet.objects.filter(pk__gte=first_id, pk__lte=last_id).order_by('pk')
+    if full:
+        wallets = wallets.annotate(cp_balance=ZERO, cp_last_id=Value(0, output_field=IntegerField()))
+        wallets = wallets.annotate(**{f'cp_{field}': _zero(field) for field in models.WalletCheckpoint.STATS_FIELDS})
+    else:
+        latest = (
+            models.WalletCheckpoint.objects.filter(wallet=OuterRef('pk'), transactions_count__isnull=False)
+            .order_by('-last_transaction_id')
+        )
+        wallets = wallets.annotate(
+            cp_balance=Coalesce(Subquery(latest.values('balance')[:1]), ZERO),
+            cp_last_id=Coalesce(Subquery(latest.values('last_transaction_id')[:1]), 0),
+            **{
+                f'cp_{field}': Coalesce(Subquery(latest.values(field)[:1]), _zero(field))
+                for field in models.WalletCheckpoint.STATS_FIELDS
+            },
+        )
+    stats = {f'tx_{field}': _after_checkpoint(aggregate) for field, aggregate in STATS_AFTER_CHECKPOINT.items()}
+    rows = wallets.annotate(
+        delta=Coalesce(_after_checkpoint(Sum('amount')), ZERO),
+        tx_last_id=_after_checkpoint(Max('id')),
+        tx_last_at=_after_checkpoint(Max('created_at')),
+        **stats,
+    ).values('pk', 'balance', 'cp_balance', 'delta', 'tx_last_id', 'tx_last_at', *stats, *(
+        f'cp_{field}' for field in models.WalletCheckpoint.STATS_FIELDS
+    ))
+
+    drift, checkpoints, n = [], [], 0
+    for row in rows:
+        n += 1
+        ledger_balance = row['cp_balance'] + row['delta']
+        if row['balance'] != ledger_balance:
+            drift.append({
+                'wallet_id': row['pk'],
+                'balance': row['balance'],
+                'ledger_balance': ledger_balance,
+                'diff': row['balance'] - ledger_balance,
+            })
+        elif row['tx_transactions_count']:
+            totals = {
+                field: row[f'cp_{field}'] + abs(row[f'tx_{field}'] or 0)
+                for field in models.WalletCheckpoint.STATS_FIELDS
+            }
+            checkpoints.append(models.WalletCheckpoint(
+                wallet_id=row['pk'],
+                balance=ledger_balance,
+                last_transaction_id=row['tx_last_id'],
+                last_transaction_at=row['tx_last_at'],
+                **totals,
+            ))
+    if write_checkpoints and checkpoints:
+        models.WalletCheckpoint.objects.bulk_create(checkpoints, batch_size=DEFAULT_CHUNK_SIZE)
+        prune_checkpoints([cp.wallet_id for cp in checkpoints])
+    return {'wallets': n, 'checkpoints': len(checkpoints) if write_checkpoints else 0, 'drift': drift}
+
+
+def prune_checkpoints(wallet_ids, keep=KEEP_CHECKPOINTS):
+    """Delete all but the latest `keep` checkpoints of `wallet_ids` (one DELETE); returns rows deleted."""
+    kept_last = (
+        models.WalletCheckpoint.objects.filter(wallet=OuterRef('wallet'))
+        .order_by('-last_transaction_id').values('last_transaction_id')[keep - 1:keep]
+    )
+    deleted, _ = (
+        models.WalletCheckpoint.objects
+        .filter(wallet_id__in=wallet_ids, last_transaction_id__lt=Subquery(kept_last))
+        .delete()
+    )
+    return deleted
+
+
+def chunk_ranges(chunk_size=DEFAULT_CHUNK_SIZE):
+    """(first_id, last_id) ranges covering every wallet id."""
+    bounds = models.Wallet.objects.aggregate(lo=Min('pk'), hi=Max('pk'))
+    if bounds['lo'] is None:
+        return []
+    return [
+        (start, min(start + chunk_size - 1, bounds['hi']))
+        for start in range(bounds['lo'], bounds['hi'] + 1, chunk_size)
+    ]
+
+
+def verify_all(chunk_size=DEFAULT_CHUNK_SIZE, **kwargs):
+    """Sequential audit of every wallet (used by the Celery beat task)."""
+    total = {'wallets': 0, 'checkpoints': 0, 'drift': []}
+    for first_id, last_id in chunk_ranges(chunk_size):
+        result = verify_range(first_id, last_id, **kwargs)
+        total['wallets'] += result['wallets']
+        total['checkpoints'] += result['checkpoints']
+        total['drift'] += result['drift']
+    for d in total['drift']:
+        logger.error('Wallet %s balance drift: balance=%s ledger=%s', d['wallet_id'], d['balance'], d['ledger_balance'])
+    return total
@@ -0,0 +1,256 @@
+"""Kunlik per-course rollup (CourseDailyStat) hisoblash va o'qish.
+
+Yozish: `run_rollup()` (Celery beat) high-water mark (`RollupState`) dan
+kechagi kungacha yopilgan kunlarni qayta hisoblaydi; `rollup_range()`
+backfill uchun. O'qish: `daily_series()` rollup qatorlarini oladi va hali
+rollup qilinmagan kunlarni (odatda faqat bugun) live hisoblab qo'shadi.
+
+Barcha manbalar o'zgarmas vaqt bo'yicha kunlarga bo'linadi, shuning uchun
+qayta hisoblash (backfill) inkremental natijani aynan takrorlaydi.
+progress_events / active_learners CourseVideoProgress.updated_at dan emas
+(qator joyida yangilanadi), CourseVideoProgressDay jurnalidan olinadi:
+progress_events - shu kuni seconds_watched / completed o'zgargan
+(learner, video) juftliklari.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum, Q, F, Min, Case, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from app import models, partitions
+
+
+ROLLUP_NAME = 'course_daily'
+# Kechikib keladigan o'zgarishlar (masalan, topshiriqni keyinroq baholash) uchun
+# har safar oxirgi bir necha kun qayta hisoblanadi.
+ROLLUP_LOOKBACK_DAYS = 2
+# Backfill paytida bitta tranzaksiyada qayta ishlanadigan kunlar soni.
+ROLLUP_CHUNK_DAYS = 31
+
+METRIC_FIELDS = (
+    'progress_events', 'active_learners',
+    'video_test_attempts', 'video_test_passed',
+    'ct_test_attempts', 'ct_test_passed',
+    'video_submissions', 'video_submissions_graded', 'ct_submissions',
+    'purchases', 'buyers', 'revenue',
+)
+
+
+def day_start(day):
+    """Aware datetime for 00:00 of `day` in the current timezone."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _grouped(qs, course_expr, time_field, start, end, **aggregates):
+    if start is not None:
+        qs = qs.filter(**{f'{time_field}__gte': start})
+    if end is not None:
+        qs = qs.filter(**{f'{time_field}__lt': end})
+    return (
+        qs.annotate(cid=course_expr, day=TruncDate(time_field))
+        .values('cid', 'day')
+        .annotate(**aggregates)
+        .order_by()
+    )
+
+
+def compute_stats(start=None, end=None, course_ids=None):
+    """Live per-(course, day) metrics for [start, end); seven grouped queries.
+
+    Returns {(course_id, day): {metric: value}}.
+    """
+    def scoped(qs, course_path):
+        if course_ids is not None:
+            qs = qs.filter(**{f'{course_path}__in': course_ids})
+        return qs
+
+    progress_days = scoped(models.CourseVideoProgressDay.objects.all(), 'course_video__course_id')
+    if start is not None:
+        progress_days = progress_days.filter(day__gte=timezone.localdate(start))
+    if end is not None:
+        progress_days = progress_days.filter(day__lt=timezone.localdate(end))
+    sources = [
+        progress_days.annotate(cid=F('course_video__course_id')).values('cid', 'day').annotate(
+            progress_events=Count('id'), active_learners=Count('user', distinct=True),
+        ).order_by(),
+        _grouped(
+            scoped(models.TestResult.objects.all(), 'test__course_video__course_id'),
+            F('test__course_video__course_id'), 'completed_at', start, end,
+            video_test_attempts=Count('id'),
+            video_test_passed=Count('id', filter=Q(score__gte=F('test__pass_score'))),
+        ),
+        _grouped(
+            scoped(models.CourseTypeTestResult.objects.all(), 'test__course_type__course_id'),
+            F('test__course_type__course_id'), 'completed_at', start, end,
+            ct_test_attempts=Count('id'),
+            ct_test_passed=Count('id', filter=Q(score__gte=F('test__pass_score'))),
+        ),
+        _grouped(
+            scoped(models.AssignmentSubmission.objects.all(), 'assignment__course_video__course_id'),
+            F('assignment__course_video__course_id'), 'submitted_at', start, end,
+            video_submissions=Count('id'),
+            video_submissions_graded=Count('id', filter=Q(grade__isnull=False)),
+        ),
+        _grouped(
+            scoped(models.CourseTypeAssignmentSubmission.objects.all(), 'assignment__course_type__course_id'),
+            F('assignment__course_type__course_id'), 'submitted_at', start, end,
+            ct_submissions=Count('id'),
+        ),
+    ]
+
+    # Xaridlar: course_purchase -> course, course_type_purchase -> course_type.course
+    purchase_filter = Q(transaction_type='course_purchase') | Q(transaction_type='course_type_purchase')
+    earning_filter = (
+        Q(transaction_type='course_earning', wallet__user=F('course__channel__user')) |
+        Q(transaction_type='course_type_earning', wallet__user=F('course_type__course__channel__user'))
+    )
+    if course_ids is not None:
+        purchase_filter &= (
+            Q(transaction_type='course_purchase', course_id__in=course_ids) |
+            Q(transaction_type='course_type_purchase', course_type__course_id__in=course_ids)
+        )
+        earning_filter &= (
+            Q(transaction_type='course_earning', course_id__in=course_ids) |
+            Q(transaction_type='course_type_earning', course_type__course_id__in=course_ids)
+        )
+    tx_course = Case(
+        When(transaction_type__in=['course_purchase', 'course_earning'], then=F('course_id')),
+        default=F('course_type__course_id'),
+    )
+    sources += [
+        _grouped(
+            models.WalletTransaction.objects.filter(purchase_filter), tx_course, 'created_at', start, end,
+            purchases=Count('id', distinct=True), buyers=Count('wallet__user', distinct=True),
+        ),
+        _grouped(
+            models.WalletTransaction.objects.filter(earning_filter), tx_course, 'created_at', start, end,
+            revenue=Sum('amount'),
+        ),
+    ]
+
+    stats = {}
+    for qs in sources:
+        for row in qs:
+            if row['cid'] is None or row['day'] is None:
+                continue
+            bucket = stats.setdefault((row.pop('cid'), row.pop('day')), {})
+            bucket.update({k: v for k, v in row.items() if v is not None})
+    return stats
+
+
+def progress_saved(sender, instance, created, raw=False, **kwargs):
+    """post_save (CourseVideoProgress): progress o'zgargan kunni jurnalga yozish (bitta INSERT).
+
+    seconds_watched / completed o'zgarmagan saqlashlar (pozitsiya heartbeatlari)
+    hech narsa yozmaydi; eski qiymatlar DB dan yuklanganda olinadi (`from_db`).
+    """
+    current = (instance.seconds_watched, instance.completed)
+    if created:
+        changed = bool(instance.seconds_watched or instance.completed)
+    else:
+        changed = getattr(instance, '_loaded_progress', None) != current
+    instance._loaded_progress = current
+    if raw or not changed:
+        return
+    models.CourseVideoProgressDay.objects.bulk_create(
+        [models.CourseVideoProgressDay(
+            user_id=instance.user_id, course_video_id=instance.course_video_id,
+            day=timezone.localdate(instance.updated_at),
+        )],
+        ignore_conflicts=True,
+    )
+
+
+def rollup_range(first_day, last_day, course_ids=None):
+    """Recompute and store CourseDailyStat rows for first_day..last_day (inclusive).
+
+    Arxivlangan oylar uchun xarid / daromad yo'qolib qolardi: PartitionError.
+    """
+    partitions.require_live(day_start(first_day), 'rollup_range')
+    written = 0
+    chunk_start = first_day
+    while chunk_start <= last_day:
+        chunk_end = min(chunk_start + timedelta(days=ROLLUP_CHUNK_DAYS - 1), last_day)
+        stats = compute_stats(day_start(chunk_start), day_start(chunk_end + timedelta(days=1)), course_ids)
+        rows = [
+            models.CourseDailyStat(course_id=cid, day=day, **values)
+            for (cid, day), values in stats.items()
+        ]
+        with transaction.atomic():
+            existing = models.CourseDailyStat.objects.filter(day__gte=chunk_start, day__lte=chunk_end)
+            if course_ids is not None:
+                existing = existing.filter(course_id__in=course_ids)
+            existing.delete()
+            models.CourseDailyStat.objects.bulk_create(rows, batch_size=1000)
+        written += len(rows)
+        chunk_start = chunk_end + timedelta(days=1)
+    return written
+
+
+def run_rollup(lookback_days=ROLLUP_LOOKBACK_DAYS):
+    """Incremental rollup from the high-water mark up to yesterday."""
+    yesterday = timezone.localdate() - timedelta(days=1)
+    state, _ = models.RollupState.objects.get_or_create(name=ROLLUP_NAME)
+    if state.rolled_up_to is None:
+        # Birinchi ishga tushirish: eng birinchi kurs yaratilgan kundan boshlab to'liq backfill
+        first = models.Course.objects.aggregate(m=Min('created_at'))['m']
+        if first is None:
+            return {'first_day': None, 'last_day': yesterday, 'rows': 0}
+        first_day = timezone.localdate(first)
+    else:
+        first_day = state.rolled_up_to + timedelta(days=1) - timedelta(days=lookback_days)
+
+    rows = 0
+    if first_day <= yesterday:
+        rows = rollup_range(first_day, yesterday)
+    state.rolled_up_to = yesterday
+    state.save(update_fields=['rolled_up_to', 'updated_at'])
+    return {'first_day': first_day, 'last_day': yesterday, 'rows': rows}
+
+
+def _empty_metrics():
+    return {f: (Decimal('0.00') if f == 'revenue' else 0) for f in METRIC_FIELDS}
+
+
+def daily_series(course_ids, since_day=None):
+    """Per-day metrics summed over `course_ids`, oldest first.
+
+    Days up to the high-water mark come from CourseDailyStat; later days
+    (normally only today) are computed live. Without a high-water mark the
+    whole range is computed live.
+    """
+    course_ids = list(course_ids)
+    hwm = (
+        models.RollupState.objects.filter(name=ROLLUP_NAME)
+        .values_list('rolled_up_to', flat=True).first()
+    )
+    by_day = {}
+    if hwm is not None:
+        stored = models.CourseDailyStat.objects.filter(course_id__in=course_ids, day__lte=hwm)
+        if since_day is not None:
+            stored = stored.filter(day__gte=since_day)
+        for row in stored.values('day').annotate(**{f: Sum(f) for f in METRIC_FIELDS}).order_by('day'):
+            day = row.pop('day')
+            by_day[day] = row
+
+    live_from = since_day
+    if hwm is not None:
+        live_from = hwm + timedelta(days=1) if since_day is None else max(since_day, hwm + timedelta(days=1))
+    live = compute_stats(day_start(live_from) if live_from else None, None, course_ids)
+    for (_, day), values in live.items():
+        bucket = by_day.setdefault(day, _empty_metrics())
+        for k, v in values.items():
+            bucket[k] = (bucket.get(k) or 0) + v
+
+    return [dict(_empty_metrics(), **{k: v for k, v in by_day[d].items() if v is not None}, day=d) for d in sorted(by_day)]
+
+
+def series_totals(series):
+    totals = _empty_metrics()
+    for row in series:
+        for f in METRIC_FIELDS:
+            totals[f] += row[f]
+    return totals
@@ -0,0 +1,117 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+
+from app import comment_tree, course_stats, entitlements, models, platform_counters, ratings, rollups
+
+
+# Teacher dashboard snapshotlarini eskirtiradigan modellar -> kanal egasigacha yo'l.
+# O'chirishlar soatlik beat yangilashida hisobga olinadi.
+DASHBOARD_EVENT_OWNER_PATHS = {
+    models.TestResult: 'test__course_video__course__channel__user_id',
+    models.CourseTypeTestResult: 'test__course_type__course__channel__user_id',
+    models.AssignmentSubmission: 'assignment__course_video__course__channel__user_id',
+    models.CourseTypeAssignmentSubmission: 'assignment__course_type__course__channel__user_id',
+    models.VideoTest: 'course_video__course__channel__user_id',
+    models.CourseTypeTest: 'course_type__course__channel__user_id',
+    models.VideoAssignment: 'course_video__course__channel__user_id',
+    models.CourseTypeAssignment: 'course_type__course__channel__user_id',
+}
+
+
+def refresh_teacher_dashboard_on_event(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from app.api_teacher import dashboard
+
+    # Egani topish va navbatga qo'yish commit dan keyin; xato yozuvni yiqitmaydi
+    dashboard.schedule_refresh_for(sender, instance.pk, DASHBOARD_EVENT_OWNER_PATHS[sender])
+
+
+for _model in DASHBOARD_EVENT_OWNER_PATHS:
+    post_save.connect(
+        refresh_teacher_dashboard_on_event, sender=_model,
+        dispatch_uid=f'dashboard_refresh_{_model.__name__}',
+    )
+
+
+# Platforma hisoblagichlari (director reports) yozish tranzaksiyasi ichida yangilanadi.
+for _model in platform_counters.TRACKED_FIELDS:
+    _uid = f'platform_counters_{_model.__name__}'
+    pre_save.connect(platform_counters.remember_old_values, sender=_model, dispatch_uid=_uid)
+    post_save.connect(platform_counters.update_on_save, sender=_model, dispatch_uid=_uid)
+    post_delete.connect(platform_counters.update_on_delete, sender=_model, dispatch_uid=_uid)
+
+
+# Keshlangan promokod qoidalari (app.promos) o'zgarganda eskirtiriladi.
+PROMO_M2M_FIELDS = {
+    models.PromoCode.courses.through: 'courses',
+    models.PromoCode.course_types.through: 'course_types',
+}
+
+
+def remember_promo_code(sender, instance, raw=False, **kwargs):
+    # kod o'zgartirilsa eski kalit ham o'chiriladi
+    instance._promo_old_code = None
+    if not raw and not instance._state.adding and instance.pk is not None:
+        instance._promo_old_code = sender.objects.filter(pk=instance.pk).values_list('code', flat=True).first()
+
+
+def invalidate_promo_rule(sender, instance, action=None, pk_set=None, **kwargs):
+    from app import promos
+
+    if isinstance(instance, models.PromoCode):
+        promos.invalidate(instance.code)
+        old_code = getattr(instance, '_promo_old_code', None)
+        if old_code and old_code != instance.code:
+            promos.invalidate(old_code)
+        return
+    # m2m_changed reverse tomondan (course.promocode_set): clear da pk_set=None,
+    # shuning uchun bog'lanishlar o'chishidan oldin (pre_clear) o'qiladi
+    if action == 'pre_clear':
+        codes = models.PromoCode.objects.filter(**{PROMO_M2M_FIELDS[sender]: instance})
+    elif pk_set:
+        codes = models.PromoCode.objects.filter(pk__in=pk_set)
+    else:
+        return
+    for code in codes.values_list('code', flat=True):
+        promos.invalidate(code)
+
+
+pre_save.connect(remember_promo_code, sender=models.PromoCode, dispatch_uid='promo_rule_save')
+post_save.connect(invalidate_promo_rule, sender=models.PromoCode, dispatch_uid='promo_rule_save')
+post_delete.connect(invalidate_promo_rule, sender=models.PromoCode, dispatch_uid='promo_rule_delete')
+m2m_changed.connect(invalidate_promo_rule, sender=models.PromoCode.courses.through, dispatch_uid='promo_rule_courses')
+m2m_changed.connect(invalidate_promo_rule, sender=models.PromoCode.course_types.through, dispatch_uid='promo_rule_course_types')
+
+
+# ledger.post dan tashqarida (admin) yaratilgan/o'chirilgan xaridlar uchun huquqlar.
+# pre_delete: post_delete gacha Django purchase_transaction ni SET_NULL qilib bo'ladi.
+post_save.connect(entitlements.grant_on_save, sender=models.WalletTransaction, dispatch_uid='entitlement_grant')
+pre_delete.connect(entitlements.revoke_on_delete, sender=models.WalletTransaction, dispatch_uid='entitlement_revoke')
+
+
+# Course kartochkasi agregatlari (app.course_stats): darslar, davomiylik, baholar.
+pre_save.connect(course_stats.remember_video, sender=models.CourseVideo, dispatch_uid='course_stats_video')
+post_save.connect(course_stats.video_saved, sender=models.CourseVideo, dispatch_uid='course_stats_video')
+post_delete.connect(course_stats.video_deleted, sender=models.CourseVideo, dispatch_uid='course_stats_video')
+post_save.connect(course_stats.rating_saved, sender=models.CourseVideoRating, dispatch_uid='course_stats_rating')
+post_delete.connect(course_stats.rating_deleted, sender=models.CourseVideoRating, dispatch_uid='course_stats_rating')
+
+
+# Saqlangan reytinglar (app.ratings): Movie, Channel, Reel, Playlist, CourseVideo.
+# CourseVideoRating uchun course_stats.rating_saved shu yerda o'qilgan eski qiymatdan foydalanadi.
+for _model in ratings.RATING_MODELS:
+    _uid = f'ratings_{_model.__name__}'
+    pre_save.connect(ratings.remember_rating, sender=_model, dispatch_uid=_uid)
+    post_save.connect(ratings.rating_saved, sender=_model, dispatch_uid=_uid)
+    post_delete.connect(ratings.rating_deleted, sender=_model, dispatch_uid=_uid)
+
+
+# Izohlar daraxti (app.comment_tree): path, root_id, depth va javoblar hisoblagichlari.
+for _model in comment_tree.COMMENT_MODELS:
+    _uid = f'comment_tree_{_model.__name__}'
+    post_save.connect(comment_tree.comment_created, sender=_model, dispatch_uid=_uid)
+    post_delete.connect(comment_tree.comment_deleted, sender=_model, dispatch_uid=_uid)
+
+
+# Kunlik rollup uchun progress kunlari jurnali (app.rollups).
+post_save.connect(rollups.progress_saved, sender=models.CourseVideoProgress, dispatch_uid='rollups_progress_day')
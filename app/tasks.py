@@ -269,3 +269,93 @@ def process_course_video_task(self, course_video_id, input_path):
                 pass
     except Exception as e:
         redis_client.set(f"progress:course_video:{course_video_id}", f"error: {str(e)}")
+
+
+# =============================
+# Analytics rollups
+# =============================
+@shared_task
+def rollup_course_daily_stats():
+    """Celery beat: CourseDailyStat ni high-water mark dan kechagi kungacha to'ldirish."""
+    from app import rollups
+
+    result = rollups.run_rollup()
+    return {k: str(v) for k, v in result.items()}
+
+
+@shared_task
+def backfill_course_daily_stats(first_day, last_day, course_ids=None):
+    """Berilgan oraliq (ISO sanalar) uchun rollupni qayta hisoblash."""
+    from datetime import date
+    from app import rollups
+
+    return rollups.rollup_range(date.fromisoformat(first_day), date.fromisoformat(last_day), course_ids)
+
+
+@shared_task
+def refresh_teacher_dashboard_task(user_id):
+    """Bitta teacher uchun barcha dashboard snapshotlarini qayta hisoblash."""
+    from .models import User
+    from .api_teacher import dashboard
+
+    user = User.objects.filter(id=user_id).first()
+    if user is not None:
+        dashboard.refresh_teacher(user)
+
+
+@shared_task
+def refresh_all_teacher_dashboards():
+    """Celery beat: kanali bor har bir teacher uchun snapshot yangilashni navbatga qo'yish."""
+    from .models import Channel
+
+    user_ids = list(Channel.objects.values_list('user_id', flat=True).distinct())
+    for user_id in user_ids:
+        refresh_teacher_dashboard_task.delay(user_id)
+    return len(user_ids)
+
+
+# =============================
+# Platform commission
+# =============================
+@shared_task
+def settle_platform_commissions():
+    """Celery beat: PendingCommission jurnalini platforma hamyoniga partiyalab o'tkazish."""
+    from .models import PendingCommission
+
+    rows, amount = PendingCommission.settle_all()
+    return {'rows': rows, 'amount': str(amount)}
+
+
+@shared_task
+def fold_platform_counters():
+    """Celery beat: PlatformCounterDelta jurnalini PlatformCounter ga yig'ish."""
+    from app import platform_counters
+
+    return {'rows': platform_counters.fold()}
+
+
+@shared_task
+def fold_course_students():
+    """Celery beat: CourseStudentDelta jurnalini Course.students_count ga yig'ish."""
+    from app import course_stats
+
+    return {'rows': course_stats.fold_students()}
+
+
+@shared_task
+def reconcile_wallet_balances():
+    """Celery beat: hamyon balanslarini ledger bilan solishtirish va checkpoint yozish."""
+    from app import reconciliation
+
+    result = reconciliation.verify_all()
+    return {'wallets': result['wallets'], 'checkpoints': result['checkpoints'], 'drift': len(result['drift'])}
+
+
+@shared_task
+def ensure_wallet_partitions():
+    """Celery beat: WalletTransaction uchun kelgusi oylar partitionlarini oldindan yaratish."""
+    from app import partitions
+
+    if not partitions.is_partitioned():
+        return {'created': []}
+    return {'created': partitions.ensure_ahead()}
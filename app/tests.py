@@ -1,3 +1,959 @@
-from django.test import TestCase
+import io
+import json
+import threading
+import unittest
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from app import checkout, comment_tree, course_stats, entitlements, ledger, models, partitions, platform_counters, promos, question_bank, ratings, rollups
+from app.api import wallet_views
+from app.api_teacher import dashboard
+
+
+THREADS = 8
+# promokod qoidalari keshlanadi: testlar Redis ga bog'liq bo'lmasin
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_user(role='student'):
+    return models.User.objects.create_user(username=f'{role}_{uuid.uuid4().hex[:8]}', password='x', role=role)
+
+
+def make_course(teacher=None, price=100, purchase_scope='course', type_price=50):
+    """(course, course_type) sold by `teacher`'s channel."""
+    teacher = teacher or make_user('teacher')
+    slug = uuid.uuid4().hex[:8]
+    channel = models.Channel.objects.filter(user=teacher).first() or models.Channel.objects.create(
+        user=teacher, title='Channel', slug=f'ch-{slug}',
+    )
+    course = models.Course.objects.create(
+        title='Course', slug=f'c-{slug}', channel=channel, price=price, is_free=False, purchase_scope=purchase_scope,
+    )
+    course_type = models.CourseType.objects.create(
+        name='Type', slug=f'ct-{slug}', created_by=channel, course=course, price=type_price,
+    )
+    return course, course_type
+
+
+def fund(user, amount):
+    wallet, _ = models.Wallet.objects.get_or_create(user=user)
+    ledger.post([models.WalletTransaction(wallet=wallet, transaction_type='deposit', amount=Decimal(amount))])
+    wallet.refresh_from_db()
+    return wallet
+
+
+def run_concurrently(func, count=THREADS):
+    """Run `func(i)` in `count` threads started together; returns results (or exceptions)."""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(i):
+        try:
+            barrier.wait()
+            results[i] = func(i)
+        except Exception as exc:  # natija sifatida qaytadi, test tekshiradi
+            results[i] = exc
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.buyer = fund(make_user(), 100)
+        self.seller, _ = models.Wallet.objects.get_or_create(user=make_user('teacher'))
+        self.course, _ = make_course(self.seller.user)
+
+    def tx(self, wallet, kind, amount, **fields):
+        return models.WalletTransaction(wallet=wallet, transaction_type=kind, amount=Decimal(amount), **fields)
+
+    def test_balances_and_running_totals(self):
+        entries = ledger.post([
+            self.tx(self.buyer, 'course_purchase', '-60', course=self.course),
+            self.tx(self.seller, 'course_earning', '57', course=self.course),
+            self.tx(self.buyer, 'bonus', '5'),
+        ])
+
+        self.assertEqual([e.balance_after for e in entries], [Decimal('40'), Decimal('57'), Decimal('45')])
+        self.assertEqual(self.buyer.balance, Decimal('45'))  # xotiradagi obyekt ham yangilanadi
+        for wallet in (self.buyer, self.seller):
+            wallet.refresh_from_db()
+            self.assertEqual(wallet.balance, wallet.recalculate_balance())
+            stats = wallet.compute_stats()
+            self.assertEqual({f: getattr(wallet, f) for f in stats}, stats)
+        self.assertEqual(
+            (self.buyer.total_income, self.buyer.total_expense, self.buyer.transactions_count, self.buyer.courses_purchased),
+            (Decimal('105'), Decimal('60'), 3, 1),
+        )
+        self.assertEqual((self.seller.total_income, self.seller.courses_sold), (Decimal('57'), 1))
+
+    def test_insufficient_funds(self):
+        before = models.WalletTransaction.objects.count()
+        with self.assertRaisesMessage(ledger.InsufficientFunds, 'no money'):
+            ledger.post([
+                self.tx(self.buyer, 'bonus', '10'),
+                self.tx(self.buyer, 'withdrawal', '-111'),
+            ], insufficient_message='no money')
+
+        self.assertEqual(models.WalletTransaction.objects.count(), before)
+        self.buyer.refresh_from_db()
+        self.assertEqual((self.buyer.balance, self.buyer.transactions_count), (Decimal('100'), 1))
+        # kirim bilan birga yetarli: tartib bo'yicha tekshiriladi
+        ledger.post([self.tx(self.buyer, 'bonus', '11'), self.tx(self.buyer, 'withdrawal', '-111')])
+        self.buyer.refresh_from_db()
+        self.assertEqual(self.buyer.balance, 0)
+
+    def test_platform_counter_deltas(self):
+        models.PlatformCounterDelta.objects.all().delete()
+        ledger.post([self.tx(self.buyer, 'course_purchase', '-60', course=self.course), self.tx(self.seller, 'bonus', '7')])
+
+        journal = dict(
+            models.PlatformCounterDelta.objects.values('key').annotate(total=Sum('value')).values_list('key', 'total')
+        )
+        self.assertEqual(journal, {
+            'tx.count': 2, 'tx.type.course_purchase': 1, 'tx.type.bonus': 1,
+            'tx.income': Decimal('7'), 'tx.expense': Decimal('-60'),
+        })
+        self.assertFalse(models.PlatformCounter.objects.filter(key='tx.count', value__gt=0).exists())
+
+    def test_purchase_grants_entitlement(self):
+        course, course_type = make_course(self.seller.user, purchase_scope='course_type')
+        ledger.post([
+            self.tx(self.buyer, 'course_purchase', '-10', course=self.course),
+            self.tx(self.buyer, 'course_type_purchase', '-10', course=course, course_type=course_type),
+            self.tx(self.seller, 'course_earning', '10', course=self.course),
+        ])
+
+        self.assertEqual(
+            set(models.CourseEntitlement.objects.values_list('user_id', 'course_id', 'course_type_id')),
+            {(self.buyer.user_id, self.course.id, None), (self.buyer.user_id, course.id, course_type.id)},
+        )
+        self.assertEqual(
+            dict(models.CourseStudentDelta.objects.values_list('course_id', 'delta')),
+            {self.course.id: 1, course.id: 1},
+        )
+
+
+class EntitlementTests(TestCase):
+    def setUp(self):
+        self.buyer = fund(make_user(), 100)
+        self.course, self.course_type = make_course()
+        self.other_type = models.CourseType.objects.create(
+            name='Other', slug=f'ct-{uuid.uuid4().hex[:8]}', created_by=self.course.channel, course=self.course, price=50,
+        )
+
+    def purchase(self, course_type=None):
+        # admin yo'li: ledger.post siz to'g'ridan-to'g'ri saqlash (grant_on_save signali)
+        kind = 'course_type_purchase' if course_type else 'course_purchase'
+        return models.WalletTransaction.objects.create(
+            wallet=self.buyer, transaction_type=kind, amount=Decimal('-10'), balance_after=Decimal('90'),
+            course=self.course, course_type=course_type,
+        )
+
+    def student_deltas(self):
+        return list(models.CourseStudentDelta.objects.filter(course=self.course).values_list('delta', flat=True))
+
+    def test_grant_on_save_and_revoke_on_delete(self):
+        models.CourseStudentDelta.objects.all().delete()
+        by_type = self.purchase(self.course_type)
+        whole = self.purchase()
+        self.assertEqual(entitlements.students(self.course).count(), 2)
+        self.assertEqual(self.student_deltas(), [1])  # bitta o'quvchi, ikki huquq
+
+        by_type.delete()
+        self.assertEqual(self.student_deltas(), [1])  # butun kurs huquqi qoldi
+        self.assertFalse(entitlements.owns_course_type(self.buyer.user, self.course_type))
+        whole.delete()
+        self.assertEqual(self.student_deltas(), [1, -1])
+        self.assertFalse(entitlements.students(self.course).exists())
+
+        course_stats.fold_students()
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.students_count, 0)
+        self.assertEqual(course_stats.verify([self.course.id]), [])
+
+    def test_course_type_purchase_only_covers_that_type(self):
+        user = self.buyer.user
+        self.purchase(self.course_type)
+        self.assertTrue(entitlements.can_watch(user, self.course, self.course_type))
+        self.assertFalse(entitlements.can_watch(user, self.course, self.other_type))
+        self.assertFalse(entitlements.can_watch(user, self.course))
+        self.assertFalse(entitlements.owns_course(user, self.course))
+        self.assertTrue(entitlements.owns_any_course_type(user, self.course))
+        self.assertEqual(
+            entitlements.owned(user, [self.course.id], [self.course_type.id, self.other_type.id]),
+            {('course_type', self.course_type.id)},
+        )
+        self.assertEqual(entitlements.purchased_course_ids(user, [self.course]), set())
+        self.course.purchase_scope = 'course_type'
+        self.assertEqual(entitlements.purchased_course_ids(user, [self.course]), {self.course.id})
+
+    def test_course_purchase_covers_every_type(self):
+        user = self.buyer.user
+        self.purchase()
+        for course_type in (None, self.course_type, self.other_type):
+            self.assertTrue(entitlements.can_watch(user, self.course, course_type))
+        self.assertFalse(entitlements.owns_course_type(user, self.course_type))
+        self.assertEqual(entitlements.owned(user, [self.course.id], [self.course_type.id]), {('course', self.course.id)})
+        self.assertEqual(entitlements.purchased_course_ids(user, [self.course]), {self.course.id})
+        self.assertEqual(entitlements.purchased_course_ids(AnonymousUser(), [self.course]), set())
+
+    def test_backfill_is_idempotent(self):
+        self.purchase()
+        self.purchase(self.course_type)
+        other = fund(make_user(), 10)
+        models.WalletTransaction.objects.create(
+            wallet=other, transaction_type='course_type_purchase', amount=Decimal('-10'), balance_after=0,
+            course_type=self.other_type,  # course bo'sh: kurs turi orqali topiladi
+        )
+        course_stats.fold_students()
+        models.CourseEntitlement.objects.all().delete()
+        course_stats.rebuild([self.course.id])
+
+        self.assertEqual(entitlements.backfill(batch_size=2), (3, 3))
+        self.assertEqual(entitlements.backfill(batch_size=2), (3, 3))
+        self.assertTrue(entitlements.can_watch(other.user, self.course, self.other_type))
+        self.assertEqual(course_stats.verify([self.course.id]), [])
+        course_stats.fold_students()
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.students_count, 2)
+
+
+class CourseAggregateTests(TestCase):
+    def setUp(self):
+        self.course, _ = make_course()
+        self.other, _ = make_course()
+        self.video = models.CourseVideo.objects.create(course=self.course, title='V1', duration=600)
+        self.user = make_user()
+
+    def aggregates(self, obj):
+        obj.refresh_from_db()
+        return obj.rating_sum, obj.rating_count, obj.rating_avg
+
+    def assertNoDrift(self):
+        self.assertEqual(course_stats.verify(), [])
+        self.assertEqual(ratings.verify(models.CourseVideoRating), [])
+
+    def test_rating_create_update_delete(self):
+        first = models.CourseVideoRating.objects.create(user=self.user, course_video=self.video, value=5)
+        models.CourseVideoRating.objects.create(user=make_user(), course_video=self.video, value=4)
+        self.assertEqual(self.aggregates(self.video), (9, 2, Decimal('4.5')))
+        self.assertEqual(self.aggregates(self.course), (9, 2, Decimal('4.5')))
+
+        first.value = 2
+        first.save()
+        self.assertEqual(self.aggregates(self.video), (6, 2, Decimal('3.0')))
+        first.value = 9  # 5 gacha qisqartiriladi
+        first.save()
+        self.assertEqual(self.aggregates(self.course), (9, 2, Decimal('4.5')))
+
+        stale = models.CourseVideo.objects.get(pk=self.video.pk)
+        first.delete()
+        self.assertEqual(self.aggregates(self.video), (4, 1, Decimal('4.0')))
+        stale.title = 'Renamed'
+        stale.save()  # eski agregatlar ustidan yozilmaydi
+        self.assertEqual(self.aggregates(self.course), (4, 1, Decimal('4.0')))
+        self.assertNoDrift()
+
+    def test_video_changes(self):
+        models.CourseVideoRating.objects.create(user=self.user, course_video=self.video, value=3)
+        second = models.CourseVideo.objects.create(course=self.course, title='V2', duration=95)
+        self.course.refresh_from_db()
+        self.assertEqual(
+            (self.course.lessons_count, self.course.total_duration_seconds, self.course.total_duration_minutes),
+            (2, 695, 12),
+        )
+
+        second.duration = 120
+        second.save()
+        self.video.course = self.other
+        self.video.save()
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.lessons_count, self.course.total_duration_seconds, self.course.rating_count), (1, 120, 0))
+        self.assertEqual(self.aggregates(self.other), (3, 1, Decimal('3.0')))
+        self.assertEqual(self.aggregates(self.video), (3, 1, Decimal('3.0')))
+
+        self.video.delete()
+        self.other.refresh_from_db()
+        self.assertEqual((self.other.lessons_count, self.other.rating_count, self.other.rating_avg), (0, 0, 0))
+        self.assertNoDrift()
+
+    def test_fold_students(self):
+        models.CourseStudentDelta.objects.all().delete()
+        course_stats.add_students({self.course.id: 2, self.other.id: 1})
+        course_stats.add_students({self.course.id: -1, self.other.id: 0})
+        self.assertEqual(models.CourseStudentDelta.objects.count(), 3)
+
+        self.assertEqual(course_stats.fold_students(batch_size=2), 3)
+        self.assertFalse(models.CourseStudentDelta.objects.exists())
+        self.assertEqual(
+            dict(models.Course.objects.filter(pk__in=[self.course.id, self.other.id]).values_list('pk', 'students_count')),
+            {self.course.id: 1, self.other.id: 1},
+        )
+        self.assertEqual(course_stats.fold_students(), 0)
+
+    def test_verify_counts_pending_students_and_rebuild(self):
+        buyer = fund(self.user, 100)
+        ledger.post([models.WalletTransaction(
+            wallet=buyer, transaction_type='course_purchase', amount=Decimal('-10'), course=self.course,
+        )])
+        self.assertEqual(course_stats.verify([self.course.id]), [])  # jurnal hali yig'ilmagan
+
+        models.Course.objects.filter(pk=self.course.pk).update(lessons_count=5, students_count=3)
+        models.CourseVideo.objects.filter(pk=self.video.pk).update(rating_count=2, rating_sum=8)
+        self.assertEqual(course_stats.rebuild([self.course.id], dry_run=True), [
+            (self.course.id, 'students_count', 4, 1),
+            (self.course.id, 'lessons_count', 5, 1),
+        ])
+        course_stats.rebuild([self.course.id])
+        self.assertEqual(ratings.rebuild([models.CourseVideoRating])['app.CourseVideo'], [
+            (self.video.id, 'rating_sum', 8, 0),
+            (self.video.id, 'rating_count', 2, 0),
+        ])
+        course_stats.fold_students()
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.students_count, self.course.lessons_count), (1, 1))
+        self.assertNoDrift()
+
+
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        course, _ = make_course()
+        self.channel = course.channel
+        self.other = make_course()[0].channel
+
+    def aggregates(self, obj):
+        obj.refresh_from_db()
+        return obj.rating_sum, obj.rating_count, obj.rating_avg, obj.average_rating
+
+    def test_apply(self):
+        ratings.apply(models.Channel, self.channel.pk, rating_sum=7, ratings=2)
+        self.assertEqual(self.aggregates(self.channel), (7, 2, Decimal('3.5'), 3.5))
+        ratings.apply(models.Channel, self.channel.pk, rating_sum=-7, ratings=-2)
+        self.assertEqual(self.aggregates(self.channel), (0, 0, Decimal('0.0'), None))
+        with self.assertNumQueries(0):
+            ratings.apply(models.Channel, None, rating_sum=1, ratings=1)
+        self.assertEqual(ratings.average(2, 3), Decimal('0.7'))
+
+    def test_rating_signals(self):
+        first = models.ChannelRating.objects.create(user=make_user(), channel=self.channel, value=5)
+        models.ChannelRating.objects.create(user=make_user(), channel=self.channel, value=2)
+        self.assertEqual(self.aggregates(self.channel), (7, 2, Decimal('3.5'), 3.5))
+
+        first.value = 4
+        first.save()
+        self.assertEqual(self.aggregates(self.channel), (6, 2, Decimal('3.0'), 3.0))
+        first.channel = self.other  # boshqa obyektga ko'chirish
+        first.save()
+        self.assertEqual(self.aggregates(self.channel), (2, 1, Decimal('2.0'), 2.0))
+        self.assertEqual(self.aggregates(self.other), (4, 1, Decimal('4.0'), 4.0))
+        first.delete()
+        self.assertEqual(self.aggregates(self.other), (0, 0, Decimal('0.0'), None))
+        self.assertEqual(ratings.verify(models.ChannelRating), [])
+
+    def test_rebuild(self):
+        models.ChannelRating.objects.create(user=make_user(), channel=self.channel, value=3)
+        models.Channel.objects.filter(pk=self.other.pk).update(rating_sum=4, rating_count=1, rating_avg=4)
+
+        drift = ratings.rebuild([models.ChannelRating], dry_run=True)['app.Channel']
+        self.assertEqual(drift, [
+            (self.other.pk, 'rating_sum', 4, 0),
+            (self.other.pk, 'rating_count', 1, 0),
+            (self.other.pk, 'rating_avg', Decimal('4.0'), Decimal('0.0')),
+        ])
+        self.assertEqual(ratings.verify(models.ChannelRating), drift)
+        ratings.rebuild([models.ChannelRating])
+        self.assertEqual(ratings.verify(models.ChannelRating), [])
+        self.assertEqual(self.aggregates(self.channel), (3, 1, Decimal('3.0'), 3.0))
+
+
+class CommentTreeTests(TestCase):
+    def setUp(self):
+        course, _ = make_course()
+        self.channel = course.channel
+        self.user = make_user()
+
+    def comment(self, parent=None, text='izoh'):
+        return models.ChannelComment.objects.create(channel=self.channel, user=self.user, text=text, parent=parent)
+
+    def replies(self, node):
+        return [(reply.text, self.replies(reply)) for reply in node.tree_replies]
+
+    def test_load_replies_fetches_first_replies_per_parent(self):
+        root = self.comment(text='root')
+        c1, c2, c3 = (self.comment(root, text=f'c{i}') for i in (1, 2, 3))
+        for i in (1, 2, 3):
+            self.comment(c1, text=f'e{i}')
+        self.comment(c3, text='d1')
+        other = self.comment(text='other')
+
+        with self.assertNumQueries(1):
+            nodes = comment_tree.load_replies(models.ChannelComment, [root, other], reply_limit=2)
+        self.assertEqual(self.replies(nodes[0]), [('c1', [('e1', []), ('e2', [])]), ('c2', [])])
+        self.assertEqual(nodes[1].tree_replies, [])
+        fetched = [c.text for c in comment_tree.descendants(models.ChannelComment, [root], reply_limit=2)]
+        self.assertEqual(fetched, ['c1', 'e1', 'e2', 'c2', 'd1'])  # c3 va e3 o'qilmaydi
+
+        nodes = comment_tree.load_replies(models.ChannelComment, [root])
+        self.assertEqual(len(nodes[0].tree_replies), 3)
+        self.assertEqual(self.replies(nodes[0].tree_replies[2]), [('d1', [])])
+        with self.assertNumQueries(0):
+            nodes = comment_tree.load_replies(models.ChannelComment, [root], reply_limit=0)
+        self.assertEqual(nodes[0].tree_replies, [])
+
+    def tree(self, *nodes):
+        rows = models.ChannelComment.objects.filter(pk__in=[n.pk for n in nodes]).in_bulk()
+        return [(rows[n.pk].depth, rows[n.pk].replies_count, rows[n.pk].descendants_count) for n in nodes]
+
+    def test_counters(self):
+        root = self.comment()
+        a, b = self.comment(root), self.comment(root)
+        a1 = self.comment(a)
+        a11 = self.comment(a1)
+        self.assertEqual(self.tree(root, a, b, a1, a11), [(0, 2, 4), (1, 1, 2), (1, 0, 0), (2, 1, 1), (3, 0, 0)])
+        a11.refresh_from_db()
+        self.assertEqual((a11.root_id, comment_tree.ancestor_ids(a11.path)), (root.pk, [root.pk, a.pk, a1.pk, a11.pk]))
+
+        a.delete()  # javoblari CASCADE bilan o'chadi
+        self.assertEqual(self.tree(root, b), [(0, 1, 1), (1, 0, 0)])
+        self.assertEqual(comment_tree.rebuild([models.ChannelComment], dry_run=True), {'app.ChannelComment': 0})
+
+    def test_rebuild_after_bulk_create(self):
+        root = self.comment()
+        bulk = models.ChannelComment.objects.bulk_create([
+            models.ChannelComment(channel=self.channel, user=self.user, text='bulk', parent=root),
+        ])[0]
+        reply = self.comment(bulk)
+        self.assertEqual(comment_tree.load_replies(models.ChannelComment, [root])[0].tree_replies, [])
+
+        self.assertEqual(comment_tree.rebuild([models.ChannelComment], dry_run=True), {'app.ChannelComment': 3})
+        self.assertEqual(self.tree(root, bulk), [(0, 0, 0), (0, 0, 0)])  # dry_run yozmaydi
+        self.assertEqual(comment_tree.rebuild([models.ChannelComment]), {'app.ChannelComment': 3})
+        self.assertEqual(self.tree(root, bulk, reply), [(0, 1, 2), (1, 1, 1), (2, 0, 0)])
+        self.assertEqual(self.replies(comment_tree.load_replies(models.ChannelComment, [root])[0]), [('bulk', [('izoh', [])])])
+
+    def test_replies_beyond_max_depth_attach_to_grandparent(self):
+        node = root = self.comment()
+        for _ in range(comment_tree.MAX_DEPTH):
+            node = self.comment(node)
+        deepest = node
+        reply = self.comment(deepest)
+
+        self.assertEqual(reply.parent_id, deepest.parent_id)
+        reply.refresh_from_db()
+        self.assertEqual((reply.depth, reply.parent_id), (comment_tree.MAX_DEPTH, deepest.parent_id))
+        self.assertEqual(len(reply.path), models.ChannelComment._meta.get_field('path').max_length)
+        self.assertEqual(self.tree(root, deepest), [(0, 1, comment_tree.MAX_DEPTH + 1), (comment_tree.MAX_DEPTH, 0, 0)])
+        self.assertEqual(comment_tree.rebuild([models.ChannelComment], dry_run=True), {'app.ChannelComment': 0})
+
+
+class WalletTransactionsQuerysetTests(TestCase):
+    def test_filters_by_resolved_wallet_id(self):
+        user = make_user()
+        wallet = fund(user, 10)
+        fund(make_user(), 20)
+        with self.assertNumQueries(1):
+            transactions = wallet_views.wallet_transactions_queryset(user)
+        self.assertEqual([tx.wallet_id for tx in transactions], [wallet.id])
+        where = str(transactions.query).split(' WHERE ')[1]
+        self.assertNotIn('user_id', where)
+
+        no_wallet = make_user()
+        with self.assertNumQueries(1):
+            self.assertEqual(list(wallet_views.wallet_transactions_queryset(no_wallet)), [])
+
+
+class WalletAdminTests(TestCase):
+    def setUp(self):
+        admin_user = models.User.objects.create_superuser(username=f'admin_{uuid.uuid4().hex[:8]}', password='x')
+        self.client.force_login(admin_user)
+        self.wallet = fund(make_user(), 100)
+
+    def add(self, amount):
+        return self.client.post(reverse('admin:app_wallettransaction_add'), {
+            'wallet': self.wallet.pk, 'transaction_type': 'bonus', 'amount': amount, 'description': 'admin',
+            'original_amount': 0, 'discount_amount': 0,
+        })
+
+    def test_added_entries_go_through_the_ledger(self):
+        self.assertEqual(self.add('25').status_code, 302)
+        self.assertEqual(self.add('-200').status_code, 200)  # forma xatosi: mablag' yetmaydi
+
+        self.wallet.refresh_from_db()
+        entry = models.WalletTransaction.objects.get(wallet=self.wallet, transaction_type='bonus')
+        self.assertEqual((entry.balance_after, self.wallet.balance), (Decimal('125'), Decimal('125')))
+        self.assertEqual((self.wallet.total_income, self.wallet.transactions_count), (Decimal('125'), 2))
+        stats = self.wallet.compute_stats()
+        self.assertEqual({f: getattr(self.wallet, f) for f in stats}, stats)
+        self.assertTrue(models.PlatformCounterDelta.objects.filter(key='tx.type.bonus').exists())
+
+    def test_existing_entries_are_read_only(self):
+        entry = models.WalletTransaction.objects.get(wallet=self.wallet)
+        url = reverse('admin:app_wallettransaction_change', args=[entry.pk])
+        self.client.post(url, {'wallet': self.wallet.pk, 'transaction_type': 'deposit', 'amount': '999'})
+        entry.refresh_from_db()
+        self.assertEqual(entry.amount, Decimal('100'))
+        self.assertEqual(self.client.post(reverse('admin:app_wallettransaction_delete', args=[entry.pk])).status_code, 403)
+
+        response = self.client.post(reverse('admin:app_wallet_change', args=[self.wallet.pk]), {
+            'user': self.wallet.user_id, 'balance': '5000',
+            'transactions-TOTAL_FORMS': 1, 'transactions-INITIAL_FORMS': 1, 'transactions-0-id': entry.pk,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('100'))
+
+
+class ArchiveGuardTests(TestCase):
+    def test_consumers_refuse_archived_range(self):
+        boundary = datetime(2026, 8, 1, tzinfo=dt_timezone.utc)
+        with mock.patch.object(partitions, 'archive_boundary', return_value=boundary):
+            with self.assertRaises(partitions.PartitionError):
+                rollups.rollup_range(date(2026, 7, 30), date(2026, 8, 2))
+            with self.assertRaises(partitions.PartitionError):
+                entitlements.backfill()
+            self.assertEqual(rollups.rollup_range(date(2026, 8, 1), date(2026, 8, 2)), 0)
+            self.assertEqual(entitlements.backfill(allow_archived=True), (0, 0))
+
+
+class PlatformCounterReconcileTests(TestCase):
+    def setUp(self):
+        fund(make_user(), 100)
+        platform_counters.reconcile()
+
+    def test_reconcile_fixes_drift(self):
+        models.PlatformCounter.objects.filter(key='tx.count').update(value=Decimal('99'))
+        models.PlatformCounter.objects.filter(key='users.role.student').update(value=Decimal('99'))
+        drift = platform_counters.reconcile()
+
+        self.assertEqual(drift['tx.count'], (Decimal('99'), Decimal('1')))
+        self.assertEqual(platform_counters.read_all()['tx.count'], 1)
+        self.assertEqual(platform_counters.reconcile(dry_run=True), {})
+
+    def test_archived_partitions_keep_tx_counters(self):
+        models.PlatformCounter.objects.filter(key='tx.count').update(value=Decimal('500'))
+        models.PlatformCounter.objects.filter(key='users.role.student').update(value=Decimal('99'))
+        platform_counters.apply({'tx.count': 1, 'courses.total': 1})
+        boundary = datetime(2026, 8, 1, tzinfo=dt_timezone.utc)
+        with mock.patch.object(partitions, 'archive_boundary', return_value=boundary):
+            drift = platform_counters.reconcile()
+
+        self.assertIn('users.role.student', drift)
+        self.assertFalse(any(k.startswith('tx.') for k in drift))
+        values = platform_counters.read_all()
+        self.assertEqual(values['tx.count'], 501)  # arxiv + yig'ilmagan jurnal saqlanadi
+        self.assertEqual(values['courses.total'], models.Course.objects.count())
+        self.assertEqual(values['users.role.student'], models.User.objects.filter(role='student').count())
+
+    def test_uninitialized_store_with_archive_refuses(self):
+        models.PlatformCounter.objects.all().delete()
+        boundary = datetime(2026, 8, 1, tzinfo=dt_timezone.utc)
+        with mock.patch.object(partitions, 'archive_boundary', return_value=boundary):
+            with self.assertRaises(partitions.PartitionError):
+                platform_counters.read_all()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TeacherDashboardTests(TestCase):
+    def setUp(self):
+        self.teacher = make_user('teacher')
+        self.course, _ = make_course(self.teacher)
+        self.channel = self.course.channel
+        self.video = models.CourseVideo.objects.create(course=self.course, title='Video', duration=60)
+
+    def add_assignments(self, n):
+        for i in range(n):
+            assignment = models.VideoAssignment.objects.create(course_video=self.video, title=f'A{i}')
+            for grade in (None, 60, 80):
+                models.AssignmentSubmission.objects.create(assignment=assignment, student=make_user(), grade=grade)
+
+    def test_assignments_stats_query_count_is_bounded(self):
+        self.add_assignments(2)
+        with CaptureQueriesContext(connection) as small:
+            dashboard.build_assignments_stats(self.teacher, self.channel)
+        self.add_assignments(5)
+        with CaptureQueriesContext(connection) as large:
+            payload = dashboard.build_assignments_stats(self.teacher, self.channel)
+
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(len(payload['grading_workload']['pending_assignments']), 7)
+        self.assertEqual(payload['top_performing_assignments'][0]['avg_score'], 70.0)
+        self.assertEqual(payload['course_performance'][0]['total_submissions'], 21)
+
+    def test_user_without_channel_gets_empty_report(self):
+        student = make_user()
+        response = dashboard.serve(student, 'overview')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('generated_at', response.data)
+        self.assertFalse(models.TeacherDashboardSnapshot.objects.exists())
+        dashboard.serve(self.teacher, 'overview')
+        self.assertTrue(models.TeacherDashboardSnapshot.objects.filter(user=self.teacher).exists())
+
+
+class ProgressJournalTests(TestCase):
+    def setUp(self):
+        course, _ = make_course()
+        self.video = models.CourseVideo.objects.create(course=course, title='Video', duration=600)
+        self.user = make_user()
+
+    def days(self):
+        return models.CourseVideoProgressDay.objects.filter(user=self.user).count()
+
+    def test_only_progress_changes_are_journaled(self):
+        progress, _ = models.CourseVideoProgress.objects.get_or_create(user=self.user, course_video=self.video)
+        self.assertEqual(self.days(), 0)
+
+        progress = models.CourseVideoProgress.objects.get(pk=progress.pk)
+        progress.last_position = 30  # faqat pozitsiya: heartbeat
+        with self.assertNumQueries(1):
+            progress.save()
+        self.assertEqual(self.days(), 0)
+
+        progress.seconds_watched = 30
+        progress.save()
+        progress.completed = True
+        progress.save()
+        self.assertEqual(self.days(), 1)
+        with self.assertNumQueries(1):
+            progress.save()
+
+    def test_rollup_reads_journal(self):
+        models.CourseVideoProgress.objects.create(user=self.user, course_video=self.video, seconds_watched=10)
+        today = timezone.localdate()
+        stats = rollups.compute_stats(rollups.day_start(today), rollups.day_start(today + timedelta(days=1)))
+        self.assertEqual(stats[(self.video.course_id, today)]['progress_events'], 1)
+        self.assertEqual(stats[(self.video.course_id, today)]['active_learners'], 1)
+
+
+class QuestionBankTests(TestCase):
+    CSV = (
+        'question,points,correct,option_1,option_2,option_3\n'
+        '2+2?,2,2,3,4,5\n'
+        ',,,,,\n'
+        'Tub sonlar?,,1;3,2,4,5\n'
+    )
+
+    def setUp(self):
+        course, _ = make_course()
+        video = models.CourseVideo.objects.create(course=course, title='Video')
+        self.test = models.VideoTest.objects.create(course_video=video, title='Quiz')
+
+    def question(self, text, order=None):
+        data = {'text': text, 'options': [{'text': 'a', 'is_correct': True}, {'text': 'b', 'is_correct': False}]}
+        if order is not None:
+            data['order'] = order
+        return data
+
+    def test_parse_csv(self):
+        questions = question_bank.load_file(io.StringIO(self.CSV), name='bank.csv')
+        self.assertEqual([q['text'] for q in questions], ['2+2?', 'Tub sonlar?'])  # bo'sh qator tashlanadi
+        self.assertEqual(questions[0]['points'], '2')
+        self.assertEqual([o['is_correct'] for o in questions[0]['options']], [False, True, False])
+        self.assertEqual([o['is_correct'] for o in questions[1]['options']], [True, False, True])
+        self.assertNotIn('points', questions[1])
+
+    def test_parse_csv_errors(self):
+        with self.assertRaises(question_bank.QuestionBankError) as ctx:
+            question_bank.parse_csv(io.StringIO('text,option_1\nQ,a\n'))
+        self.assertIn('file', ctx.exception.errors)
+
+        bad = 'question,correct,option_1,option_2\nQ1,1,a,b\nQ2,b,a,b\nQ3,x;2,a,b\n'
+        with self.assertRaises(question_bank.QuestionBankError) as ctx:
+            question_bank.parse_csv(io.BytesIO(bad.encode('utf-8-sig')))
+        self.assertEqual(sorted(ctx.exception.errors), ['row 3', 'row 4'])
+
+    def test_parse_json(self):
+        items = [self.question('Q1')]
+        self.assertEqual(question_bank.parse_json(io.StringIO(json.dumps(items))), items)
+        wrapped = json.dumps({'questions': items}).encode()
+        self.assertEqual(question_bank.load_file(io.BytesIO(wrapped), fmt='JSON'), items)
+
+        for raw in ('{not json', '{"items": []}', '"text"'):
+            with self.assertRaises(question_bank.QuestionBankError) as ctx:
+                question_bank.parse_json(io.StringIO(raw))
+            self.assertIn('file', ctx.exception.errors)
+        with self.assertRaises(question_bank.QuestionBankError):
+            question_bank.load_file(io.StringIO(''), name='bank.xlsx')
+
+    def test_validate(self):
+        one_option = {'text': 'Q2', 'options': [{'text': 'a', 'is_correct': True}]}
+        no_correct = {'text': 'Q3', 'options': [{'text': 'a'}, {'text': 'b'}]}
+        no_text = {'options': []}
+        with self.assertRaises(question_bank.QuestionBankError) as ctx:
+            question_bank.validate_questions('video', [self.question('Q1'), one_option, no_correct])
+        self.assertEqual(sorted(ctx.exception.errors), ['question 2', 'question 3'])
+        with self.assertRaises(question_bank.QuestionBankError) as ctx:
+            question_bank.validate_questions('video', [self.question('Q1'), no_text])
+        self.assertEqual(list(ctx.exception.errors), ['question 2'])
+        with self.assertRaises(question_bank.QuestionBankError):
+            question_bank.validate_questions('video', [])
+
+    def test_import_appends_after_existing_questions(self):
+        summary = question_bank.import_questions('video', self.test, question_bank.parse_csv(io.StringIO(self.CSV)))
+        self.assertEqual((summary['questions_created'], summary['options_created']), (2, 6))
+
+        question_bank.import_questions('video', self.test, [self.question('Q3'), self.question('Q4', order=5)])
+        self.assertEqual(
+            list(self.test.questions.values_list('text', 'order')),
+            [('2+2?', 1), ('Tub sonlar?', 2), ('Q3', 3), ('Q4', 7)],
+        )
+        self.assertEqual(models.TestOption.objects.filter(question__test=self.test).count(), 10)
+
+    def test_import_replace_and_rollback(self):
+        question_bank.import_questions('video', self.test, [self.question('Old')])
+        summary = question_bank.import_questions('video', self.test, [self.question('New')], replace=True)
+        self.assertTrue(summary['replaced'])
+        self.assertEqual(list(self.test.questions.values_list('text', 'order')), [('New', 1)])
+
+        with self.assertRaises(question_bank.QuestionBankError):
+            question_bank.import_questions('video', self.test, [self.question('Q'), {'text': 'bad', 'options': []}], replace=True)
+        self.assertEqual(list(self.test.questions.values_list('text', flat=True)), ['New'])
+
+
+# SQLite da qatorlarni qulflash (select_for_update) va parallel yozish yo'q
+@unittest.skipIf(connection.vendor == 'sqlite', 'needs row locking (PostgreSQL)')
+class LedgerConcurrencyTests(TransactionTestCase):
+    def test_parallel_posts_keep_balance_consistent(self):
+        user = models.User.objects.create(username='ledger_concurrency')
+        wallet, _ = models.Wallet.objects.get_or_create(user=user)
+        ledger.post([models.WalletTransaction(wallet=wallet, transaction_type='deposit', amount=Decimal('50'))])
+
+        def work(i):
+            rejected = 0
+            for n in range(20):
+                deposit = (i + n) % 3 == 0
+                entry = models.WalletTransaction(
+                    wallet_id=wallet.pk,
+                    transaction_type='deposit' if deposit else 'withdrawal',
+                    amount=Decimal('30') if deposit else Decimal('-20'),
+                )
+                try:
+                    ledger.post([entry])
+                except ledger.InsufficientFunds:
+                    rejected += 1
+            return rejected
+
+        results = run_concurrently(work)
+        for result in results:
+            self.assertIsInstance(result, int)
+
+        wallet.refresh_from_db()
+        self.assertEqual(wallet.balance, wallet.recalculate_balance())
+        self.assertGreaterEqual(wallet.balance, 0)
+        self.assertFalse(wallet.transactions.filter(balance_after__lt=0).exists())
+        self.assertEqual(wallet.transactions.count(), 1 + THREADS * 20 - sum(results))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PromoClaimTests(TestCase):
+    def setUp(self):
+        self.promo = models.PromoCode.objects.create(code='LIMITED', discount_type='coins', value=Decimal('5'), max_uses=3)
+        self.rule = promos.get_rule('LIMITED')
+
+    def uses(self):
+        self.promo.refresh_from_db()
+        return self.promo.uses
+
+    def test_claim_up_to_limit(self):
+        promos.claim(self.rule, n=2)
+        # uses + n <= max_uses: 2 + 2 oshib ketadi, 2 + 1 sig'adi
+        with self.assertRaises(promos.PromoError):
+            promos.claim(self.rule, n=2)
+        self.assertEqual(self.uses(), 2)
+        promos.claim(self.rule)
+        self.assertEqual(self.uses(), 3)
+
+    def test_exhausted_code(self):
+        models.PromoCode.objects.filter(pk=self.promo.pk).update(uses=3)
+        with self.assertRaisesMessage(promos.PromoError, 'usage limit'):
+            promos.claim(self.rule)
+        self.assertEqual(self.uses(), 3)
+
+    def test_inactive_and_unlimited_codes(self):
+        models.PromoCode.objects.filter(pk=self.promo.pk).update(is_active=False)
+        with self.assertRaises(promos.PromoError):
+            promos.claim(self.rule)
+        models.PromoCode.objects.filter(pk=self.promo.pk).update(is_active=True, max_uses=None, uses=10)
+        promos.claim(self.rule, n=5)
+        self.assertEqual(self.uses(), 15)
+
+    def test_missing_code_is_cached(self):
+        self.assertIsNone(promos.get_rule('NOPE'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(promos.get_rule('NOPE'))
+            with self.assertRaisesMessage(promos.PromoError, 'not found'):
+                promos.validate('NOPE', models.Course())
+        # yaratilganda manfiy kesh ham tozalanadi
+        models.PromoCode.objects.create(code='NOPE', discount_type='coins', value=Decimal('1'))
+        self.assertIsNotNone(promos.get_rule('NOPE'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PromoCacheTests(TestCase):
+    def setUp(self):
+        self.course, self.course_type = make_course()
+        self.promo = models.PromoCode.objects.create(code='CACHED', discount_type='coins', value=Decimal('5'))
+        self.promo.courses.add(self.course)
+
+    def test_code_rename_drops_old_key(self):
+        self.assertIsNotNone(promos.get_rule('CACHED'))
+        self.promo.code = 'RENAMED'
+        self.promo.save()
+
+        self.assertIsNone(promos.get_rule('CACHED'))
+        self.assertEqual(promos.get_rule('RENAMED').id, self.promo.id)
+
+    def test_reverse_clear_invalidates(self):
+        self.assertEqual(promos.get_rule('CACHED').course_ids, {self.course.id})
+        self.course.promocode_set.clear()
+        self.assertEqual(promos.get_rule('CACHED').course_ids, frozenset())
+
+        self.course_type.promocode_set.add(self.promo)
+        self.assertEqual(promos.get_rule('CACHED').course_type_ids, {self.course_type.id})
+        self.course_type.promocode_set.clear()
+        self.assertEqual(promos.get_rule('CACHED').course_type_ids, frozenset())
+
+
+@unittest.skipIf(connection.vendor == 'sqlite', 'needs row locking (PostgreSQL)')
+class PromoClaimConcurrencyTests(TransactionTestCase):
+    def test_parallel_claims_respect_max_uses(self):
+        max_uses = 3
+        promo = models.PromoCode.objects.create(
+            code='CONCURRENT', discount_type='percent', value=Decimal('10'), max_uses=max_uses,
+        )
+        rule = promos.get_rule(promo.code)
+
+        def work(i):
+            with transaction.atomic():
+                promos.claim(rule)
+            return True
+
+        results = run_concurrently(work)
+        claimed = [r for r in results if r is True]
+        rejected = [r for r in results if isinstance(r, promos.PromoError)]
+        self.assertEqual(len(claimed), max_uses)
+        self.assertEqual(len(rejected), THREADS - max_uses)
+
+        promo.refresh_from_db()
+        self.assertEqual(promo.uses, max_uses)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.teacher = make_user('teacher')
+        self.course, _ = make_course(self.teacher, price=100)
+        self.typed_course, self.course_type = make_course(self.teacher, price=300, purchase_scope='course_type', type_price=40)
+        self.buyer = make_user()
+
+    def cart(self):
+        return [{'course_id': self.course.id}, {'course_type_id': self.course_type.id}]
+
+    def test_price_cart(self):
+        lines, promo = checkout.price_cart(self.buyer, self.cart())
+        self.assertIsNone(promo)
+        self.assertEqual([(l['kind'], l['amount']) for l in lines], [('course', 100), ('course_type', 40)])
+        self.assertTrue(all(l['seller'] == self.teacher for l in lines))
+
+    def test_price_cart_rejects_invalid_items(self):
+        with self.assertRaises(checkout.CheckoutError) as ctx:
+            checkout.price_cart(self.buyer, [
+                {'course_id': self.course.id}, {'course_id': self.course.id},
+                {'course_id': self.typed_course.id}, {'course_type_id': 0},
+            ])
+        self.assertEqual(set(ctx.exception.errors), {'item 2', 'item 3', 'item 4'})
+        with self.assertRaises(checkout.CheckoutError):
+            checkout.price_cart(self.teacher, [{'course_id': self.course.id}])
+
+    def test_checkout_posts_purchases(self):
+        fund(self.buyer, 500)
+        result = checkout.checkout(self.buyer, self.cart())
+
+        self.assertEqual(result['balance'], Decimal('360'))
+        seller_wallet = models.Wallet.objects.get(user=self.teacher)
+        self.assertEqual(seller_wallet.balance, Decimal('133.00'))  # 140 - 5% komissiya
+        for buyer_tx in result['transactions']:
+            buyer_tx.refresh_from_db()
+            self.assertEqual(buyer_tx.related_transaction.related_transaction_id, buyer_tx.pk)
+            self.assertEqual(buyer_tx.related_transaction.wallet_id, seller_wallet.pk)
+        self.assertEqual(
+            sorted(models.PendingCommission.objects.values_list('amount', flat=True)),
+            [Decimal('2.00'), Decimal('5.00')],
+        )
+        self.assertEqual(
+            entitlements.owned(self.buyer, [self.course.id], [self.course_type.id]),
+            {('course', self.course.id), ('course_type', self.course_type.id)},
+        )
+
+    def test_checkout_applies_promo(self):
+        promo = models.PromoCode.objects.create(code='TEN', discount_type='percent', value=Decimal('10'), max_uses=5)
+        promo.courses.add(self.course)
+        fund(self.buyer, 500)
+
+        lines, _ = checkout.price_cart(self.buyer, self.cart(), 'TEN')
+        self.assertEqual([(l['discount'], l['promo_applied']) for l in lines], [(Decimal('10'), True), (0, False)])
+
+        result = checkout.checkout(self.buyer, self.cart(), 'TEN')
+        self.assertEqual(result['balance'], Decimal('370'))
+        course_tx = models.WalletTransaction.objects.get(wallet__user=self.buyer, transaction_type='course_purchase')
+        self.assertEqual((course_tx.amount, course_tx.original_amount, course_tx.discount_amount), (-90, 100, 10))
+        self.assertEqual(course_tx.promo_code_id, promo.id)
+        promo.refresh_from_db()
+        self.assertEqual(promo.uses, 1)
+
+    def test_promo_not_applicable(self):
+        promo = models.PromoCode.objects.create(code='OTHER', discount_type='coins', value=Decimal('5'))
+        promo.courses.add(make_course()[0])
+        with self.assertRaises(checkout.CheckoutError) as ctx:
+            checkout.price_cart(self.buyer, self.cart(), 'OTHER')
+        self.assertIn('promo_code', ctx.exception.errors)
+
+    def test_insufficient_funds_writes_nothing(self):
+        promo = models.PromoCode.objects.create(code='TEN', discount_type='percent', value=Decimal('10'))
+        wallet = fund(self.buyer, 50)
+        transactions = models.WalletTransaction.objects.count()
+
+        with self.assertRaises(ledger.InsufficientFunds):
+            checkout.checkout(self.buyer, self.cart(), 'TEN')
+
+        wallet.refresh_from_db()
+        self.assertEqual(wallet.balance, Decimal('50'))
+        self.assertEqual(models.WalletTransaction.objects.count(), transactions)
+        self.assertFalse(models.PendingCommission.objects.exists())
+        self.assertFalse(models.CourseEntitlement.objects.filter(user=self.buyer).exists())
+        promo.refresh_from_db()
+        self.assertEqual(promo.uses, 0)
+
+    def test_ownership_rechecked_under_lock(self):
+        fund(self.buyer, 500)
+        checkout.checkout(self.buyer, [{'course_id': self.course.id}])
+        transactions = models.WalletTransaction.objects.count()
+
+        # price_cart parallel xariddan oldin ishlagan: egalik faqat qulf ostida ko'rinadi
+        real_owned = entitlements.owned
+        with mock.patch.object(checkout.entitlements, 'owned') as owned:
+            owned.side_effect = lambda *a, **kw: set() if owned.call_count == 1 else real_owned(*a, **kw)
+            with self.assertRaises(checkout.CheckoutError) as ctx:
+                checkout.checkout(self.buyer, [{'course_id': self.course.id}])
+
+        self.assertEqual(owned.call_count, 2)
+        self.assertIn('items', ctx.exception.errors)
+        self.assertEqual(models.WalletTransaction.objects.count(), transactions)
+        self.assertEqual(models.Wallet.objects.get(user=self.buyer).balance, Decimal('400'))
@@ -0,0 +1,130 @@
+"""Foydalanuvchi kabineti: izohlar lentasi va overview hisoblagichlari.
+
+`comment_feed()` beshta izoh jadvalini bitta `UNION ALL` so'rovida
+(created_at, target_field, id) bo'yicha kamayish tartibida birlashtiradi
+va keyset (cursor) bilan sahifalaydi: cursor sharti har bir tarmoqqa
+alohida qo'yiladi, shuning uchun har bir jadval (user, created_at) indeksi
+bo'yicha o'qiladi. `overview_counters()` barcha hisoblagichlarni bitta
+SELECT dagi korrelyatsiyalangan subquerylar bilan oladi.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Avg, CharField, Count, F, OuterRef, Q, Subquery, Sum, Value
+from rest_framework.exceptions import NotFound
+
+from app import models
+from app.api_teacher.analytics import user_subquery
+
+
+COMMENT_TARGETS = (
+    (models.MovieComment, 'movie_id'),
+    (models.CourseVideoComment, 'course_video_id'),
+    (models.ReelComment, 'reel_id'),
+    (models.ChannelComment, 'channel_id'),
+    (models.PlaylistComment, 'playlist_id'),
+)
+
+
+# ----------------------------
+# Comment feed
+# ----------------------------
+def encode_cursor(row):
+    raw = f"{row['created_at'].isoformat()}|{row['target_field']}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(encoded):
+    if not encoded:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)).decode()
+        value, target_field, pk = raw.split('|')
+        return datetime.fromisoformat(value), target_field, int(pk)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise NotFound('Invalid cursor')
+
+
+def _after(cursor, target_field):
+    """Rows of one branch that come after `cursor` in (created_at, target_field, id) DESC order."""
+    created_at, cursor_field, pk = cursor
+    if target_field < cursor_field:
+        return Q(created_at__lte=created_at)
+    if target_field > cursor_field:
+        return Q(created_at__lt=created_at)
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+
+
+def comment_feed(user, limit=100, cursor=None):
+    """(items, next_cursor): user's comments across all comment models, newest first; one query."""
+    branches = []
+    for model, key in COMMENT_TARGETS:
+        qs = model.objects.filter(user=user)
+        if cursor is not None:
+            qs = qs.filter(_after(cursor, key))
+        branches.append(
+            qs.annotate(target_field=Value(key, output_field=CharField()), target_id=F(key))
+            .values('id', 'text', 'created_at', 'target_field', 'target_id')
+        )
+    rows = list(
+        branches[0].union(*branches[1:], all=True)
+        .order_by('-created_at', '-target_field', '-id')[:limit + 1]
+    )
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    items = []
+    for row in rows[:limit]:
+        key = row['target_field']
+        items.append({
+            'id': row['id'],
+            'text': row['text'],
+            'created_at': row['created_at'],
+            key: row['target_id'],
+            'target_field': key,
+        })
+    return items, next_cursor
+
+
+# ----------------------------
+# Overview
+# ----------------------------
+def overview_counters(user):
+    """UserOverviewAPIView hisoblagichlari bitta so'rovda."""
+    progress = models.CourseVideoProgress.objects.all()
+    video_tests = models.TestResult.objects.all()
+    ct_tests = models.CourseTypeTestResult.objects.all()
+    exprs = {
+        'videos_watched': user_subquery(progress, 'user', Count('course_video', distinct=True)),
+        'seconds_watched': user_subquery(progress, 'user', Sum('seconds_watched')),
+        'video_tests': user_subquery(video_tests, 'user', Count('id')),
+        'video_tests_avg': user_subquery(video_tests, 'user', Avg('score')),
+        'ct_tests': user_subquery(ct_tests, 'user', Count('id')),
+        'ct_tests_avg': user_subquery(ct_tests, 'user', Avg('score')),
+        'video_submissions': user_subquery(models.AssignmentSubmission.objects.all(), 'student', Count('id')),
+        'ct_submissions': user_subquery(models.CourseTypeAssignmentSubmission.objects.all(), 'student', Count('id')),
+        'reel_likes': user_subquery(models.LikeReels.objects.all(), 'user', Count('id')),
+        'playlists_count': user_subquery(models.Playlist.objects.all(), 'owner', Count('id')),
+        'wallet_balance': Subquery(models.Wallet.objects.filter(user=OuterRef('pk')).values('balance')[:1]),
+    }
+    for model, key in COMMENT_TARGETS:
+        exprs[f'comments_{key}'] = user_subquery(model.objects.all(), 'user', Count('id'))
+    row = models.User.objects.filter(pk=user.pk).values(**exprs).get()
+
+    avgs = [
+        row[f'{kind}_avg'] or 0
+        for kind in ('video_tests', 'ct_tests') if row[kind]
+    ]
+    wallet_balance = row['wallet_balance']
+    if wallet_balance is None:
+        wallet_balance = models.Wallet.objects.get_or_create(user=user)[0].balance
+    return {
+        'videos_watched': row['videos_watched'] or 0,
+        'seconds_watched': int(row['seconds_watched'] or 0),
+        'tests_attempts': (row['video_tests'] or 0) + (row['ct_tests'] or 0),
+        'avg_test_score': round(sum(avgs) / len(avgs), 2) if avgs else None,
+        'assignments_submitted': (row['video_submissions'] or 0) + (row['ct_submissions'] or 0),
+        'liked_reels': row['reel_likes'] or 0,
+        'comments_count': sum(row[f'comments_{key}'] or 0 for _, key in COMMENT_TARGETS),
+        'playlists_count': row['playlists_count'] or 0,
+        'wallet_balance': wallet_balance,
+    }
@@ -14,6 +14,8 @@ from datetime import timedelta
 from pathlib import Path
 import os
 
+from celery.schedules import crontab
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -129,6 +131,50 @@ DATABASES = {
 
 CELERY_BROKER_URL = "redis://localhost:6379/0"
 CELERY_RESULT_BACKEND = "redis://localhost:6379/0"
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1',
+    }
+}
+
+CELERY_BEAT_SCHEDULE = {
+    # Teacher analytics uchun kunlik rollup (app.rollups)
+    'rollup-course-daily-stats': {
+        'task': 'app.tasks.rollup_course_daily_stats',
+        'schedule': crontab(minute=10),
+    },
+    # Teacher dashboard snapshotlari (app.api_teacher.dashboard)
+    'refresh-teacher-dashboards': {
+        'task': 'app.tasks.refresh_all_teacher_dashboards',
+        'schedule': crontab(minute=40),
+    },
+    # Platforma komissiyasi jurnali -> platforma hamyoni (app.models.PendingCommission)
+    'settle-platform-commissions': {
+        'task': 'app.tasks.settle_platform_commissions',
+        'schedule': crontab(minute='*/5'),
+    },
+    # PlatformCounterDelta jurnali -> PlatformCounter (app.platform_counters)
+    'fold-platform-counters': {
+        'task': 'app.tasks.fold_platform_counters',
+        'schedule': crontab(),
+    },
+    # CourseStudentDelta jurnali -> Course.students_count (app.course_stats)
+    'fold-course-students': {
+        'task': 'app.tasks.fold_course_students',
+        'schedule': crontab(),
+    },
+    # Hamyon balanslari auditi + checkpointlar (app.reconciliation)
+    'reconcile-wallet-balances': {
+        'task': 'app.tasks.reconcile_wallet_balances',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    # WalletTransaction oylik partitionlari (app.partitions, faqat PostgreSQL)
+    'ensure-wallet-partitions': {
+        'task': 'app.tasks.ensure_wallet_partitions',
+        'schedule': crontab(hour=2, minute=10),
+    },
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators